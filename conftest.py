@@ -1,6 +1,7 @@
 import uuid
 import tempfile
 import pytest
+from django.core.cache import caches
 from pytest_factoryboy import register
 from travelingguestbook import factories
 
@@ -18,10 +19,26 @@ def temporary_media_root(settings):
         settings.MEDIA_ROOT = temp_dir
         yield temp_dir
 
+@pytest.fixture(autouse=True)
+def consent_spool_dir(settings, tmp_path):
+    """Buffer cookie consent logs in a temporary directory during tests"""
+    settings.CONSENT_SPOOL_DIR = tmp_path / 'consent'
+    return settings.CONSENT_SPOOL_DIR
+
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
     '''This function saves us from typing @pytest.mark.django_db before every test function'''
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    '''The database is rolled back after every test, so the caches are cleared as well
+    to not keep cached rows or rate limits of a previous test'''
+    for cache in caches.all():
+        cache.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+
 @pytest.fixture(name='create_user')
 def create_user(django_user_model):
     '''Custom user fixture according to https://djangostars.com/blog/django-pytest-testing/,
@@ -0,0 +1,201 @@
+"""Write-behind spool for the cookie consent log, inserted by flush_consent_logs."""
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ConsentDailyCount, CookieConsentLog
+
+logger = logging.getLogger(__name__)
+
+# Hash of the consent that was last logged for the browser
+CONSENT_LOGGED_COOKIE = "site_cookie_consent_v1_logged"
+FLUSH_BATCH_SIZE = 500
+PRUNE_BATCH_SIZE = 1000
+CONSENT_LOG_RETENTION = timedelta(days=365)
+# The categories of the cookie banner, other keys of a consent are not counted
+CONSENT_CATEGORIES = ("necessary", "functional", "analytics", "marketing")
+# Entries claimed longer ago belong to a flush that stopped, and are flushed again
+STALE_CLAIM = timedelta(minutes=10)
+
+
+def spool_dir():
+    """The directory holding the consent log entries waiting to be inserted"""
+    return Path(settings.CONSENT_SPOOL_DIR)
+
+
+def consent_hash(consent):
+    """A hash of the consent that does not depend on the order or spacing of its keys"""
+    canonical = json.dumps(consent, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def buffer_consent(consent, user_id, ip, user_agent):
+    """Add a consent log entry to the spool, to be inserted by flush_consents"""
+    spool = spool_dir()
+    spool.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "consent": consent,
+        "user_id": user_id,
+        "ip": ip,
+        "user_agent": user_agent,
+        "created": timezone.now().isoformat(),
+    }
+    # Named by time, so the flush inserts the entries in the order they were made
+    name = f"{timezone.now().timestamp():020.6f}-{uuid.uuid4().hex}"
+    temporary = spool / f"{name}.tmp"
+    temporary.write_text(json.dumps(entry), encoding="utf-8")
+    os.replace(temporary, spool / f"{name}.json")
+
+
+def claim(path):
+    """Rename a spooled entry so no other flush reads it. Returns the new path,
+    or None when another flush claimed it first."""
+    claimed = path.with_suffix(".flushing")
+    try:
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return None
+    # The claim is stale after STALE_CLAIM from now, not from when the entry was written
+    os.utime(claimed)
+    return claimed
+
+
+def read_entry(path):
+    """The consent log of a claimed entry, or None when the file cannot be read"""
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        entry["created"] = datetime.fromisoformat(entry["created"])
+        return CookieConsentLog(**entry)
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.exception("Unreadable consent log entry %s", path.name)
+        path.rename(path.with_suffix(".bad"))
+        return None
+
+
+def release_stale_claims():
+    """Return the entries of flushes that stopped to the spool"""
+    stale = time.time() - STALE_CLAIM.total_seconds()
+    for path in spool_dir().glob("*.flushing"):
+        try:
+            if path.stat().st_mtime < stale:
+                os.replace(path, path.with_suffix(".json"))
+        except FileNotFoundError:
+            pass
+
+
+def insert_consents(logs):
+    """Insert consent logs and count them in one transaction"""
+    # Users may have been deleted while their consent waited in the spool
+    users = set(
+        get_user_model().objects.filter(
+            pk__in={log.user_id for log in logs if log.user_id}
+        ).values_list("pk", flat=True)
+    )
+    for log in logs:
+        if log.user_id not in users:
+            log.user_id = None
+    with transaction.atomic():
+        CookieConsentLog.objects.bulk_create(logs)
+        count_consents(logs)
+
+
+def flush_consents(batch_size=FLUSH_BATCH_SIZE):
+    """Insert the spooled consent logs in batches. Returns the number inserted.
+    An entry is inserted again when a flush stopped before removing its file."""
+    release_stale_claims()
+    paths = sorted(spool_dir().glob("*.json"))
+    inserted = 0
+    for start in range(0, len(paths), batch_size):
+        claimed = [path for path in map(claim, paths[start:start + batch_size]) if path]
+        logs = {path: read_entry(path) for path in claimed}
+        logs = {path: log for path, log in logs.items() if log is not None}
+        try:
+            insert_consents(logs.values())
+        except DatabaseError:
+            # Returned to the spool right away, instead of waiting until the claim is stale
+            for path in logs:
+                os.replace(path, path.with_suffix(".json"))
+            raise
+        for path in logs:
+            path.unlink(missing_ok=True)
+        inserted += len(logs)
+    return inserted
+
+
+def count_consents(logs):
+    """Add the consents of the logs to the daily counts"""
+    added = Counter()
+    for log in logs:
+        if not isinstance(log.consent, dict):
+            continue
+        day = timezone.localdate(log.created)
+        for category in CONSENT_CATEGORIES:
+            if isinstance(log.consent.get(category), bool):
+                added[day, category, log.consent[category]] += 1
+    if not added:
+        return
+    counts = {
+        (day, category): [accepted, declined]
+        for day, category, accepted, declined in ConsentDailyCount.objects.filter(
+            day__in={day for day, _category, _accepted in added},
+        ).values_list("day", "category", "accepted", "declined")
+    }
+    for (day, category, accepted), count in added.items():
+        counts.setdefault((day, category), [0, 0])[0 if accepted else 1] += count
+    ConsentDailyCount.objects.bulk_create(
+        [
+            ConsentDailyCount(day=day, category=category, accepted=accepted, declined=declined)
+            for (day, category), (accepted, declined) in counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["day", "category"],
+        update_fields=["accepted", "declined"],
+    )
+
+
+def prune_consent_logs(now=None, batch_size=PRUNE_BATCH_SIZE):
+    """Delete the consent logs older than the retention, a batch at a time so other
+    writes can take the write lock in between. Returns the number deleted."""
+    cutoff = (now or timezone.now()) - CONSENT_LOG_RETENTION
+    expired = CookieConsentLog.objects.filter(created__lt=cutoff).order_by("created")
+    deleted = 0
+    while True:
+        batch = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += CookieConsentLog.objects.filter(pk__in=batch).delete()[0]
+
+
+def consent_ratios(days=30, today=None):
+    """The share of consents accepting each category over the last days"""
+    today = today or timezone.localdate()
+    totals = {
+        row["category"]: row
+        for row in ConsentDailyCount.objects.filter(day__gt=today - timedelta(days=days))
+        .values("category")
+        .annotate(accepted=Sum("accepted"), declined=Sum("declined"))
+        .order_by()
+    }
+    ratios = {}
+    for category in CONSENT_CATEGORIES:
+        row = totals.get(category, {"accepted": 0, "declined": 0})
+        total = row["accepted"] + row["declined"]
+        ratios[category] = {
+            "accepted": row["accepted"],
+            "declined": row["declined"],
+            "ratio": row["accepted"] / total if total else None,
+        }
+    return ratios
@@ -0,0 +1,52 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from core.consent import FLUSH_BATCH_SIZE, flush_consents
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django management command that runs the worker inserting buffered cookie consent logs."""
+    help = 'Insert the cookie consent logs buffered by the cookie banner in batches'
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Insert the buffered logs and stop, instead of waiting for new ones'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between flushes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=FLUSH_BATCH_SIZE,
+            help='Number of logs inserted with one query'
+        )
+
+    def handle(self, *args, **options):
+        """Flush the buffered logs, and keep flushing unless --once is given."""
+        try:
+            while True:
+                try:
+                    inserted = flush_consents(options['batch_size'])
+                except DatabaseError:
+                    # Mostly a locked database, the entries are flushed on the next poll
+                    logger.exception("Flushing the consent logs failed")
+                    inserted = 0
+                if inserted:
+                    self.stdout.write(f"{inserted} consent logs inserted")
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped flushing consent logs")
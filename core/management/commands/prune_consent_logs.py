@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.consent import CONSENT_LOG_RETENTION, PRUNE_BATCH_SIZE, prune_consent_logs
+
+
+class Command(BaseCommand):
+    """Django management command to delete the cookie consent logs past their retention."""
+    help = (
+        f'Delete the cookie consent logs older than {CONSENT_LOG_RETENTION.days} days, '
+        'keeping their daily counts'
+    )
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PRUNE_BATCH_SIZE,
+            help='Number of logs deleted with one query'
+        )
+
+    def handle(self, *args, **options):
+        """Delete the old logs and report how many were deleted."""
+        deleted = prune_consent_logs(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} consent logs"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.sync import TOMBSTONE_RETENTION, prune_tombstones
+
+
+class Command(BaseCommand):
+    """Django management command to delete tombstones that offline clients no longer need."""
+    help = f'Delete the tombstones of objects deleted more than {TOMBSTONE_RETENTION.days} days ago'
+
+    def handle(self, *args, **options):
+        """Delete the old tombstones and report how many were deleted."""
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones"))
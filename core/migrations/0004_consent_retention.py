@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:28
+
+from collections import Counter
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+CONSENT_CATEGORIES = ("necessary", "functional", "analytics", "marketing")
+
+
+def fill_daily_counts(apps, schema_editor):
+    """Count the consents of the logs that already exist per day and category"""
+    CookieConsentLog = apps.get_model("core", "CookieConsentLog")
+    ConsentDailyCount = apps.get_model("core", "ConsentDailyCount")
+    counts = Counter()
+    for created, consent in CookieConsentLog.objects.values_list("created", "consent").iterator():
+        if not isinstance(consent, dict):
+            continue
+        for category in CONSENT_CATEGORIES:
+            if isinstance(consent.get(category), bool):
+                counts[timezone.localdate(created), category, consent[category]] += 1
+    rows = {}
+    for (day, category, accepted), count in counts.items():
+        row = rows.setdefault((day, category), ConsentDailyCount(day=day, category=category))
+        if accepted:
+            row.accepted = count
+        else:
+            row.declined = count
+    ConsentDailyCount.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_consent_created_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cookieconsentlog',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ConsentDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('declined', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='unique_consent_day_category')],
+            },
+        ),
+        migrations.RunPython(fill_daily_counts, migrations.RunPython.noop),
+    ]
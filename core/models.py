@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 
 class CookieConsentLog(models.Model):
@@ -8,4 +9,36 @@ class CookieConsentLog(models.Model):
     consent = models.JSONField()
     ip = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created = models.DateTimeField(auto_now_add=True)
+    # Set when the consent is given, which is earlier than when it is inserted, see core.consent
+    created = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+
+
+class ConsentDailyCount(models.Model):
+    """The number of visitors that accepted and declined a cookie category on a day.
+    Kept after the consent logs of the day are deleted, see core.consent."""
+    day = models.DateField()
+    category = models.CharField(max_length=20)
+    accepted = models.PositiveIntegerField(default=0)
+    declined = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """One row per day and category"""
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category"], name="unique_consent_day_category"),
+        ]
+
+    def __str__(self):
+        """A daily count is represented by its day, category and counts."""
+        return f"{self.day} {self.category}: {self.accepted} accepted, {self.declined} declined"
+
+
+class Tombstone(models.Model):
+    """Marks an object that was deleted, so offline clients can delete their copy.
+    See core.sync for the models that leave tombstones."""
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        """A tombstone is represented by the model and id of the deleted object."""
+        return f"{self.model} {self.object_id}"
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Tombstone
+from core.utils.cache import bump_generation
+from persona.models import Persona, Problem, Reaction
+from streetactivity.models import StreetActivity
+
+
+@receiver(post_delete, sender=StreetActivity)
+@receiver(post_delete, sender=Persona)
+@receiver(post_delete, sender=Problem)
+@receiver(post_delete, sender=Reaction)
+def leave_tombstone(sender, instance, *args, **kwargs):
+    """When a synced object is deleted, leave a tombstone so offline clients delete it too"""
+    Tombstone.objects.create(model=sender._meta.label_lower, object_id=instance.pk)
+
+
+@receiver(post_save, sender=StreetActivity)
+@receiver(post_delete, sender=StreetActivity)
+@receiver(post_save, sender=Persona)
+@receiver(post_delete, sender=Persona)
+@receiver(post_save, sender=Problem)
+@receiver(post_delete, sender=Problem)
+@receiver(post_save, sender=Reaction)
+@receiver(post_delete, sender=Reaction)
+def refresh_cached_responses(sender, *args, **kwargs):
+    """When an object is saved or deleted, stop serving cached API responses built from its model"""
+    bump_generation(sender)
@@ -0,0 +1,61 @@
+"""Changes since a watermark, for clients that keep an offline copy of the data."""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from persona.models import Persona, Problem, Reaction
+from persona.serializers import PersonaSerializer, ProblemSerializer, ReactionSerializer
+from streetactivity.models import COUNTER_FIELDS, StreetActivity
+from streetactivity.serializers import StreetActivitySerializer
+
+from .models import Tombstone
+
+TOMBSTONE_RETENTION = timedelta(days=90)
+# Longer than a write transaction takes from setting date_modified to its commit
+WATERMARK_LAG = timedelta(minutes=5)
+
+# The synced models by the name clients know them by, with their serializer and the
+# fields left out. The counters of an activity change without changing date_modified.
+SYNCED_MODELS = {
+    "streetactivities": (StreetActivity, StreetActivitySerializer, COUNTER_FIELDS),
+    "personas": (Persona, PersonaSerializer, ()),
+    "problems": (Problem, ProblemSerializer, ()),
+    "reactions": (Reaction, ReactionSerializer, ()),
+}
+
+
+def prune_tombstones(now=None):
+    """Delete the tombstones older than the retention. Returns the number deleted."""
+    cutoff = (now or timezone.now()) - TOMBSTONE_RETENTION
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+def changes_since(since, context=None):
+    """The objects changed and deleted since the watermark, and the next watermark.
+    A watermark of None, or one older than the tombstones, returns all objects."""
+    now = timezone.now()
+    watermark = now - WATERMARK_LAG
+    full = since is None or since < now - TOMBSTONE_RETENTION
+
+    changes = {}
+    for name, (model, serializer_class, excluded) in SYNCED_MODELS.items():
+        queryset = model.objects.order_by("pk")
+        if not full:
+            queryset = queryset.filter(date_modified__gte=since)
+        fields = [field.name for field in model._meta.concrete_fields if field.name not in excluded]
+        data = serializer_class(queryset, many=True, fields=fields, context=context).data
+        if data:
+            changes[name] = data
+
+    deleted = {}
+    if not full:
+        labels = {model._meta.label_lower: name for name, (model, *_rest) in SYNCED_MODELS.items()}
+        tombstones = Tombstone.objects.filter(
+            model__in=labels, deleted_at__gte=since
+        ).order_by("object_id")
+        for label, object_id in tombstones.values_list("model", "object_id"):
+            deleted.setdefault(labels[label], []).append(object_id)
+
+    return {"watermark": watermark, "full": full, "changes": changes, "deleted": deleted}
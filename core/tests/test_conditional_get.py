@@ -0,0 +1,194 @@
+from django.contrib import messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import reverse
+from django.views.generic import DetailView, TemplateView
+
+from core.utils.mixins import ConditionalGetMixin
+
+from persona.views import PersonaDetailView
+from streetactivity.models import Reflection
+from travelingguestbook.factories import (
+    PersonaFactory,
+    ProblemFactory,
+    ReflectionFactory,
+    StreetActivityFactory,
+    UserFactory,
+)
+
+
+def revisit(client, url, response):
+    '''Request a page again, sending the validators of an earlier response'''
+    return client.get(
+        url,
+        HTTP_IF_NONE_MATCH=response["ETag"],
+        HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+    )
+
+
+class TestStreetActivityDetail:
+    '''Tests for conditional GET of the street activity page'''
+    def test_validators_are_sent(self, client):
+        """Test that the page has an ETag, a Last-Modified and must be revalidated"""
+        activity = StreetActivityFactory()
+
+        response = client.get(reverse("streetactivity-detail", args=[activity.pk]))
+
+        assert response.status_code == 200
+        assert response["ETag"]
+        assert response["Last-Modified"]
+        assert "no-cache" in response["Cache-Control"]
+
+    def test_unchanged_page_is_not_modified(self, client, django_assert_max_num_queries):
+        """Test that a revisit of an unchanged page is answered with 304 without rendering"""
+        activity = StreetActivityFactory()
+        url = reverse("streetactivity-detail", args=[activity.pk])
+        first = client.get(url)
+
+        with django_assert_max_num_queries(3):
+            response = revisit(client, url, first)
+
+        assert response.status_code == 304
+        assert response["ETag"] == first["ETag"]
+        assert not response.content
+
+    def test_new_reflection_changes_etag(self, client):
+        """Test that adding a reflection changes the page"""
+        activity = StreetActivityFactory()
+        url = reverse("streetactivity-detail", args=[activity.pk])
+        first = client.get(url)
+
+        ReflectionFactory(activity=activity)
+
+        assert revisit(client, url, first).status_code == 200
+
+    def test_edited_reflection_changes_etag(self, client):
+        """Test that editing a reflection shown on the page changes the page"""
+        reflection = ReflectionFactory()
+        url = reverse("streetactivity-detail", args=[reflection.activity_id])
+        first = client.get(url)
+
+        reflection.reflection = "Aangepast"
+        reflection.save()
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+    def test_login_changes_etag(self, client):
+        """Test that the page of a logged in user has another ETag"""
+        activity = StreetActivityFactory()
+        url = reverse("streetactivity-detail", args=[activity.pk])
+        first = client.get(url)
+
+        client.force_login(UserFactory())
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+    def test_missing_activity(self, client):
+        """Test that an unknown activity is still not found"""
+        assert client.get(reverse("streetactivity-detail", args=[999])).status_code == 404
+
+
+class TestPersonaDetail:
+    '''Tests for conditional GET of the persona page'''
+    def test_unchanged_page_is_not_modified(self, client):
+        """Test that a revisit of an unchanged persona is answered with 304"""
+        persona = PersonaFactory()
+        url = reverse("persona-detail", args=[persona.pk])
+        first = client.get(url)
+
+        assert revisit(client, url, first).status_code == 304
+
+    def test_new_problem_changes_etag(self, client):
+        """Test that adding a problem to the persona changes the page"""
+        persona = PersonaFactory()
+        url = reverse("persona-detail", args=[persona.pk])
+        first = client.get(url)
+
+        ProblemFactory(persona=persona)
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+    def test_pending_message_is_rendered(self):
+        """Test that a page with a pending message is rendered instead of answered with 304"""
+        persona = PersonaFactory()
+        request = RequestFactory().get("/")
+        request.user = UserFactory()
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        messages.success(request, "Opgeslagen")
+        request.META["HTTP_IF_MODIFIED_SINCE"] = "Fri, 31 Dec 9999 23:59:59 GMT"
+
+        response = PersonaDetailView.as_view()(request, pk=persona.pk)
+
+        assert response.status_code == 200
+        assert "ETag" not in response
+
+
+class TestDefaultValidators:
+    '''Tests for conditional GET of views that do not implement get_validators'''
+    def get(self, view, **kwargs):
+        '''Request the view as an anonymous visitor that has the page of 9999'''
+        request = RequestFactory().get("/", HTTP_IF_MODIFIED_SINCE="Fri, 31 Dec 9999 23:59:59 GMT")
+        request.user = AnonymousUser()
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return view.as_view()(request, **kwargs)
+
+    def test_detail_view_depends_on_its_object(self):
+        """Test that a detail view is not modified while the date_modified of its object is"""
+        class ReflectionPage(ConditionalGetMixin, DetailView):
+            """Reflection page with the default validators"""
+            model = Reflection
+
+        reflection = ReflectionFactory()
+
+        response = self.get(ReflectionPage, pk=reflection.pk)
+
+        assert response.status_code == 304
+        with pytest.raises(Http404):
+            self.get(ReflectionPage, pk=reflection.pk + 1)
+
+    def test_other_views_must_implement_validators(self):
+        """Test that a view without an object explains that it must implement get_validators"""
+        class AboutPage(ConditionalGetMixin, TemplateView):
+            """Page without an object"""
+            template_name = "about.html"
+
+        with pytest.raises(ImproperlyConfigured):
+            self.get(AboutPage)
+
+
+class TestRetrieveEndpoints:
+    '''Tests for conditional GET of the API objects'''
+    def test_reflection_is_not_modified(self, client):
+        """Test that an unchanged reflection is answered with 304"""
+        reflection = ReflectionFactory()
+        url = reverse("reflecties-detail", args=[reflection.pk])
+        first = client.get(url)
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        assert first.status_code == 200
+        assert response.status_code == 304
+
+    def test_activity_counter_changes_etag(self, client):
+        """Test that a new reflection changes the ETag of its activity through its counter"""
+        activity = StreetActivityFactory()
+        url = reverse("straatactiviteiten-detail", args=[activity.pk])
+        first = client.get(url)
+
+        ReflectionFactory(activity=activity)
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+    def test_persona_is_not_modified(self, client):
+        """Test that an unchanged persona is answered with 304"""
+        persona = PersonaFactory()
+        url = reverse("personas-detail", args=[persona.pk])
+        first = client.get(url)
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
@@ -1,7 +1,25 @@
 import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
-from core.models import CookieConsentLog
+from core.consent import (
+    CONSENT_CATEGORIES,
+    CONSENT_LOGGED_COOKIE,
+    CONSENT_LOG_RETENTION,
+    consent_ratios,
+    consent_hash,
+    count_consents,
+    flush_consents,
+    prune_consent_logs,
+)
+from core.models import ConsentDailyCount, CookieConsentLog
 
 def test_save_cookie_consent_anonymous(client):
     """Test saving cookie consent for an anonymous user."""
@@ -17,6 +35,7 @@ def test_save_cookie_consent_anonymous(client):
     assert resp.status_code == 200
     assert resp.json() == {"ok": True}
 
+    assert flush_consents() == 1
     assert CookieConsentLog.objects.count() == 1
     log = CookieConsentLog.objects.first()  # type: ignore[reportOptionalMemberAccess]
     assert log.user is None  # type: ignore[reportOptionalMemberAccess]
@@ -43,6 +62,7 @@ def test_save_cookie_consent_authenticated(client):
     )
 
     assert resp.status_code == 200
+    flush_consents()
     assert CookieConsentLog.objects.filter(user=user).exists()
     log = CookieConsentLog.objects.filter(user=user).first()  # type: ignore[reportOptionalMemberAccess]
     assert log.consent == payload  # type: ignore[reportOptionalMemberAccess]
@@ -55,3 +75,199 @@ def test_save_cookie_consent_invalid_json_returns_400(client):
     assert resp.status_code == 400
     assert resp.json() == {"ok": False}
     assert CookieConsentLog.objects.count() == 0
+
+
+class TestConsentBuffer:
+    """Tests for buffering the consent logs and inserting them in batches"""
+    def post(self, client, payload):
+        """Post a consent"""
+        return client.post(
+            reverse("cookie-consent"), data=json.dumps(payload), content_type="application/json"
+        )
+
+    def test_click_does_not_write_to_the_database(self, client, django_assert_num_queries):
+        """Test that an anonymous consent is answered without any query"""
+        with django_assert_num_queries(0):
+            resp = self.post(client, {"consent": True})
+
+        assert resp.status_code == 200
+        assert CookieConsentLog.objects.count() == 0
+
+    def test_flush_in_batches(self, client):
+        """Test that the buffered logs are inserted in order with one insert per batch"""
+        for number in range(5):
+            self.post(client, {"number": number})
+
+        with CaptureQueriesContext(connection) as queries:
+            assert flush_consents(batch_size=2) == 5
+
+        inserts = [query for query in queries if query["sql"].startswith("INSERT")]
+        assert len(inserts) == 3
+
+        logs = CookieConsentLog.objects.order_by("created")
+        assert [log.consent["number"] for log in logs] == [0, 1, 2, 3, 4]
+        assert flush_consents() == 0
+
+    def test_consent_time_is_kept(self, client):
+        """Test that a log gets the time of the click, not of the flush"""
+        self.post(client, {"consent": True})
+        clicked = timezone.now()
+
+        flush_consents()
+
+        assert CookieConsentLog.objects.get().created <= clicked
+
+    def test_deleted_user(self, client):
+        """Test that the consent of a user deleted before the flush is kept anonymously"""
+        user = User.objects.create_user("tester", "tester@example.com", "pw")
+        client.force_login(user)
+        self.post(client, {"consent": True})
+        user.delete()
+
+        flush_consents()
+
+        assert CookieConsentLog.objects.get().user is None
+
+    def test_unreadable_entry_is_set_aside(self, consent_spool_dir, client):
+        """Test that an unreadable entry does not stop the other entries"""
+        self.post(client, {"consent": True})
+        (consent_spool_dir / "0-kapot.json").write_text("{", encoding="utf-8")
+
+        assert flush_consents() == 1
+        assert [path.name for path in consent_spool_dir.iterdir()] == ["0-kapot.bad"]
+
+    def test_locked_database_keeps_entries(self, client, consent_spool_dir):
+        """Test that entries that could not be inserted wait in the spool for the next flush"""
+        self.post(client, {"consent": True})
+
+        with mock.patch(
+            "core.consent.CookieConsentLog.objects.bulk_create",
+            side_effect=OperationalError("database is locked"),
+        ):
+            call_command("flush_consent_logs", "--once", stdout=StringIO())
+
+        assert [path.suffix for path in consent_spool_dir.iterdir()] == [".json"]
+        assert flush_consents() == 1
+
+    def test_flush_command(self, client):
+        """Test that the worker inserts the buffered logs"""
+        self.post(client, {"consent": True})
+        out = StringIO()
+
+        call_command("flush_consent_logs", "--once", stdout=out)
+
+        assert CookieConsentLog.objects.count() == 1
+        assert "1 consent logs inserted" in out.getvalue()
+
+
+class TestConsentRetention:
+    """Tests for the daily consent counts and deleting old consent logs"""
+    def log(self, consent, created=None):
+        """Insert a consent log as the flush does"""
+        log = CookieConsentLog(consent=consent, created=created or timezone.now())
+        CookieConsentLog.objects.bulk_create([log])
+        count_consents([log])
+        return log
+
+    def test_flush_counts_categories(self, client):
+        """Test that the flushed consents are counted per category"""
+        for analytics in (True, True, False):
+            # Three visitors, a browser submitting the same consent again is not logged
+            client.cookies.clear()
+            client.post(
+                reverse("cookie-consent"),
+                data=json.dumps({"necessary": True, "analytics": analytics, "onbekend": True}),
+                content_type="application/json",
+            )
+
+        flush_consents()
+
+        counts = {
+            row.category: (row.accepted, row.declined) for row in ConsentDailyCount.objects.all()
+        }
+        assert counts == {"necessary": (3, 0), "analytics": (2, 1)}
+
+    def test_prune_keeps_counts(self):
+        """Test that only expired logs are deleted, in batches, and the counts remain"""
+        expired = timezone.now() - CONSENT_LOG_RETENTION - timedelta(days=1)
+        for _ in range(3):
+            self.log({"analytics": True}, created=expired)
+        recent = self.log({"analytics": False})
+
+        assert prune_consent_logs(batch_size=2) == 3
+
+        assert list(CookieConsentLog.objects.all()) == [recent]
+        assert ConsentDailyCount.objects.get(day=timezone.localdate(expired)).accepted == 3
+
+    def test_prune_command(self):
+        """Test that the command reports how many logs were deleted"""
+        expired = timezone.now() - CONSENT_LOG_RETENTION - timedelta(days=1)
+        self.log({"analytics": True}, created=expired)
+        out = StringIO()
+
+        call_command("prune_consent_logs", stdout=out)
+
+        assert "Deleted 1 consent logs" in out.getvalue()
+
+    def test_ratios(self):
+        """Test that the ratios cover the days asked for"""
+        self.log({"analytics": True, "marketing": False})
+        self.log({"analytics": False, "marketing": False})
+        self.log({"analytics": True}, created=timezone.now() - timedelta(days=40))
+
+        ratios = consent_ratios(days=30)
+
+        assert ratios["analytics"] == {"accepted": 1, "declined": 1, "ratio": 0.5}
+        assert ratios["marketing"]["ratio"] == 0
+        assert ratios["functional"]["ratio"] is None
+
+    def test_stats_endpoint_is_for_staff(self, client, auto_login_user):
+        """Test that only staff can read the consent ratios"""
+        assert client.get(reverse("consent-stats")).status_code == 403
+
+        staff = User.objects.create_user("beheer", password="strong-test-pass", is_staff=True)
+        staff_client, _user = auto_login_user(staff)
+        data = staff_client.get(reverse("consent-stats"), {"dagen": 7}).json()
+
+        assert data["days"] == 7
+        assert set(data["categories"]) == set(CONSENT_CATEGORIES)
+
+
+class TestConsentDeduplication:
+    """Tests for not logging a consent the browser already submitted"""
+    def post(self, client, body):
+        """Post a consent as JSON text"""
+        return client.post(reverse("cookie-consent"), data=body, content_type="application/json")
+
+    def test_hash_ignores_key_order_and_spacing(self):
+        """Test that the same consent written differently has the same hash"""
+        assert consent_hash(json.loads('{"a": true, "b": false}')) == consent_hash(
+            json.loads('{"b":false,"a":true}')
+        )
+        assert consent_hash({"a": True}) != consent_hash({"a": False})
+
+    def test_resubmission_is_not_logged(self, client, consent_spool_dir):
+        """Test that the same consent is logged once and its cookies are not set again"""
+        first = self.post(client, '{"necessary": true, "analytics": false}')
+        again = self.post(client, '{"analytics":false,"necessary":true}')
+
+        assert first.cookies[CONSENT_LOGGED_COOKIE]["httponly"]
+        assert again.status_code == 200
+        assert again.json() == {"ok": True}
+        assert not again.cookies
+        assert flush_consents() == 1
+
+    def test_changed_consent_is_logged(self, client):
+        """Test that a different consent is logged"""
+        self.post(client, '{"necessary": true, "analytics": false}')
+        self.post(client, '{"necessary": true, "analytics": true}')
+
+        assert flush_consents() == 2
+
+    def test_banner_cookie_alone_does_not_skip(self, client):
+        """Test that a consent is logged when only the banner has written its cookie"""
+        client.cookies["site_cookie_consent_v1"] = json.dumps({"necessary": True})
+
+        self.post(client, '{"necessary": true}')
+
+        assert flush_consents() == 1
@@ -0,0 +1,129 @@
+import json
+from itertools import count
+from unittest import mock
+
+import pytest
+from django.urls import reverse
+
+from core.consent import flush_consents
+from travelingguestbook.factories import StreetActivityFactory
+
+CLICKS = count()
+
+
+@pytest.fixture(autouse=True)
+def small_buckets(settings):
+    '''Buckets of 3 tokens for a session and 6 for an IP address, both refilled in a minute'''
+    settings.WRITE_RATE_LIMIT = (3, 60)
+    settings.RATE_LIMIT_IP_MULTIPLIER = 2
+
+
+@pytest.fixture(name="clock")
+def fixture_clock():
+    '''A clock for the rate limiter that the test moves forward'''
+    now = [1_000_000.0]
+    with mock.patch("core.utils.ratelimit.time.time", lambda: now[0]):
+        yield now
+
+
+def post_consent(client, **extra):
+    '''Post a cookie consent that differs from the previous one, so it is logged'''
+    return client.post(
+        reverse("cookie-consent"), data=json.dumps({"click": next(CLICKS)}),
+        content_type="application/json", **extra
+    )
+
+
+class TestRateLimit:
+    '''Tests for limiting the writes of anonymous visitors'''
+    def test_burst_then_rejected(self, client, clock):
+        """Test that writes beyond the bucket get 429 with Retry-After and save nothing"""
+        for _ in range(6):
+            assert post_consent(client).status_code == 200
+
+        response = post_consent(client)
+
+        assert response.status_code == 429
+        assert response["Retry-After"] == "10"
+        assert flush_consents() == 6
+
+    def test_tokens_refill(self, client, clock):
+        """Test that a token becomes available again after the refill interval"""
+        for _ in range(6):
+            post_consent(client)
+
+        clock[0] += 10
+
+        assert post_consent(client).status_code == 200
+        assert post_consent(client).status_code == 429
+
+    def test_ip_addresses_have_own_buckets(self, client, clock):
+        """Test that a visitor from another address is not limited by the first"""
+        for _ in range(6):
+            post_consent(client)
+
+        assert post_consent(client, REMOTE_ADDR="10.0.0.2").status_code == 200
+
+    def test_session_is_limited_before_address(self, client, clock):
+        """Test that a session has a smaller bucket than the address it shares"""
+        session = client.session
+        session["bezocht"] = True
+        session.save()
+        for _ in range(3):
+            assert post_consent(client).status_code == 200
+
+        assert post_consent(client).status_code == 429
+        client.cookies.clear()
+        assert post_consent(client).status_code == 200
+
+    def test_shared_address_refills_faster(self, client, clock):
+        """Test that visitors sharing an address can together keep writing at the rate
+        of the larger address bucket once its burst is used, not at that of a session"""
+        for _ in range(6):
+            post_consent(client)
+
+        for _ in range(6):
+            clock[0] += 10
+            assert post_consent(client).status_code == 200
+
+        """Test that pages and API lists can be read after the bucket is empty"""
+        for _ in range(6):
+            post_consent(client)
+
+        assert client.get(reverse("streetactivity-list")).status_code == 200
+        assert client.get(reverse("straatactiviteiten-list")).status_code == 200
+
+    def test_logged_in_users_are_not_limited(self, auto_login_user, clock):
+        """Test that writes of logged in users are not limited"""
+        client, _user = auto_login_user()
+
+        for _ in range(10):
+            assert post_consent(client).status_code == 200
+
+    def test_view_is_limited(self, client, clock):
+        """Test that the create views share the bucket of the visitor"""
+        activity = StreetActivityFactory()
+        for _ in range(6):
+            post_consent(client)
+
+        response = client.post(
+            reverse("create-reflection", args=[activity.pk]), {"reflection": "Mooi"}
+        )
+
+        assert response.status_code == 429
+        assert not activity.reflections.exists()
+
+    def test_api_is_limited(self, client, clock):
+        """Test that the API answers an empty bucket with 429 and Retry-After"""
+        activity = StreetActivityFactory()
+        for _ in range(6):
+            post_consent(client)
+
+        response = client.post(
+            reverse("reflecties-list"),
+            {"activity": activity.pk, "reflection": "Mooi"},
+            content_type="application/json",
+        )
+
+        assert response.status_code == 429
+        assert response["Retry-After"] == "10"
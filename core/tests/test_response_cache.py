@@ -0,0 +1,161 @@
+from django.core.cache.backends.filebased import FileBasedCache
+from django.urls import reverse
+
+from core.utils.cache import generation_key, response_cache_stats
+from streetactivity.models import StreetActivity
+from streetactivity import counters
+from travelingguestbook.factories import (
+    PersonaFactory,
+    ProblemFactory,
+    ReflectionFactory,
+    StreetActivityFactory,
+    UserFactory,
+)
+
+
+class TestCachedResponses:
+    '''Tests for caching API responses per model generation'''
+    def test_second_request_is_served_from_cache(self, client, django_assert_num_queries):
+        """Test that a repeated list request is answered without queries"""
+        StreetActivityFactory.create_batch(3)
+        url = reverse("straatactiviteiten-list")
+        first = client.get(url)
+
+        with django_assert_num_queries(0):
+            second = client.get(url)
+
+        assert first["X-Cache"] == "MISS"
+        assert second["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+
+    def test_save_invalidates(self, client):
+        """Test that changing an activity makes the cached list stale"""
+        activity = StreetActivityFactory()
+        url = reverse("straatactiviteiten-list")
+        client.get(url)
+
+        activity.name = "Nieuwe naam"
+        activity.save()
+        response = client.get(url)
+
+        assert response["X-Cache"] == "MISS"
+        assert response.json()["results"][0]["name"] == "Nieuwe naam"
+
+    def test_bump_in_other_worker_invalidates(self, client, settings, tmp_path):
+        """Test that a change seen by another worker, sharing the file cache, makes the list stale"""
+        settings.CACHES = {
+            **settings.CACHES,
+            "responses": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(tmp_path),
+            },
+        }
+        StreetActivityFactory()
+        url = reverse("straatactiviteiten-list")
+        client.get(url)
+        other_worker = FileBasedCache(str(tmp_path), {})
+
+        other_worker.incr(generation_key(StreetActivity))
+        response = client.get(url)
+
+        assert response["X-Cache"] == "MISS"
+        assert client.get(url)["X-Cache"] == "HIT"
+
+    def test_counter_update_invalidates(self, client):
+        """Test that a new reflection, which only changes the counters, makes the list stale"""
+        activity = StreetActivityFactory()
+        url = reverse("straatactiviteiten-detail", args=[activity.pk])
+        client.get(url)
+
+        ReflectionFactory(activity=activity)
+        response = client.get(url)
+
+        assert response["X-Cache"] == "MISS"
+        assert response.json()["reflection_count"] == 1
+
+    def test_reconcile_invalidates_only_on_drift(self, client):
+        """Test that reconciling makes the list stale only when counters were repaired"""
+        activity = StreetActivityFactory()
+        url = reverse("straatactiviteiten-list")
+        client.get(url)
+
+        counters.reconcile_counters()
+        assert client.get(url)["X-Cache"] == "HIT"
+
+        activity.reflection_count = 5
+        activity.save(update_fields=["reflection_count"])
+        client.get(url)
+        counters.reconcile_counters()
+        assert client.get(url).json()["results"][0]["reflection_count"] == 0
+
+    def test_other_models_do_not_invalidate(self, client):
+        """Test that a new persona leaves the cached activities alone"""
+        StreetActivityFactory()
+        url = reverse("straatactiviteiten-list")
+        client.get(url)
+
+        PersonaFactory()
+
+        assert client.get(url)["X-Cache"] == "HIT"
+
+    def test_expanded_relation_invalidates(self, client):
+        """Test that a new problem makes a cached persona list with expanded problems stale"""
+        persona = PersonaFactory()
+        url = reverse("personas-list") + "?expand=problems"
+        client.get(url)
+
+        ProblemFactory(persona=persona)
+        response = client.get(url)
+
+        assert response["X-Cache"] == "MISS"
+        assert len(response.json()["results"][0]["problems"]) == 1
+
+    def test_bulk_write_invalidates(self, client):
+        """Test that problems created in bulk, without signals, make the persona list stale"""
+        persona = PersonaFactory()
+        url = reverse("personas-list") + "?expand=problems"
+        client.get(url)
+
+        client.post(
+            reverse("problem-list"),
+            [{"persona": persona.pk, "description": "Probleem"}],
+            content_type="application/json",
+        )
+
+        assert len(client.get(url).json()["results"][0]["problems"]) == 1
+
+    def test_cached_retrieve_answers_conditional_request(self, client):
+        """Test that a cached retrieve still answers 304 to a matching ETag"""
+        persona = PersonaFactory()
+        url = reverse("personas-detail", args=[persona.pk])
+        etag = client.get(url)["ETag"]
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response["X-Cache"] == "HIT"
+
+
+class TestResponseCacheStats:
+    '''Tests for observing the hits and misses of the response cache'''
+    def test_hits_and_misses_are_counted(self, client):
+        """Test that the hits and misses are counted per viewset"""
+        url = reverse("straatactiviteiten-list")
+        client.get(url)
+        client.get(url)
+        client.get(url)
+
+        stats = response_cache_stats()
+
+        assert stats["StreetActivityViewSet"] == {"hits": 2, "misses": 1}
+        assert stats["PersonaViewSet"] == {"hits": 0, "misses": 0}
+
+    def test_statistics_are_for_staff(self, client):
+        """Test that only staff can see the statistics"""
+        assert client.get(reverse("response-cache-stats")).status_code == 403
+
+        client.force_login(UserFactory(is_staff=True))
+        response = client.get(reverse("response-cache-stats"))
+
+        assert response.status_code == 200
+        assert "StreetActivityViewSet" in response.json()
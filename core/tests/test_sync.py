@@ -0,0 +1,149 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Tombstone
+from streetactivity.models import StreetActivity
+from core.sync import SYNCED_MODELS, TOMBSTONE_RETENTION, WATERMARK_LAG
+from travelingguestbook.factories import (
+    PersonaFactory,
+    ProblemFactory,
+    ReactionFactory,
+    StreetActivityFactory,
+)
+
+
+def sync(client, since=None):
+    '''Request the changes since a watermark'''
+    params = {"since": since} if since else {}
+    response = client.get(reverse("sync-api"), params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def age_everything():
+    '''Move the modification of all synced objects to before the watermark lag'''
+    long_ago = timezone.now() - WATERMARK_LAG - timedelta(minutes=1)
+    for model, _serializer, _excluded in SYNCED_MODELS.values():
+        model.objects.update(date_modified=long_ago)
+
+
+class TestSync:
+    '''Tests for the delta sync of offline clients'''
+    def test_first_sync_returns_everything(self, client):
+        """Test that a client without watermark receives all objects"""
+        activity = StreetActivityFactory()
+        persona = PersonaFactory()
+        ProblemFactory(persona=persona)
+        ReactionFactory(persona=persona)
+
+        data = sync(client)
+
+        assert data["full"] is True
+        assert set(data["changes"]) == {"streetactivities", "personas", "problems", "reactions"}
+        assert data["changes"]["streetactivities"][0]["id"] == activity.pk
+        assert "reflection_count" not in data["changes"]["streetactivities"][0]
+
+    def test_unchanged_sync_is_small(self, client):
+        """Test that an up-to-date client receives only a new watermark"""
+        StreetActivityFactory.create_batch(5)
+        PersonaFactory.create_batch(5)
+        age_everything()
+        watermark = sync(client)["watermark"]
+
+        response = client.get(reverse("sync-api"), {"since": watermark})
+
+        assert response.json()["changes"] == {}
+        assert response.json()["deleted"] == {}
+        assert len(response.content) < 200
+
+    def test_changed_objects_are_returned(self, client):
+        """Test that only the objects created or modified since the watermark are returned"""
+        StreetActivityFactory()
+        problem = ProblemFactory()
+        age_everything()
+        watermark = sync(client)["watermark"]
+
+        problem.description = "Aangepast"
+        problem.save()
+        new_persona = PersonaFactory()
+
+        data = sync(client, watermark)
+
+        assert data["full"] is False
+        assert data["changes"] == {
+            "problems": [data["changes"]["problems"][0]],
+            "personas": [data["changes"]["personas"][0]],
+        }
+        assert data["changes"]["problems"][0]["description"] == "Aangepast"
+        assert data["changes"]["personas"][0]["id"] == new_persona.pk
+
+    def test_late_commit_is_not_missed(self, client):
+        """Test that a row modified before a sync but committed after it is in the next sync"""
+        activity = StreetActivityFactory()
+        age_everything()
+        watermark = sync(client)["watermark"]
+
+        # Saved a moment before the previous sync, committed after it
+        StreetActivity.objects.filter(pk=activity.pk).update(
+            name="Laat", date_modified=timezone.now() - timedelta(seconds=1)
+        )
+
+        assert sync(client, watermark)["changes"]["streetactivities"][0]["name"] == "Laat"
+
+    def test_deletions_come_as_tombstones(self, client):
+        """Test that deleted objects, also deleted by cascade, are returned by id"""
+        persona = PersonaFactory()
+        problem = ProblemFactory(persona=persona)
+        activity = StreetActivityFactory()
+        expected = {
+            "personas": [persona.pk],
+            "problems": [problem.pk],
+            "streetactivities": [activity.pk],
+        }
+        watermark = sync(client)["watermark"]
+
+        persona.delete()
+        activity.delete()
+
+        assert sync(client, watermark)["deleted"] == expected
+
+    def test_old_watermark_gets_everything(self, client):
+        """Test that a client older than the tombstones receives a full sync"""
+        PersonaFactory()
+        since = (timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1)).isoformat()
+
+        data = sync(client, since.replace("+00:00", "Z"))
+
+        assert data["full"] is True
+        assert "personas" in data["changes"]
+
+    def test_invalid_watermark(self, client):
+        """Test that an unreadable watermark is refused"""
+        response = client.get(reverse("sync-api"), {"since": "gisteren"})
+
+        assert response.status_code == 400
+        assert "since" in json.loads(response.content)
+
+
+class TestPruneTombstones:
+    '''Tests for removing tombstones no client needs anymore'''
+    def test_old_tombstones_are_pruned(self):
+        """Test that only tombstones older than the retention are deleted"""
+        old = Tombstone.objects.create(
+            model="persona.persona",
+            object_id=1,
+            deleted_at=timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1),
+        )
+        recent = Tombstone.objects.create(model="persona.persona", object_id=2)
+        out = StringIO()
+
+        call_command("prune_tombstones", stdout=out)
+
+        assert list(Tombstone.objects.all()) == [recent]
+        assert not Tombstone.objects.filter(pk=old.pk).exists()
+        assert "Deleted 1 tombstones" in out.getvalue()
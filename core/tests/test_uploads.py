@@ -0,0 +1,160 @@
+import struct
+import zlib
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+
+from core.utils.uploads import (
+    OversizedUploadedFile,
+    SafeImageField,
+    SizeLimitedUploadHandler,
+    format_from_magic,
+)
+from persona.forms import PersonaForm
+from streetactivity.models import StreetActivityPhoto
+from travelingguestbook.factories import StreetActivityFactory
+
+
+def png_chunk(kind, data):
+    '''Encode a PNG chunk with its length and checksum'''
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def create_png_bomb(width=50_000, height=50_000):
+    '''Create a tiny PNG whose header declares huge dimensions'''
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", zlib.compress(b"\x00" * 1024))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def create_image_content(image_format="JPEG", size=(100, 100)):
+    '''Create the content of a real image'''
+    buffer = BytesIO()
+    Image.new("RGB", size, color=(0, 128, 0)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def clean(name, content, **kwargs):
+    '''Clean an upload with a SafeImageField and return the error codes'''
+    field = SafeImageField(**kwargs)
+    try:
+        field.clean(SimpleUploadedFile(name, content))
+    except ValidationError as e:
+        return [error.code for error in e.error_list]
+    return []
+
+
+class TestSafeImageField:
+    '''Tests for validating images from their header'''
+    def test_valid_images(self):
+        """Test that real images with a matching extension are accepted"""
+        assert clean("foto.jpg", create_image_content("JPEG")) == []
+        assert clean("foto.png", create_image_content("PNG")) == []
+        assert clean("foto.webp", create_image_content("WEBP")) == []
+
+    def test_multi_picture_jpeg(self):
+        """Test that a JPEG holding several pictures, as phone cameras make, is a JPEG"""
+        buffer = BytesIO()
+        pictures = [Image.new("RGB", (100, 100), color=(0, 128, 0)) for _ in range(2)]
+        pictures[0].save(buffer, "MPO", save_all=True, append_images=pictures[1:])
+        field = SafeImageField()
+
+        upload = field.clean(SimpleUploadedFile("foto.jpg", buffer.getvalue()))
+
+        assert upload.content_type == "image/jpeg"
+
+    def test_decompression_bomb_is_refused(self):
+        """Test that a small file declaring gigapixel dimensions is refused"""
+        content = create_png_bomb()
+        assert len(content) < 1024
+
+        assert clean("bom.png", content) == ["too_many_pixels"]
+
+    def test_pixel_limit(self, settings):
+        """Test that an image just over the configured number of pixels is refused"""
+        settings.MAX_IMAGE_PIXELS = 100 * 99
+
+        assert clean("foto.png", create_image_content("PNG", (100, 100))) == ["too_many_pixels"]
+
+    def test_extension_must_match_content(self):
+        """Test that a PNG named .jpg is refused"""
+        assert clean("foto.jpg", create_image_content("PNG")) == ["format_mismatch"]
+
+    def test_not_an_image(self):
+        """Test that a file that is no image is refused"""
+        assert clean("foto.jpg", b"\xff\xd8\xff geen afbeelding") == ["invalid_image"]
+
+    def test_allowed_extensions(self):
+        """Test that only the allowed extensions are accepted"""
+        assert clean("foto.gif", create_image_content("GIF"), allowed_extensions=[".png"]) == [
+            "invalid_extension"
+        ]
+
+    def test_magic_bytes(self):
+        """Test that formats are recognised from their first bytes"""
+        assert format_from_magic(create_image_content("JPEG")[:12]) == "JPEG"
+        assert format_from_magic(create_image_content("WEBP")[:12]) == "WEBP"
+        assert format_from_magic(b"%PDF-1.7") is None
+
+
+class TestSizeLimitedUploadHandler:
+    '''Tests for discarding oversized uploads while they are received'''
+    def receive(self, size, limit, settings):
+        '''Feed an upload of the given size to the handler in chunks'''
+        settings.MAX_IMAGE_UPLOAD_SIZE = limit
+        handler = SizeLimitedUploadHandler()
+        handler.new_file("image", "foto.jpg", "image/jpeg", size)
+        passed_on = 0
+        for start in range(0, size, 64):
+            chunk = handler.receive_data_chunk(b"x" * min(64, size - start), start)
+            passed_on += len(chunk) if chunk else 0
+        return handler.file_complete(size), passed_on
+
+    def test_small_upload_is_passed_on(self, settings):
+        """Test that an upload within the limit is left to the next handlers"""
+        upload, passed_on = self.receive(256, 1024, settings)
+
+        assert upload is None
+        assert passed_on == 256
+
+    def test_large_upload_is_discarded(self, settings):
+        """Test that an oversized upload stops being passed on and is replaced"""
+        upload, passed_on = self.receive(4096, 1024, settings)
+
+        assert isinstance(upload, OversizedUploadedFile)
+        assert upload.size == 4096
+        assert passed_on <= 1024
+
+
+class TestUploadSites:
+    '''Tests for the validation at the places where images are uploaded'''
+    def test_oversized_photo_upload_is_refused(self, client, settings, temporary_media_root):
+        """Test that an oversized photo posted to the upload view is refused"""
+        settings.MAX_IMAGE_UPLOAD_SIZE = 1024
+        activity = StreetActivityFactory()
+        upload = SimpleUploadedFile("foto.jpg", create_image_content("JPEG", (500, 500)))
+
+        response = client.post(
+            reverse("create-streetactivity-photo", kwargs={"activity_id": activity.id}),
+            {"image": upload},
+        )
+
+        assert "Bestand is te groot." in response.text
+        assert not StreetActivityPhoto.objects.exists()
+
+    def test_bomb_portrait_is_refused(self, temporary_media_root):
+        """Test that the persona form refuses a decompression bomb as portrait"""
+        form = PersonaForm(
+            data={"title": "Titel", "core_question": "Vraag?", "description": "Beschrijving"},
+            files={"portrait": SimpleUploadedFile("portret.png", create_png_bomb())},
+        )
+
+        assert not form.is_valid()
+        assert "megapixels" in str(form.errors["portrait"])
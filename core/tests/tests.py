@@ -1,5 +1,9 @@
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from streetactivity.featured import rotation_cache_key
 from travelingguestbook.factories import (
     StreetActivityFactory,
     StreetActivityPhotoFactory,
@@ -31,3 +35,39 @@ class TestHome:
             StreetActivityPhotoFactory()
         response = client.get(reverse('home'))
         assert len(response.context['photos']) == 4
+
+    def test_featured_activities_stay_the_same_within_a_rotation(self, client):
+        """Test that the featured activities are only drawn once per time window"""
+        StreetActivityFactory.create_batch(10)
+        first = client.get(reverse('home')).context['featured_activities']
+        second = client.get(reverse('home')).context['featured_activities']
+        assert first == second
+        assert client.get(reverse('home')).context['activities_remaining'] == 6
+
+    def test_home_does_not_order_at_random(self, client, temporary_media_root):
+        """Test that rendering the home page runs no random ordering or count queries"""
+        StreetActivityFactory.create_batch(5)
+        StreetActivityPhotoFactory.create_batch(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('home'))
+
+        for query in queries:
+            assert 'RANDOM()' not in query['sql'].upper()
+            assert 'COUNT(' not in query['sql'].upper()
+
+    def test_new_activity_draws_new_rotation(self, client):
+        """Test that the total is updated when an activity is added"""
+        StreetActivityFactory.create_batch(5)
+        assert client.get(reverse('home')).context['activities_remaining'] == 1
+        StreetActivityFactory()
+        assert client.get(reverse('home')).context['activities_remaining'] == 2
+
+    def test_rotation_is_shared_between_workers(self, client):
+        """Test that the selection is kept in the cache shared by the workers"""
+        StreetActivityFactory.create_batch(5)
+        featured = client.get(reverse('home')).context['featured_activities']
+
+        rotation = caches['shared'].get(rotation_cache_key())
+        assert rotation == {'pks': [activity.pk for activity in featured], 'total': 5}
+        assert cache.get(rotation_cache_key()) is None
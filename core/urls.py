@@ -7,5 +7,8 @@ urlpatterns = [
     path('contact/', views.ContactView.as_view(), name='contact'),
     path('overons/', views.AboutView.as_view(), name='about'),
     path('help/', views.HelpView.as_view(), name='help'),
+    path('api/sync/', views.SyncAPIView.as_view(), name='sync-api'),
+    path('api/cache/', views.ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    path('api/toestemming/', views.ConsentStatsView.as_view(), name='consent-stats'),
     path('cookie-consent/', views.save_cookie_consent, name='cookie-consent'),
 ]
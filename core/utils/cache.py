@@ -0,0 +1,150 @@
+"""Response caching for API endpoints, invalidated by a generation per model in the cache
+shared by the workers."""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+STATS_KEY = "response-cache:stats:{name}:{outcome}"
+# Names of the viewsets using CachedResponseMixin, for the statistics
+CACHED_VIEWS = []
+# Response headers stored with the data, needed to answer conditional requests
+CACHED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def response_cache():
+    """The cache shared by the workers holding the generations and responses"""
+    return caches["responses"]
+
+
+def generation_key(model):
+    """Cache key of the generation of a model"""
+    return f"generation:{model._meta.label_lower}"
+
+
+def get_generations(models):
+    """The current generation of each model, starting the ones that are not cached yet"""
+    cache = response_cache()
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Started from the time, so an evicted generation never returns to an old number
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def increment(key):
+    """Increment a generation, restarting it when it was evicted"""
+    cache = response_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def bump_generation(model):
+    """Make every cached response built from the model unreachable. The generation is
+    bumped again when the transaction commits, since a request running in between
+    may have cached what it read before the commit under the bumped generation."""
+    key = generation_key(model)
+    increment(key)
+    transaction.on_commit(lambda: increment(key))
+
+
+def response_cache_timeout():
+    """Seconds after which an unused response is removed to free space"""
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+def count(name, outcome):
+    """Count a hit or miss of the response cache of a view"""
+    cache = response_cache()
+    key = STATS_KEY.format(name=name, outcome=outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.add(key, 1, None)
+
+
+def response_cache_stats(names=None):
+    """The number of hits and misses of the response cache of each named view,
+    by default of every viewset using CachedResponseMixin"""
+    names = CACHED_VIEWS if names is None else names
+    keys = {
+        (name, outcome): STATS_KEY.format(name=name, outcome=outcome)
+        for name in names for outcome in ("hits", "misses")
+    }
+    counts = response_cache().get_many(keys.values())
+    return {
+        name: {outcome: counts.get(keys[name, outcome], 0) for outcome in ("hits", "misses")}
+        for name in names
+    }
+
+
+class CachedResponseMixin:
+    """Cache the responses of the list and retrieve actions of a viewset.
+
+    cache_models lists the models the responses are built from. The X-Cache header
+    of a response tells whether it came from the cache, and response_cache_stats
+    counts the hits and misses per viewset."""
+
+    cache_models = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Register the viewset for the statistics"""
+        super().__init_subclass__(**kwargs)
+        CACHED_VIEWS.append(cls.__name__)
+
+    def get_response_cache_key(self, request):
+        """Cache key of the response to a request, for the current generations"""
+        generations = get_generations(self.cache_models or [self.get_queryset().model])
+        url = request.build_absolute_uri()
+        digest = hashlib.sha1(
+            f"{url}|{request.accepted_renderer.format}".encode(), usedforsecurity=False
+        ).hexdigest()
+        return f"response:{type(self).__name__}:{'.'.join(map(str, generations))}:{digest}"
+
+    def cached_response(self, action, request, *args, **kwargs):
+        """Return the cached response, or build, cache and return it"""
+        name = type(self).__name__
+        cache = response_cache()
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            count(name, "hits")
+            data, headers = cached
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+            ) or Response(data)
+            for header, value in headers.items():
+                response[header] = value
+            response["X-Cache"] = "HIT"
+            return response
+
+        count(name, "misses")
+        response = getattr(super(), action)(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {header: response[header] for header in CACHED_HEADERS if header in response}
+            cache.set(key, (response.data, headers), response_cache_timeout())
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """List the objects from the cache when possible"""
+        return self.cached_response("list", request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve the object from the cache when possible"""
+        return self.cached_response("retrieve", request, *args, **kwargs)
@@ -1,5 +1,284 @@
-# streetgame/mixins.py
-from django.db.models import Count
+"""Mixins shared by the views of the apps: conditional GET, sparse fieldsets and bulk writes."""
+
+import hashlib
+
+from django.contrib import messages
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
-from streetactivity.models import Reflection, StreetActivity
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.utils.cache import bump_generation
+
+
+def make_etag(*parts):
+    """Quoted ETag that changes whenever one of the parts changes"""
+    digest = hashlib.sha1(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def latest(*timestamps):
+    """The most recent of the timestamps that are set, or None"""
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+
+def set_validators(response, etag, last_modified):
+    """Add the validators to a response, asking clients to revalidate before reuse"""
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """The 304 response when the client has the current version, otherwise None"""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """Answer GET requests of a template view with 304 when the page did not change.
+
+    Views implement get_validators, returning the values the page depends on and the
+    time it was last modified, without loading what the page renders. By default a
+    detail view depends on the date_modified of its object only. The logged in user is
+    part of the ETag, since the navigation bar shows the user name."""
+
+    def get_validators(self):
+        """Return a tuple of the values the page depends on and its last modification time"""
+        queryset = self.get_queryset() if hasattr(self, "get_object") else None
+        if queryset is None or "date_modified" not in {f.name for f in queryset.model._meta.fields}:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} must implement get_validators, the default only "
+                "works for detail views of a model with date_modified."
+            )
+        instance = self.get_object(queryset.only("date_modified"))
+        return (instance.pk, instance.date_modified), instance.date_modified
+
+    def get(self, request, *args, **kwargs):
+        """Check the validators before rendering the page"""
+        # A pending message is shown once, so that page has to be rendered
+        if messages.get_messages(request):
+            return super().get(request, *args, **kwargs)
+
+        parts, last_modified = self.get_validators()
+        etag = make_etag(type(self).__name__, request.user.pk, *parts)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = set_validators(super().get(request, *args, **kwargs), etag, last_modified)
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+
+class ConditionalRetrieveMixin:
+    """Answer GET requests of a DRF retrieve endpoint with 304 when the object did not change.
+
+    The ETag is derived from the fields listed in etag_fields, date_modified by default,
+    which the object that retrieve loads anyway already contains."""
+
+    etag_fields = ("date_modified",)
+
+    def get_validators(self, instance):
+        """Return the ETag and last modification time of an object"""
+        parts = [getattr(instance, field) for field in self.etag_fields]
+        # The fields the client asked for are part of the representation
+        query = sorted(self.request.query_params.lists())
+        return (
+            make_etag(instance._meta.label, instance.pk, query, *parts),
+            getattr(instance, "date_modified", None),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Check the validators before serializing the object"""
+        # Expanded related objects change without changing the object itself
+        if self.request.query_params.get("expand"):
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        etag, last_modified = self.get_validators(instance)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), etag, last_modified)
+
+
+def query_list(request, parameter):
+    """The comma separated names in a query parameter"""
+    value = request.query_params.get(parameter, "")
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """Let the client of a viewset choose fields with ?fields= and inline relations with ?expand=.
+
+    The serializer must use DynamicFieldsMixin. Only the chosen columns are loaded,
+    together with the primary key and the fields that pagination and the ETag of
+    ConditionalRetrieveMixin need; expanded relations are loaded with select_related
+    or prefetch_related. Writes always use the full serializer."""
+
+    def get_sparse_fieldset(self):
+        """The requested fields and expanded relations, checked against the serializer"""
+        if self.request.method not in ("GET", "HEAD"):
+            return [], []
+        serializer_class = self.get_serializer_class()
+        fields = query_list(self.request, "fields")
+        expand = query_list(self.request, "expand")
+        errors = {}
+        unknown = set(fields) - set(serializer_class().fields) - set(expand)
+        if unknown:
+            errors["fields"] = [f"Onbekende velden: {', '.join(sorted(unknown))}"]
+        unknown = set(expand) - set(serializer_class.expandable_fields())
+        if unknown:
+            errors["expand"] = [f"Niet uit te breiden: {', '.join(sorted(unknown))}"]
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+    def get_queryset(self):
+        """Load only the requested columns and the expanded relations"""
+        queryset = super().get_queryset()
+        fields, expand = self.get_sparse_fieldset()
+        model_fields = {field.name: field for field in queryset.model._meta.get_fields()}
+        for name in expand:
+            if model_fields[name].many_to_one or model_fields[name].one_to_one:
+                queryset = queryset.select_related(name)
+            else:
+                queryset = queryset.prefetch_related(name)
+        if fields:
+            ordering = getattr(self.pagination_class, "ordering", ())
+            etag_fields = getattr(self, "etag_fields", ()) if self.action == "retrieve" else ()
+            needed = {
+                queryset.model._meta.pk.name,
+                *(field.lstrip("-") for field in ordering),
+                *etag_fields,
+                *fields,
+                *expand,
+            }
+            queryset = queryset.only(*(
+                name for name in needed
+                if name in model_fields and model_fields[name].concrete
+            ))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        """Pass the requested fields and expanded relations to the serializer"""
+        fields, expand = self.get_sparse_fieldset()
+        if fields or expand:
+            kwargs.update(fields=fields, expand=expand)
+        return super().get_serializer(*args, **kwargs)
+
+
+class BulkWriteMixin:
+    """Let a viewset create or update many objects in a single request.
+
+    A POST with a list creates all objects with bulk_create, a PATCH on the list url
+    (see core.utils.routers.BulkRouter) updates the objects identified by the id in
+    each item with bulk_update. Nothing is written unless every item is valid; the
+    errors are returned as a list in the order of the items, empty for valid items.
+    bulk_create and bulk_update send no signals, so the generation of the model is
+    bumped for the response cache here, and viewsets do in bulk_created and
+    bulk_updated what their other signal receivers would have done."""
+
+    bulk_limit = 500
+
+    def check_bulk_items(self, items):
+        """Refuse a request body that is not a list or holds too many items"""
+        if not isinstance(items, list):
+            raise ValidationError({"non_field_errors": ["Verwacht een lijst met objecten."]})
+        if len(items) > self.bulk_limit:
+            raise ValidationError(
+                {"non_field_errors": [f"Maximaal {self.bulk_limit} objecten per verzoek."]}
+            )
+
+    def bulk_created(self, objects):
+        """Called within the transaction after the objects were created"""
+
+    def bulk_updated(self, objects):
+        """Called within the transaction after the objects were updated"""
+
+    def create(self, request, *args, **kwargs):
+        """Create one object, or all objects of a list"""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        self.check_bulk_items(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.child.preload_related(request.data)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            objects = model.objects.bulk_create(
+                [model(**data) for data in serializer.validated_data]
+            )
+            self.bulk_created(objects)
+        bump_generation(model)
+        return Response(
+            self.get_serializer(objects, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+    def get_bulk_instances(self, items):
+        """The objects to update by the id in each item, None for unknown or repeated ids"""
+        ids = []
+        for item in items:
+            try:
+                ids.append(int(item["id"]))
+            except (TypeError, KeyError, ValueError):
+                ids.append(None)
+        found = self.get_queryset().in_bulk([pk for pk in ids if pk is not None])
+        instances, seen = [], set()
+        for pk in ids:
+            instances.append(found.get(pk) if pk not in seen else None)
+            seen.add(pk)
+        return instances
+
+    def bulk_update(self, request, *args, **kwargs):
+        """Partially update the objects in a list, each identified by its id"""
+        self.check_bulk_items(request.data)
+        serializers, errors = [], []
+        # Related objects of all items are looked up once, by the first serializer
+        preloaded = None
+        for item, instance in zip(request.data, self.get_bulk_instances(request.data)):
+            if instance is None:
+                errors.append({"id": ["Onbekend of herhaald id."]})
+                continue
+            self.check_object_permissions(request, instance)
+            serializer = self.get_serializer(instance, data=item, partial=True)
+            preloaded = serializer.preload_related(request.data, preloaded)
+            errors.append({} if serializer.is_valid() else serializer.errors)
+            serializers.append(serializer)
+        if any(errors):
+            raise ValidationError(errors)
+
+        model = self.get_queryset().model
+        objects, fields = [], set()
+        for serializer in serializers:
+            for name, value in serializer.validated_data.items():
+                setattr(serializer.instance, name, value)
+                fields.add(name)
+            objects.append(serializer.instance)
+        # bulk_update does not set auto_now fields like save does
+        now = timezone.now()
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False):
+                for instance in objects:
+                    setattr(instance, field.attname, now)
+                fields.add(field.name)
+
+        with transaction.atomic():
+            if objects and fields:
+                model.objects.bulk_update(objects, sorted(fields))
+            self.bulk_updated(objects)
+        bump_generation(model)
+        return Response(self.get_serializer(objects, many=True).data)
@@ -0,0 +1,110 @@
+"""Token bucket rate limiting of writes by anonymous visitors, per session and IP address."""
+
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+
+# Methods that write, the others are never limited
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def write_rate_limit():
+    """The capacity of a session bucket and the seconds it takes to refill completely"""
+    return getattr(settings, "WRITE_RATE_LIMIT", (20, 60))
+
+
+def bucket_keys(request, scope):
+    """Cache keys of the buckets of the visitor with their capacity"""
+    capacity, _seconds = write_rate_limit()
+    keys = {
+        f"ratelimit:{scope}:ip:{request.META.get('REMOTE_ADDR')}":
+            capacity * getattr(settings, "RATE_LIMIT_IP_MULTIPLIER", 5),
+    }
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        keys[f"ratelimit:{scope}:session:{session.session_key}"] = capacity
+    return keys
+
+
+def take_token(request, scope="write"):
+    """Take a token from the buckets of the visitor for a write. Returns 0 when the
+    request may proceed, otherwise the seconds until a token is available again.
+    Reads and requests of logged in users are not limited."""
+    if request.method not in WRITE_METHODS or request.user.is_authenticated:
+        return 0
+    _capacity, seconds = write_rate_limit()
+    keys = bucket_keys(request, scope)
+    cache = caches["ratelimit"]
+    now = time.time()
+    buckets = cache.get_many(keys)
+    wait, taken = 0, {}
+    for key, size in keys.items():
+        # Every bucket refills completely in the same time, a larger one at a higher rate
+        rate = size / seconds
+        tokens, updated = buckets.get(key, (size, now))
+        tokens = min(size, tokens + (now - updated) * rate)
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) / rate)
+        taken[key] = (tokens - 1, now)
+    if wait:
+        return wait
+    # Untouched buckets are full again after this time, the same as a missing one
+    cache.set_many(taken, seconds)
+    return 0
+
+
+def too_many_requests(wait):
+    """The 429 response to a rejected request"""
+    retry_after = math.ceil(wait)
+    response = HttpResponse(
+        f"Te veel verzoeken. Probeer het over {retry_after} seconden opnieuw.",
+        status=429,
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def rate_limit(view, scope="write"):
+    """Decorator limiting the writes to a function based view"""
+    @wraps(view)
+    def limited(request, *args, **kwargs):
+        """Reject the write when the visitor has no tokens left"""
+        wait = take_token(request, scope)
+        if wait:
+            return too_many_requests(wait)
+        return view(request, *args, **kwargs)
+    return limited
+
+
+class RateLimitMixin:
+    """Limit the writes to a class based view"""
+
+    rate_limit_scope = "write"
+
+    def dispatch(self, request, *args, **kwargs):
+        """Reject the write before the view does any work when the visitor has no tokens left"""
+        wait = take_token(request, self.rate_limit_scope)
+        if wait:
+            return too_many_requests(wait)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Limit the writes to the API with the same buckets as the views"""
+
+    scope = "write"
+
+    def allow_request(self, request, view):
+        """Allow the request while the visitor has tokens left"""
+        self.wait_seconds = take_token(request, self.scope)
+        return not self.wait_seconds
+
+    def wait(self):
+        """Seconds until the visitor may write again, for Retry-After"""
+        return self.wait_seconds
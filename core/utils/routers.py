@@ -0,0 +1,13 @@
+from rest_framework import routers
+
+
+class BulkRouter(routers.DefaultRouter):
+    """Router that also routes PATCH on the list url of a viewset to its bulk_update,
+    for viewsets using BulkWriteMixin. Viewsets without bulk_update are routed as usual."""
+
+    routes = [
+        routers.DefaultRouter.routes[0]._replace(
+            mapping={**routers.DefaultRouter.routes[0].mapping, "patch": "bulk_update"}
+        ),
+        *routers.DefaultRouter.routes[1:],
+    ]
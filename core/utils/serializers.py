@@ -0,0 +1,62 @@
+"""Serializers whose fields and expanded relations the client chooses."""
+
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that takes related objects from a preloaded mapping
+    when possible, and looks up the others as usual"""
+
+    preloaded = None
+
+    def to_internal_value(self, data):
+        """Return the preloaded object with the given primary key"""
+        if self.preloaded is not None and str(data) in self.preloaded:
+            return self.preloaded[str(data)]
+        return super().to_internal_value(data)
+
+
+class DynamicFieldsMixin:
+    """Mixin for model serializers that limits the fields to the ones asked for
+    and inlines expanded relations"""
+
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = self.expandable_fields()
+        for name in expand:
+            relation = self.Meta.model._meta.get_field(name)
+            self.fields[name] = import_string(expandable[name])(
+                many=relation.one_to_many or relation.many_to_many, read_only=True
+            )
+        if fields:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+    @classmethod
+    def expandable_fields(cls):
+        """The relations that may be expanded, with the path of their serializer"""
+        return getattr(cls.Meta, "expandable_fields", {})
+
+    def preload_related(self, items, preloaded=None):
+        """Look up the related objects that the items refer to, one query per relation.
+        Returns the lookups, which other serializers of the same items can reuse by
+        passing them as preloaded instead of querying again."""
+        if preloaded is None:
+            preloaded = {}
+            for name, field in self.fields.items():
+                if not isinstance(field, PreloadedPrimaryKeyRelatedField) or field.read_only:
+                    continue
+                pks = {
+                    str(item[name]) for item in items
+                    if isinstance(item, dict) and isinstance(item.get(name), (int, str))
+                }
+                pks = [pk for pk in pks if pk.isdigit()]
+                preloaded[name] = {
+                    str(pk): related for pk, related in field.get_queryset().in_bulk(pks).items()
+                }
+        for name, related in preloaded.items():
+            self.fields[name].preloaded = related
+        return preloaded
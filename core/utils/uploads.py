@@ -0,0 +1,168 @@
+"""Validation of uploaded images from their size and header, without decoding the pixels."""
+
+import os
+import warnings
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+
+# Pillow format names by file extension
+IMAGE_FORMATS = {
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".png": "PNG",
+    ".gif": "GIF",
+    ".webp": "WEBP",
+}
+
+# Pillow formats that are stored as one of IMAGE_FORMATS, such as the multi-picture
+# JPEGs of phone cameras
+FORMAT_ALIASES = {
+    "MPO": "JPEG",
+}
+
+# Enough of the start of a file to recognise its format
+MAGIC_LENGTH = 12
+
+
+def max_upload_size():
+    """Largest accepted image upload in bytes"""
+    return getattr(settings, "MAX_IMAGE_UPLOAD_SIZE", 5 * 1024 * 1024)
+
+
+def max_image_pixels():
+    """Largest accepted number of pixels, width times height"""
+    return getattr(settings, "MAX_IMAGE_PIXELS", 40_000_000)
+
+
+def format_from_magic(head):
+    """Return the Pillow format name the first bytes of a file belong to, or None"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def read_image_header(file):
+    """Return the format, width and height from the header of an image file,
+    without decoding its pixels. Aliases are returned as the format they are stored as. Raises ValueError when the header is not readable,
+    and Image.DecompressionBombError for dimensions far beyond the limit of Pillow."""
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            # The pixel limit is checked by the caller, with a clear message
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(file) as image:
+                return FORMAT_ALIASES.get(image.format, image.format), image.width, image.height
+    except (OSError, SyntaxError) as e:
+        raise ValueError(str(e)) from e
+    finally:
+        file.seek(0)
+
+
+class OversizedUploadedFile(UploadedFile):
+    """Stand-in for an upload that exceeded the size limit and was not stored"""
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(BytesIO(), name, content_type, size, charset, content_type_extra)
+
+
+class SizeLimitedUploadHandler(FileUploadHandler):
+    """Upload handler that discards an upload once it exceeds MAX_IMAGE_UPLOAD_SIZE.
+    It must come first in FILE_UPLOAD_HANDLERS, so the handlers storing the
+    upload in memory or on disk stop receiving its data."""
+
+    def new_file(self, *args, **kwargs):
+        """Start counting a new upload"""
+        super().new_file(*args, **kwargs)
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        """Pass the data on to the next handler until the upload is too large"""
+        if start + len(raw_data) > max_upload_size():
+            self.oversized = True
+        return None if self.oversized else raw_data
+
+    def file_complete(self, file_size):
+        """Hand an empty file with the real size to the form when the upload was too large"""
+        if not self.oversized:
+            return None
+        return OversizedUploadedFile(
+            self.file_name, self.content_type, file_size, self.charset, self.content_type_extra
+        )
+
+
+class SafeImageField(forms.ImageField):
+    """Image form field that validates an upload from its size and header only"""
+
+    default_error_messages = {
+        "file_too_large": "Afbeelding mag niet groter zijn dan %(max_size)sMB",
+        "invalid_extension": "Ongeldige bestandsextensie. Toegestaan: %(extensions)s.",
+        "format_mismatch": "De inhoud van het bestand past niet bij de extensie %(extension)s.",
+        "too_many_pixels": "Afbeelding is te groot: maximaal %(max_megapixels)s megapixels.",
+    }
+
+    def __init__(self, *, allowed_extensions=None, **kwargs):
+        self.allowed_extensions = allowed_extensions or list(IMAGE_FORMATS)
+        super().__init__(**kwargs)
+
+    def too_many_pixels_error(self):
+        """Error for an image whose dimensions are too large to decode safely"""
+        return forms.ValidationError(
+            self.error_messages["too_many_pixels"],
+            code="too_many_pixels",
+            params={"max_megapixels": max_image_pixels() // 1_000_000},
+        )
+
+    def to_python(self, data):
+        """Check the size, extension, magic bytes and dimensions of the upload.
+        Unlike ImageField, the image is not loaded, only its header is read."""
+        upload = forms.FileField.to_python(self, data)
+        if upload is None:
+            return None
+
+        if upload.size > max_upload_size():
+            raise forms.ValidationError(
+                self.error_messages["file_too_large"],
+                code="file_too_large",
+                params={"max_size": max_upload_size() // (1024 * 1024)},
+            )
+
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in self.allowed_extensions:
+            raise forms.ValidationError(
+                self.error_messages["invalid_extension"],
+                code="invalid_extension",
+                params={"extensions": ", ".join(e.lstrip(".").upper() for e in self.allowed_extensions)},
+            )
+
+        upload.seek(0)
+        magic_format = format_from_magic(upload.read(MAGIC_LENGTH))
+        try:
+            image_format, width, height = read_image_header(upload)
+        except ValueError as e:
+            raise forms.ValidationError(
+                self.error_messages["invalid_image"], code="invalid_image"
+            ) from e
+        except Image.DecompressionBombError as e:
+            raise self.too_many_pixels_error() from e
+        if magic_format is None or magic_format != image_format or image_format != IMAGE_FORMATS[extension]:
+            raise forms.ValidationError(
+                self.error_messages["format_mismatch"],
+                code="format_mismatch",
+                params={"extension": extension},
+            )
+
+        if width * height > max_image_pixels():
+            raise self.too_many_pixels_error()
+
+        upload.content_type = Image.MIME.get(image_format)
+        return upload
@@ -1,12 +1,23 @@
 import json
 
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_POST
 from django.views.generic import TemplateView
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from streetactivity.models import Reflection, StreetActivity, StreetActivityPhoto
+from streetactivity.featured import get_featured_activities
+from streetactivity.models import Reflection
+from streetactivity.sampling import random_photos
 
-from .models import CookieConsentLog
+from .consent import CONSENT_LOGGED_COOKIE, buffer_consent, consent_hash, consent_ratios
+from .utils.cache import response_cache_stats
+from .utils.ratelimit import rate_limit
+from .sync import changes_since
 
 
 class HomeView(TemplateView):
@@ -16,11 +27,11 @@ class HomeView(TemplateView):
     def get_context_data(self, **kwargs):
         """Add recent reflections and random activities to the home page"""
         context = super().get_context_data(**kwargs)
-        featured_activities = StreetActivity.objects.order_by('?')
+        featured_activities, activities_remaining = get_featured_activities()
         context['recent_reflections'] = Reflection.objects.select_related('activity').all()[:3]
-        context['featured_activities'] = featured_activities[:4]
-        context['activities_remaining'] = max(0, featured_activities.count() - 4)
-        context['photos'] = StreetActivityPhoto.objects.order_by('?')[:4]
+        context['featured_activities'] = featured_activities
+        context['activities_remaining'] = activities_remaining
+        context['photos'] = random_photos(4)
         return context
 
 class HelpView(TemplateView):
@@ -35,16 +46,59 @@ class AboutView(TemplateView):
     """Renders the about page"""
     template_name = 'core/about.html'
 
+class SyncAPIView(APIView):
+    """API endpoint returning what changed since the watermark of the previous sync"""
+
+    def get(self, request):
+        """Return the changed objects, the ids of deleted objects and the next watermark"""
+        since = None
+        if request.query_params.get("since"):
+            try:
+                since = parse_datetime(request.query_params["since"])
+            except ValueError:
+                pass
+            if since is None:
+                raise ValidationError({"since": ["Ongeldig watermerk."]})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        return Response(changes_since(since, context={"request": request}))
+
+class ResponseCacheStatsView(APIView):
+    """API endpoint for staff showing how often cached API responses were used"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Return the hits and misses of the response cache per viewset"""
+        return Response(response_cache_stats())
+
+class ConsentStatsView(APIView):
+    """API endpoint for staff showing which cookie categories visitors accept"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Return the accepted and declined consents per category over the last days"""
+        try:
+            days = int(request.query_params.get("dagen", 30))
+        except ValueError:
+            raise ValidationError({"dagen": ["Geef een aantal dagen."]}) from None
+        return Response({"days": days, "categories": consent_ratios(days)})
+
 @require_POST
+@rate_limit
 def save_cookie_consent(request):
-    """Saves the user's cookie consent and logs it in the database"""
+    """Saves the user's cookie consent and buffers it for the consent log,
+    unless it is the consent this browser already submitted"""
     try:
         data = json.loads(request.body.decode('utf-8'))
     except Exception:
         return JsonResponse({'ok': False}, status=400)
-    CookieConsentLog.objects.create(
-        user = request.user if request.user.is_authenticated else None,
+    digest = consent_hash(data)
+    if request.COOKIES.get(CONSENT_LOGGED_COOKIE) == digest:
+        return JsonResponse({'ok': True})
+    # Inserted later by the flush_consent_logs worker, so the click never waits for the database
+    buffer_consent(
         consent = data,
+        user_id = request.user.pk if request.user.is_authenticated else None,
         ip = request.META.get('REMOTE_ADDR'),
         user_agent = request.META.get('HTTP_USER_AGENT', '')[:1000]
     )
@@ -55,4 +109,11 @@ def save_cookie_consent(request):
                     path='/',
                     samesite='Lax',
                     secure=True)
+    resp.set_cookie(CONSENT_LOGGED_COOKIE,
+                    digest,
+                    max_age=365*24*3600,
+                    path='/',
+                    samesite='Lax',
+                    secure=True,
+                    httponly=True)
     return resp
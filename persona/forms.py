@@ -1,5 +1,7 @@
 from django import forms
 
+from core.utils.uploads import SafeImageField
+
 from .models import Persona, Problem, Reaction
 
 
@@ -19,6 +21,7 @@ class PersonaForm(forms.ModelForm):
         help_texts = {
             'portrait': 'Upload een portret foto voor deze persoonstype (optioneel)',
         }
+        field_classes = {"portrait": SafeImageField}
 
 
 class ProblemForm(forms.ModelForm):
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_from_date_created(apps, schema_editor):
+    """Existing problems and reactions were never edited, so they were last modified when created"""
+    for name in ("Problem", "Reaction"):
+        apps.get_model("persona", name).objects.update(date_modified=F("date_created"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0002_persona_portrait'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='reaction',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='persona',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(start_from_date_created, migrations.RunPython.noop),
+    ]
@@ -23,7 +23,7 @@ class Persona(models.Model):
         verbose_name="Portret foto"
     )
     date_created = models.DateTimeField(auto_now_add=True)
-    date_modified = models.DateTimeField(auto_now=True)
+    date_modified = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         """Persona is represented by its title."""
@@ -45,6 +45,7 @@ class Problem(models.Model):
     persona = models.ForeignKey(Persona, on_delete=models.CASCADE, related_name='problems')
     description = models.TextField()
     date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         """Problems are ordered by most recent first."""
@@ -59,6 +60,7 @@ class Reaction(models.Model):
     persona = models.ForeignKey(Persona, on_delete=models.CASCADE, related_name='reactions')
     description = models.TextField()
     date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         """Reactions are ordered by most recent first."""
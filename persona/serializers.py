@@ -1,22 +1,30 @@
 from rest_framework import serializers
 
+from core.utils.serializers import DynamicFieldsMixin
+
 from .models import Persona, Problem, Reaction
 
 
-class PersonaSerializer(serializers.ModelSerializer):
+class PersonaSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer to convert Persona instance to JSON"""
     class Meta:
         model = Persona
         fields = '__all__'
+        expandable_fields = {
+            'problems': 'persona.serializers.ProblemSerializer',
+            'reactions': 'persona.serializers.ReactionSerializer',
+        }
 
-class ProblemSerializer(serializers.ModelSerializer):
+class ProblemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer to convert Problem instance to JSON"""
     class Meta:
         model = Problem
         fields = '__all__'
+        expandable_fields = {'persona': 'persona.serializers.PersonaSerializer'}
 
-class ReactionSerializer(serializers.ModelSerializer):
+class ReactionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer to convert Reaction instance to JSON"""
     class Meta:
         model = Reaction
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {'persona': 'persona.serializers.PersonaSerializer'}
\ No newline at end of file
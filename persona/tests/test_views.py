@@ -16,6 +16,21 @@ class TestPersonaViews:
         assert persona1 in personas
         assert persona2 in personas
 
+    def test_persona_list_view_query_count(self, client, django_assert_num_queries):
+        """Test that the list runs the same queries for any number of personas"""
+        for _ in range(5):
+            persona = PersonaFactory()
+            ProblemFactory.create_batch(4, persona=persona)
+            ReactionFactory.create_batch(2, persona=persona)
+
+        with django_assert_num_queries(3):
+            response = client.get(reverse('persona-list'))
+
+        assert response.content.decode().count('... en 1 meer') == 5
+        persona = response.context['personas'][0]
+        assert len(persona.top_problems) == 3
+        assert persona.reaction_count == 2
+
     def test_persona_create_view(self, client):
         """Test the persona create view"""
 
@@ -267,3 +282,50 @@ class TestProblemDeleteView:
 
         # Check if problem was deleted
         assert persona.problems.count() == 0
+
+
+class TestPersonaApi:
+    """Tests for choosing fields and expanding relations in the persona API."""
+    def test_expand_problems_and_reactions(self, client, django_assert_num_queries):
+        """Test that problems and reactions are inlined with one query each."""
+        persona = PersonaFactory()
+        ProblemFactory.create_batch(2, persona=persona)
+        ReactionFactory(persona=persona)
+
+        with django_assert_num_queries(4):
+            response = client.get(
+                reverse('personas-list'), {'fields': 'title', 'expand': 'problems,reactions'}
+            )
+
+        result = response.json()['results'][0]
+        assert set(result) == {'title', 'problems', 'reactions'}
+        assert len(result['problems']) == 2
+        assert result['reactions'][0]['persona'] == persona.pk
+
+    def test_expand_persona_of_problem(self, client):
+        """Test that a problem can inline its persona."""
+        problem = ProblemFactory()
+
+        response = client.get(reverse('problem-detail', args=[problem.pk]), {'expand': 'persona'})
+
+        assert response.json()['persona']['title'] == problem.persona.title
+
+    def test_bulk_create_problems(self, client):
+        """Test that a list of problems is created in one request."""
+        persona = PersonaFactory()
+        items = [{'persona': persona.pk, 'description': f'Probleem {i}'} for i in range(5)]
+
+        response = client.post(reverse('problem-list'), items, content_type='application/json')
+
+        assert response.status_code == 201
+        assert persona.problems.count() == 5
+
+    def test_bulk_update_reactions(self, client):
+        """Test that PATCH on the reaction list updates every reaction."""
+        reactions = ReactionFactory.create_batch(3)
+        items = [{'id': reaction.pk, 'description': 'Aangepast'} for reaction in reactions]
+
+        response = client.patch(reverse('reaction-list'), items, content_type='application/json')
+
+        assert response.status_code == 200
+        assert {reaction['description'] for reaction in response.json()} == {'Aangepast'}
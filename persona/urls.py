@@ -1,9 +1,10 @@
 from django.urls import include, path
-from rest_framework import routers
+
+from core.utils.routers import BulkRouter
 
 from . import views
 
-router = routers.DefaultRouter()
+router = BulkRouter()
 router.register(r'persona', views.PersonaViewSet, basename='personas')
 router.register(r'problem', views.ProblemViewSet, basename='problem')
 router.register(r'reaction', views.ReactionViewSet, basename='reaction')
@@ -1,34 +1,86 @@
 from django.contrib import messages
+from django.db.models import Count, IntegerField, Max, OuterRef, Prefetch, Subquery
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views import generic
 from rest_framework import viewsets
 
+from core.utils.cache import CachedResponseMixin
+from core.utils.mixins import (
+    BulkWriteMixin,
+    ConditionalGetMixin,
+    ConditionalRetrieveMixin,
+    SparseFieldsetMixin,
+    latest,
+)
+from core.utils.ratelimit import RateLimitMixin
+
 from .forms import PersonaForm, ProblemForm, ReactionForm
 from .models import Persona, Problem, Reaction
 from .serializers import PersonaSerializer, ProblemSerializer, ReactionSerializer
 
 
+def related_summary(model, field):
+    """Subqueries with the number of problems or reactions of the outer persona
+    and when the last of them was modified"""
+    related = (
+        model.objects.filter(persona_id=OuterRef("pk"))
+        .order_by()
+        .values("persona_id")
+        .annotate(count=Count("pk"), newest=Max("date_modified"))
+    )
+    return {
+        f"{field}_count": Subquery(related.values("count"), output_field=IntegerField()),
+        f"{field}_newest": Subquery(related.values("newest")),
+    }
+
+
 class PersonaListView(generic.ListView):
     """View to list all personas."""
     model = Persona
     context_object_name = 'personas'
 
-class PersonaCreateView(generic.CreateView):
+    def get_queryset(self):
+        """Load the first three problems and reactions of all personas with one query
+        each, and count them in the persona query, so the cards need no queries"""
+        return Persona.objects.annotate(
+            problem_count=related_summary(Problem, "problem")["problem_count"],
+            reaction_count=related_summary(Reaction, "reaction")["reaction_count"],
+        ).prefetch_related(
+            Prefetch("problems", queryset=Problem.objects.all()[:3], to_attr="top_problems"),
+            Prefetch("reactions", queryset=Reaction.objects.all()[:3], to_attr="top_reactions"),
+        )
+
+class PersonaCreateView(RateLimitMixin, generic.CreateView):
     """View to create a new persona along with its problems and reactions."""
     model = Persona
     form_class = PersonaForm
 
-class PersonaUpdateView(generic.UpdateView):
+class PersonaUpdateView(RateLimitMixin, generic.UpdateView):
     """View to update an existing persona along with its problems and reactions."""
     model = Persona
     form_class = PersonaForm
 
-class PersonaDetailView(generic.DetailView):
+class PersonaDetailView(ConditionalGetMixin, generic.DetailView):
     """View to display details of a persona."""
     model = Persona
 
-class ProblemCreateView(generic.CreateView):
+    def get_validators(self):
+        """The page shows the persona with its problems and reactions"""
+        row = (
+            Persona.objects.filter(pk=self.kwargs["pk"])
+            .values("date_modified")
+            .annotate(**related_summary(Problem, "problem"), **related_summary(Reaction, "reaction"))
+            .first()
+        )
+        if row is None:
+            raise Http404("Persona niet gevonden")
+        return tuple(row.values()), latest(
+            row["date_modified"], row["problem_newest"], row["reaction_newest"]
+        )
+
+class ProblemCreateView(RateLimitMixin, generic.CreateView):
     """View to create a new problem for a specific persona."""
     model = Problem
     form_class = ProblemForm
@@ -51,7 +103,7 @@ class ProblemCreateView(generic.CreateView):
     def get_success_url(self):
         return reverse_lazy('persona-detail', kwargs={'pk': self.kwargs['persona_pk']})
 
-class ProblemDeleteView(generic.DeleteView):
+class ProblemDeleteView(RateLimitMixin, generic.DeleteView):
     """View to delete a problem."""
     model = Problem
     template_name = 'admin/confirm_delete.html'
@@ -61,7 +113,7 @@ class ProblemDeleteView(generic.DeleteView):
         messages.success(self.request, 'Probleem succesvol verwijderd!')
         return reverse_lazy('persona-detail', kwargs={'pk': persona_pk})
 
-class ReactionCreateView(generic.CreateView):
+class ReactionCreateView(RateLimitMixin, generic.CreateView):
     """View to create a new reaction for a specific persona."""
     model = Reaction
     form_class = ReactionForm
@@ -83,7 +135,7 @@ class ReactionCreateView(generic.CreateView):
     def get_success_url(self):
         return reverse_lazy('persona-detail', kwargs={'pk': self.kwargs['persona_pk']})
 
-class ReactionDeleteView(generic.DeleteView):
+class ReactionDeleteView(RateLimitMixin, generic.DeleteView):
     """View to delete a reaction."""
     model = Reaction
     template_name = 'admin/confirm_delete.html'
@@ -93,17 +145,25 @@ class ReactionDeleteView(generic.DeleteView):
         messages.success(self.request, 'Reactie succesvol verwijderd!')
         return reverse_lazy('persona-detail', kwargs={'pk': persona_pk})
 
-class PersonaViewSet(viewsets.ModelViewSet):
+class PersonaViewSet(
+    CachedResponseMixin, ConditionalRetrieveMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     """API endpoint that allows personas to be viewed or edited."""
     queryset = Persona.objects.all()
     serializer_class = PersonaSerializer
+    # Problems and reactions can be expanded
+    cache_models = (Persona, Problem, Reaction)
 
-class ProblemViewSet(viewsets.ModelViewSet):
-    """API endpoint that allows problems to be viewed or edited."""
+class ProblemViewSet(
+    ConditionalRetrieveMixin, BulkWriteMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
+    """API endpoint that allows problems to be viewed or edited, also in bulk."""
     queryset = Problem.objects.all()
     serializer_class = ProblemSerializer
 
-class ReactionViewSet(viewsets.ModelViewSet):
-    """API endpoint that allows reactions to be viewed or edited."""
+class ReactionViewSet(
+    ConditionalRetrieveMixin, BulkWriteMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
+    """API endpoint that allows reactions to be viewed or edited, also in bulk."""
     queryset = Reaction.objects.all()
     serializer_class = ReactionSerializer
\ No newline at end of file
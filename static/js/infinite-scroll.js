@@ -0,0 +1,40 @@
+// Loads the next batch of cards when the end of a list scrolls into view.
+// A list is marked with data-infinite-scroll and ends with an element with data-next-url,
+// the response of that url contains the next cards and again an element with data-next-url.
+
+function loadNextBatch(sentinel, observer) {
+  observer.unobserve(sentinel);
+  return fetch(sentinel.dataset.nextUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+    .then((response) => {
+      if (!response.ok) throw new Error(`Status ${response.status}`);
+      return response.text();
+    })
+    .then((html) => {
+      const template = document.createElement('template');
+      template.innerHTML = html;
+      const next = template.content.querySelector('[data-next-url]');
+      sentinel.replaceWith(template.content);
+      if (next) observer.observe(next);
+    })
+    .catch(() => {
+      // Laat de pagina-navigatie zien als het laden mislukt
+      sentinel.remove();
+      document.querySelectorAll('.infinite-scroll-fallback').forEach((nav) => { nav.hidden = false; });
+    });
+}
+
+function initInfiniteScroll() {
+  if (!('IntersectionObserver' in window)) return;
+  const observer = new IntersectionObserver((entries) => {
+    entries.forEach((entry) => {
+      if (entry.isIntersecting) loadNextBatch(entry.target, observer);
+    });
+  }, { rootMargin: '400px' });
+
+  document.querySelectorAll('[data-infinite-scroll] [data-next-url]').forEach((sentinel) => {
+    observer.observe(sentinel);
+  });
+  document.querySelectorAll('.infinite-scroll-fallback').forEach((nav) => { nav.hidden = true; });
+}
+
+document.addEventListener('DOMContentLoaded', initInfiniteScroll);
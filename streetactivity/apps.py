@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StreetactivityConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "streetactivity"
+
+    def ready(self):
+        """Signals are imported once the app is ready"""
+        from streetactivity import signals
@@ -0,0 +1,131 @@
+"""Denormalized reflection and photo counters on StreetActivity."""
+
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.utils.cache import bump_generation
+
+from .models import Reflection, StreetActivity, StreetActivityPhoto
+
+
+def latest_reflection_subquery():
+    """Subquery selecting the creation date of the newest reflection of the outer activity"""
+    return Subquery(
+        Reflection.objects.filter(activity_id=OuterRef("pk"))
+        .order_by("-date_created")
+        .values("date_created")[:1]
+    )
+
+
+def count_subquery(model):
+    """Subquery counting the rows of the model that belong to the outer activity"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(activity_id=OuterRef("pk"))
+            .order_by()
+            .values("activity_id")
+            .annotate(count=Count("pk"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def reflections_added(activity_id, count, latest):
+    """Count reflections that were added to an activity,
+    where latest is the creation date of the newest of them"""
+    if activity_id is None:
+        return
+    StreetActivity.objects.filter(pk=activity_id).update(
+        reflection_count=F("reflection_count") + count,
+        last_reflection_at=Greatest(Coalesce("last_reflection_at", Value(latest)), Value(latest)),
+    )
+    bump_generation(StreetActivity)
+
+
+def reflections_bulk_added(reflections):
+    """Count reflections that were added without signals, for example by bulk_create"""
+    added = {}
+    for reflection in reflections:
+        count, latest = added.get(reflection.activity_id, (0, reflection.date_created))
+        added[reflection.activity_id] = (count + 1, max(latest, reflection.date_created))
+    for activity_id, (count, latest) in added.items():
+        reflections_added(activity_id, count, latest)
+
+
+def reflection_removed(activity_id):
+    """Uncount a reflection that was deleted from an activity"""
+    if activity_id is None:
+        return
+    StreetActivity.objects.filter(pk=activity_id).update(
+        reflection_count=Greatest(F("reflection_count") - 1, Value(0)),
+        last_reflection_at=latest_reflection_subquery(),
+    )
+    bump_generation(StreetActivity)
+
+
+def reflections_moved(reflections):
+    """Move the counts of saved reflections whose activity or creation date changed
+    since they were loaded, see Reflection.from_db"""
+    moved, changed = Counter(), set()
+    for reflection in reflections:
+        counted = getattr(reflection, "counted_as", None)
+        if counted is None or counted == (reflection.activity_id, reflection.date_created):
+            continue
+        if counted[0] != reflection.activity_id:
+            moved[counted[0]] -= 1
+            moved[reflection.activity_id] += 1
+        changed.update({counted[0], reflection.activity_id})
+    changed.discard(None)
+    for activity_id in changed:
+        StreetActivity.objects.filter(pk=activity_id).update(
+            reflection_count=Greatest(F("reflection_count") + moved[activity_id], Value(0)),
+            last_reflection_at=latest_reflection_subquery(),
+        )
+    if changed:
+        bump_generation(StreetActivity)
+
+
+def photo_added(activity_id):
+    """Count a photo that was added to an activity"""
+    StreetActivity.objects.filter(pk=activity_id).update(photo_count=F("photo_count") + 1)
+    bump_generation(StreetActivity)
+
+
+def photo_removed(activity_id):
+    """Uncount a photo that was deleted from an activity"""
+    StreetActivity.objects.filter(pk=activity_id).update(
+        photo_count=Greatest(F("photo_count") - 1, Value(0))
+    )
+    bump_generation(StreetActivity)
+
+
+def reconcile_counters():
+    """Recompute the counters of every activity from its reflections and photos
+    and save the ones that drifted. Returns the number of repaired activities."""
+    activities = StreetActivity.objects.annotate(
+        actual_reflection_count=count_subquery(Reflection),
+        actual_photo_count=count_subquery(StreetActivityPhoto),
+        actual_last_reflection_at=latest_reflection_subquery(),
+    ).order_by("pk")
+
+    drifted = []
+    for activity in activities.iterator():
+        actual = (
+            activity.actual_reflection_count,
+            activity.actual_photo_count,
+            activity.actual_last_reflection_at,
+        )
+        if actual != (activity.reflection_count, activity.photo_count, activity.last_reflection_at):
+            (activity.reflection_count, activity.photo_count, activity.last_reflection_at) = actual
+            drifted.append(activity)
+
+    StreetActivity.objects.bulk_update(
+        drifted, ["reflection_count", "photo_count", "last_reflection_at"], batch_size=500
+    )
+    if drifted:
+        bump_generation(StreetActivity)
+    return len(drifted)
@@ -0,0 +1,108 @@
+"""Streaming export of all reflections with the name of their activity."""
+
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Reflection
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = ("id", "activity_id", "activity_name", "reflection", "date_created", "date_modified")
+CHUNK_SIZE = 2000
+LINES_PER_CHUNK = 500
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def start_of_day(day):
+    """The first moment of a date in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(since=None, until=None):
+    """Tuples of EXPORT_FIELDS of the reflections created from the date since up to
+    and including the date until, read from the database in batches of CHUNK_SIZE"""
+    reflections = Reflection.objects.order_by("pk")
+    if since is not None:
+        reflections = reflections.filter(date_created__gte=start_of_day(since))
+    if until is not None:
+        reflections = reflections.filter(date_created__lt=start_of_day(until + timedelta(days=1)))
+    rows = reflections.values_list(
+        "id", "activity_id", "activity__name", "reflection", "date_created", "date_modified"
+    )
+    last_pk = 0
+    while True:
+        # A list per batch, an open cursor would hold the SQLite read lock between yields
+        batch = list(rows.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+        yield from batch
+        if len(batch) < CHUNK_SIZE:
+            return
+        last_pk = batch[-1][0]
+
+
+def format_value(value):
+    """Dates as ISO 8601, everything else unchanged"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def ndjson_lines(rows):
+    """One JSON object per reflection"""
+    for row in rows:
+        yield json.dumps(
+            dict(zip(EXPORT_FIELDS, map(format_value, row))), ensure_ascii=False
+        ) + "\n"
+
+
+class EchoBuffer:
+    """File-like object returning what is written, so csv.writer produces lines to yield"""
+    def write(self, value):
+        """Return the value instead of storing it"""
+        return value
+
+
+def csv_lines(rows):
+    """A header followed by one CSV line per reflection"""
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(map(format_value, row))
+
+
+def batched(lines):
+    """Join the lines into larger byte chunks, a chunk per line makes streaming slow"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == LINES_PER_CHUNK:
+            yield "".join(batch).encode()
+            batch = []
+    if batch:
+        yield "".join(batch).encode()
+
+
+def gzipped(chunks):
+    """Compress a stream of byte chunks into a gzip stream"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_reflections(export_format="ndjson", since=None, until=None, gzip=False):
+    """Byte chunks of the reflection export in the given format, optionally gzipped"""
+    lines = ndjson_lines if export_format == "ndjson" else csv_lines
+    chunks = batched(lines(export_rows(since, until)))
+    return gzipped(chunks) if gzip else chunks
+
+
+def export_filename(export_format, gzip=False):
+    """File name of an export download"""
+    return f"reflecties.{export_format}" + (".gz" if gzip else "")
@@ -0,0 +1,57 @@
+"""Rotating selection of featured street activities for the home page."""
+
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import StreetActivity
+
+FEATURED_COUNT = 4
+
+
+def rotation_seconds():
+    """Length of a time window in which the same activities are featured"""
+    return getattr(settings, 'FEATURED_ROTATION_MINUTES', 15) * 60
+
+
+def rotation_cache():
+    """The cache shared by the workers holding the selection, so they all feature the same"""
+    return caches['shared']
+
+
+def rotation_cache_key(window=None):
+    """Cache key of the featured selection of the given, or the current, time window"""
+    if window is None:
+        window = int(time.time() // rotation_seconds())
+    return f"featured-activities:{window}"
+
+
+def get_featured_rotation():
+    """Return the primary keys of the featured activities of the current time window
+    and the total number of activities, drawing a new selection when the window starts"""
+    key = rotation_cache_key()
+    rotation = rotation_cache().get(key)
+    if rotation is None:
+        pks = list(StreetActivity.objects.order_by().values_list('pk', flat=True))
+        rotation = {
+            'pks': random.sample(pks, min(FEATURED_COUNT, len(pks))),
+            'total': len(pks),
+        }
+        rotation_cache().set(key, rotation, rotation_seconds())
+    return rotation
+
+
+def invalidate_featured_rotation():
+    """Draw a new selection on the next request, because activities were added or removed"""
+    rotation_cache().delete(rotation_cache_key())
+
+
+def get_featured_activities():
+    """Return the featured activities in their random order
+    and how many activities are not featured"""
+    rotation = get_featured_rotation()
+    activities = StreetActivity.objects.in_bulk(rotation['pks'])
+    featured = [activities[pk] for pk in rotation['pks'] if pk in activities]
+    return featured, max(0, rotation['total'] - len(rotation['pks']))
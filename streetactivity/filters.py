@@ -0,0 +1,82 @@
+"""Filters for the lists of street activities and reflections, each served by an index,
+see streetactivity/tests/test_filters.py."""
+
+from datetime import timedelta
+
+import django_filters
+from django import forms
+
+from .exports import start_of_day
+from .models import METHOD_CHOICES, Reflection, StreetActivity
+
+
+class DateWindowFilterSet(django_filters.FilterSet):
+    """Filter on creation from the date van up to and including the date tot"""
+
+    van = django_filters.DateFilter(
+        field_name="date_created",
+        method="filter_from",
+        label="Aangemaakt vanaf",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control form-control-sm"}),
+    )
+    tot = django_filters.DateFilter(
+        field_name="date_created",
+        method="filter_until",
+        label="Aangemaakt tot en met",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control form-control-sm"}),
+    )
+
+    def filter_from(self, queryset, name, value):
+        """Keep what was created on or after the date"""
+        return queryset.filter(**{f"{name}__gte": start_of_day(value)})
+
+    def filter_until(self, queryset, name, value):
+        """Keep what was created on or before the date"""
+        return queryset.filter(**{f"{name}__lt": start_of_day(value + timedelta(days=1))})
+
+
+class StreetActivityFilter(DateWindowFilterSet):
+    """Filter street activities on method, the start of their name and creation date"""
+
+    methode = django_filters.ChoiceFilter(
+        field_name="method",
+        choices=METHOD_CHOICES,
+        label="Methode",
+        empty_label="Alle methodes",
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+    naam = django_filters.CharFilter(
+        field_name="name",
+        lookup_expr="istartswith",
+        label="Naam begint met",
+        widget=forms.TextInput(attrs={"class": "form-control form-control-sm"}),
+    )
+
+    class Meta:
+        """Only the declared filters, with Dutch parameter names"""
+        model = StreetActivity
+        fields = []
+
+
+def activity_choices():
+    """The activities to choose from in the filter form, by name"""
+    activities = StreetActivity.objects.order_by("name").values_list("pk", "name")
+    return [("", "Alle straatspellen"), *activities]
+
+
+class ReflectionFilter(DateWindowFilterSet):
+    """Filter reflections on their activity and creation date"""
+
+    # The choices are only queried when the form is rendered, not when the API filters
+    activiteit = django_filters.NumberFilter(
+        field_name="activity",
+        label="Straatspel",
+        widget=forms.Select(
+            choices=activity_choices, attrs={"class": "form-select form-select-sm"}
+        ),
+    )
+
+    class Meta:
+        """Only the declared filters, with Dutch parameter names"""
+        model = Reflection
+        fields = []
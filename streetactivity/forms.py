@@ -1,5 +1,6 @@
 from django import forms
-from django.core.exceptions import ValidationError
+
+from core.utils.uploads import SafeImageField
 
 from .models import Reflection, StreetActivity, StreetActivityPhoto
 
@@ -62,35 +63,16 @@ class ReflectionForm(forms.ModelForm):
         return cleaned_data
 
 class StreetActivityPhotoForm(forms.ModelForm):
-    """Form for uploading a photo related to a StreetActivity."""
+    """Form for uploading a photo related to a StreetActivity.
+    The image is validated from its size and header, see SafeImageField."""
+    image = SafeImageField(
+        allowed_extensions=[".jpg", ".jpeg", ".png"],
+        error_messages={
+            "file_too_large": "Bestand is te groot.",
+            "invalid_extension": "Alleen JPG, JPEG en PNG bestanden zijn toegestaan.",
+        },
+    )
+
     class Meta:
         model = StreetActivityPhoto
         fields = ['image']
-
-    def clean_image(self):
-        """
-        Validation for the image field:
-        - Check if the file is an image (JPG, JPEG, PNG).
-        - Check if the file size is not too large (default 5MB).
-        """
-        image = self.cleaned_data.get('image')
-        if image:
-            try:
-                self.check_image_size(image)
-                self.check_image_type(image)
-            except ValidationError as e:
-                raise ValidationError(e.message)
-
-        return image
-
-    def check_image_type(self, image):
-        """Check if the uploaded file is an image (JPG, JPEG, PNG)."""
-        valid_extensions = ['jpg', 'jpeg', 'png']
-        if image.name.split('.')[-1].lower() not in valid_extensions:
-            raise ValidationError("Alleen JPG, JPEG en PNG bestanden zijn toegestaan.")
-
-    def check_image_size(self, image):
-        """Check if the uploaded image file size is not too large (default 5MB)."""
-        max_size = 5 * 1024 * 1024  # 5MB
-        if image.size > max_size:
-            raise ValidationError(f"Bestand is te groot.")
\ No newline at end of file
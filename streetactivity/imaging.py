@@ -0,0 +1,105 @@
+"""Resized derivatives of uploaded street activity photos."""
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from core.utils.uploads import FORMAT_ALIASES
+
+DERIVATIVE_DIRECTORY = "street_activity_photos/derivatives/"
+DERIVATIVE_FORMAT = "WEBP"
+DERIVATIVE_EXTENSION = "webp"
+DERIVATIVE_QUALITY = 80
+ORIGINAL_QUALITY = 95
+ORIENTATION_TAG = 0x0112
+
+# Longest edge in pixels for each derivative, from small to large
+DERIVATIVE_SIZES = {
+    "thumbnail": 320,
+    "card": 640,
+    "detail": 1280,
+    "full": 2048,
+}
+
+
+class PhotoDeleted(Exception):
+    """The photo was deleted while it was being processed"""
+
+
+def derivative_name(photo, size):
+    """Given a photo and a derivative size, return the storage name of that derivative.
+    The primary key keeps the derivatives of uploads with the same stem apart, such as
+    IMG_0001.JPG and IMG_0001.jpg."""
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    return f"{DERIVATIVE_DIRECTORY}{stem}_{photo.pk}_{size}.{DERIVATIVE_EXTENSION}"
+
+
+def render_derivative(image, longest_edge):
+    """Scale the image down so that its longest edge fits, never up,
+    and return the encoded WebP bytes with its width and height"""
+    resized = image.copy()
+    resized.thumbnail((longest_edge, longest_edge), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY)
+    return buffer.getvalue(), resized.width, resized.height
+
+
+def generate_derivatives(photo):
+    """Render all derivative sizes of a photo, store them next to the original
+    and save their names and dimensions on the photo"""
+    storage = photo.image.storage
+    derivatives = {}
+    with photo.image.open("rb") as image_file, Image.open(image_file) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for size, longest_edge in DERIVATIVE_SIZES.items():
+            content, width, height = render_derivative(image, longest_edge)
+            name = derivative_name(photo, size)
+            if storage.exists(name):
+                storage.delete(name)
+            derivatives[size] = {
+                "name": storage.save(name, ContentFile(content)),
+                "width": width,
+                "height": height,
+            }
+    photo.derivatives = derivatives
+    # An update instead of save, which raises when the photo was deleted meanwhile
+    if not type(photo)._base_manager.filter(pk=photo.pk).update(derivatives=derivatives):
+        delete_derivatives(photo)
+        raise PhotoDeleted(f"Photo {photo.pk} was deleted while its derivatives were rendered")
+    return derivatives
+
+
+def fix_orientation(photo):
+    """Rotate the original upload upright when its EXIF orientation says it was taken
+    rotated or mirrored, and store it in place. Returns whether the image was rotated."""
+    with photo.image.open("rb") as image_file, Image.open(image_file) as original:
+        if original.getexif().get(ORIENTATION_TAG, 1) == 1:
+            return False
+        # The upright version of a multi-picture JPEG is stored as a plain JPEG
+        image_format = FORMAT_ALIASES.get(original.format, original.format)
+        upright = ImageOps.exif_transpose(original)
+        buffer = BytesIO()
+        options = {"quality": ORIGINAL_QUALITY} if image_format == "JPEG" else {}
+        # exif_transpose removed the orientation tag, the rest of the EXIF data is kept
+        upright.save(buffer, image_format, exif=upright.getexif(), **options)
+
+    storage = photo.image.storage
+    name = photo.image.name
+    # Stored next to the original first, so a failing save, such as on a full disk,
+    # never loses the only copy of the upload
+    upright_name = storage.save(name, ContentFile(buffer.getvalue()))
+    storage.delete(name)
+    # Assigning the name gives a new file object, without the dimensions of the old one cached
+    photo.image = upright_name
+    return True
+
+
+def delete_derivatives(photo):
+    """Remove the derivative files of a photo from storage"""
+    storage = photo.image.storage
+    for derivative in photo.derivatives.values():
+        storage.delete(derivative["name"])
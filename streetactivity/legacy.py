@@ -0,0 +1,81 @@
+"""Reading legacy Moment records, as in moments_data.json, and mapping them onto Reflection."""
+
+import json
+
+from django.utils.dateparse import parse_datetime
+
+from .models import Reflection
+
+READ_SIZE = 64 * 1024
+KEYWORDS_PREFIX = "\n\nTrefwoorden: "
+
+
+def iter_json_array(file, read_size=READ_SIZE):
+    """Yield the elements of the JSON array in a text file one by one,
+    reading the file in blocks instead of loading all of it"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and the separators between the elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            if buffer[position] == "[":
+                started = True
+            position += 1
+        if position < len(buffer):
+            if not started:
+                raise ValueError("The file does not contain a JSON array")
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The element continues in the next block
+                if eof:
+                    raise
+            else:
+                # An element ending exactly at the end of the block, such as a
+                # number, may continue in the next block as well
+                if end < len(buffer) or eof:
+                    yield element
+                    position = end
+                    continue
+        elif eof:
+            return
+
+        block = file.read(read_size)
+        eof = not block
+        buffer = buffer[position:] + block
+        position = 0
+
+
+def moment_fields(record):
+    """The fields of a moment, both from a plain export and from a dumpdata fixture"""
+    if "fields" in record:
+        return {**record["fields"], "id": record["pk"]}
+    return record
+
+
+def reflection_from_moment(record):
+    """An unsaved Reflection with the data of a legacy moment.
+    Returns the reflection and whether its keywords fitted in the text."""
+    moment = moment_fields(record)
+    max_length = Reflection._meta.get_field("reflection").max_length
+    text = (moment.get("report") or "").strip()[:max_length]
+    keywords_fit = True
+    if moment.get("keywords"):
+        with_keywords = text + KEYWORDS_PREFIX + moment["keywords"].strip()
+        keywords_fit = len(with_keywords) <= max_length
+        if keywords_fit:
+            text = with_keywords
+
+    reflection = Reflection(
+        legacy_id=moment["id"],
+        activity_id=moment.get("activity"),
+        reflection=text,
+    )
+    # date_modified is set on saving, the import counts as the latest modification
+    if moment.get("date_created"):
+        reflection.date_created = parse_datetime(moment["date_created"])
+    return reflection, keywords_fit
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from streetactivity.models import StreetActivityPhoto
+
+
+class Command(BaseCommand):
+    """Django management command to store the dimensions of photos uploaded before they were saved on upload."""
+    help = 'Store width, height and file size of photos that do not have them yet'
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of photos that are read and saved per batch'
+        )
+
+    def handle(self, *args, **options):
+        """Fill in the dimensions batch by batch. Every batch is saved on its own,
+        so an interrupted run continues where it stopped when started again."""
+        batch_size = options['batch_size']
+        last_pk = 0
+        updated = 0
+        failed = 0
+
+        while True:
+            batch = list(
+                StreetActivityPhoto.objects
+                .filter(width__isnull=True, pk__gt=last_pk)
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+
+            readable = []
+            for photo in batch:
+                try:
+                    photo.populate_image_metadata()
+                except (OSError, ValueError) as e:
+                    failed += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"Could not read photo {photo.pk}: {e}")
+                    )
+                    continue
+                if photo.width is None:
+                    failed += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"Photo {photo.pk} is not a readable image")
+                    )
+                    continue
+                readable.append(photo)
+
+            StreetActivityPhoto.objects.bulk_update(readable, ['width', 'height', 'file_size'])
+            updated += len(readable)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Stored dimensions of {updated} photos")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Done: {updated} photos updated, {failed} photos failed")
+        )
@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from streetactivity.exports import EXPORT_FORMATS, export_reflections
+
+
+class Command(BaseCommand):
+    """Django management command to export all reflections without loading them into memory."""
+    help = 'Stream all reflections with their activity name to a file or stdout as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='ndjson',
+            help='Format of the export'
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='Only export reflections created on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--until',
+            type=date.fromisoformat,
+            help='Only export reflections created on or before this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress the export with gzip'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write the export to, defaults to stdout'
+        )
+
+    def handle(self, *args, **options):
+        """Write the export chunk by chunk."""
+        chunks = export_reflections(
+            options['format'], options['since'], options['until'], options['gzip']
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exported reflections to {options['output']}"))
+        else:
+            # Bytes go to the binary buffer of stdout, which a captured stdout may not have
+            output = getattr(self.stdout, 'buffer', None)
+            if output is None and options['gzip']:
+                raise CommandError("Use --output to write a gzipped export")
+            for chunk in chunks:
+                if output is None:
+                    self.stdout.write(chunk.decode(), ending='')
+                else:
+                    output.write(chunk)
+            if output is not None:
+                output.flush()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from streetactivity.imaging import PhotoDeleted, generate_derivatives
+from streetactivity.models import StreetActivityPhoto
+
+
+class Command(BaseCommand):
+    """Django management command to generate the resized versions of uploaded photos."""
+    help = 'Generate thumbnail, card, detail and full size versions of street activity photos'
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate the derivatives of every photo, not only of photos without derivatives'
+        )
+
+    def handle(self, *args, **options):
+        """Generate the derivatives of every photo that does not have them yet."""
+        photos = StreetActivityPhoto.objects.order_by('pk')
+        if not options['all']:
+            photos = photos.filter(derivatives={})
+
+        generated = 0
+        for photo in photos.iterator():
+            try:
+                generate_derivatives(photo)
+            except PhotoDeleted:
+                continue
+            except (OSError, ValueError) as e:
+                self.stdout.write(
+                    self.style.ERROR(f"Could not generate derivatives for photo {photo.pk}: {e}")
+                )
+                continue
+            generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated derivatives for {generated} photos")
+        )
@@ -0,0 +1,107 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from streetactivity import counters, rollups
+from streetactivity.legacy import iter_json_array, reflection_from_moment
+from streetactivity.models import Reflection, StreetActivity
+
+
+class Command(BaseCommand):
+    """Django management command to import legacy moments as reflections."""
+    help = 'Import the legacy Moment records of a JSON file, such as moments_data.json, as reflections'
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='moments_data.json',
+            help='JSON file with an array of moments'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of moments that are saved per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Read and check the moments without saving them'
+        )
+
+    def handle(self, *args, **options):
+        """Read the file and save the moments batch by batch. Moments that were imported
+        before are recognised by their legacy id, so an interrupted import can be started again."""
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.totals = dict.fromkeys(
+            ('read', 'created', 'existing', 'missing_activity', 'keywords_dropped'), 0
+        )
+        self.started = time.monotonic()
+
+        try:
+            with open(options['path'], encoding='utf-8') as file:
+                batch = []
+                for record in iter_json_array(file):
+                    batch.append(record)
+                    if len(batch) == self.batch_size:
+                        self.import_batch(batch)
+                        batch = []
+                if batch:
+                    self.import_batch(batch)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}") from e
+
+        totals = self.totals
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Dry run done' if self.dry_run else 'Done'}: {totals['read']} moments read, "
+            f"{totals['created']} reflections {'to create' if self.dry_run else 'created'}, "
+            f"{totals['existing']} already imported, {totals['missing_activity']} without existing activity, "
+            f"{totals['keywords_dropped']} without keywords because the text was too long "
+            f"({self.rate():.0f} moments per second)"
+        ))
+
+    def rate(self):
+        """Number of moments read per second so far"""
+        return self.totals['read'] / max(time.monotonic() - self.started, 1e-9)
+
+    def import_batch(self, records):
+        """Map a batch of moments onto reflections and save the new ones in one transaction"""
+        reflections = {}
+        for record in records:
+            reflection, keywords_fit = reflection_from_moment(record)
+            reflections[reflection.legacy_id] = reflection
+            self.totals['keywords_dropped'] += not keywords_fit
+        self.totals['read'] += len(records)
+
+        existing = set(
+            Reflection.objects.filter(legacy_id__in=reflections).values_list('legacy_id', flat=True)
+        )
+        activities = set(
+            StreetActivity.objects.filter(
+                pk__in={r.activity_id for r in reflections.values()}
+            ).values_list('pk', flat=True)
+        )
+        new = []
+        for legacy_id, reflection in reflections.items():
+            if legacy_id in existing:
+                self.totals['existing'] += 1
+            elif reflection.activity_id is not None and reflection.activity_id not in activities:
+                self.totals['missing_activity'] += 1
+            else:
+                new.append(reflection)
+
+        if not self.dry_run:
+            with transaction.atomic():
+                # bulk_create does not send post_save, so the counters are updated here
+                Reflection.objects.bulk_create(new)
+                counters.reflections_bulk_added(new)
+                rollups.reflections_bulk_added(new)
+        self.totals['created'] += len(new)
+        self.stdout.write(
+            f"{self.totals['read']} moments read, {self.totals['created']} new "
+            f"({self.rate():.0f} moments per second)"
+        )
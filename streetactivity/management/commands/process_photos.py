@@ -0,0 +1,48 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from streetactivity.processing import process_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django management command that runs the worker processing uploaded photos."""
+    help = 'Fix the orientation, read the dimensions and render the derivatives of uploaded photos'
+
+    def add_arguments(self, parser):
+        """Add command line arguments for the management command."""
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the photos that are waiting and stop, instead of waiting for new uploads'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait before looking for new uploads when none are waiting'
+        )
+
+    def handle(self, *args, **options):
+        """Process waiting photos, and keep polling for new ones unless --once is given."""
+        try:
+            while True:
+                try:
+                    results = process_queue()
+                except Exception:
+                    # For example a locked database, the next poll tries again
+                    logger.exception("Processing the photo queue failed")
+                    results = {}
+                if any(results.values()):
+                    self.stdout.write(
+                        f"{results['ready']} photos ready, {results['pending']} queued again, "
+                        f"{results['failed']} failed, {results['deleted']} deleted meanwhile"
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped processing photos")
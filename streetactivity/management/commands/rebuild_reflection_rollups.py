@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from streetactivity.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Django management command to recompute the daily reflection counts of street activities."""
+    help = 'Recompute the daily reflection counts per street activity used by the statistics pages'
+
+    def handle(self, *args, **options):
+        """Recompute the daily counts and report how many rows were written."""
+        rows = rebuild_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rows} daily reflection counts")
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from streetactivity.search import (
+    ensure_search_triggers,
+    rebuild_search_index,
+    search_available,
+)
+
+
+class Command(BaseCommand):
+    """Django management command to refill the full-text search index."""
+    help = 'Rebuild the full-text search index of street activities and reflections, for example after a bulk load'
+
+    def handle(self, *args, **options):
+        """Empty and refill the search index and its triggers and report how many rows were indexed."""
+        if not search_available():
+            raise CommandError("The full-text search index requires SQLite with FTS5")
+        ensure_search_triggers()
+        indexed = rebuild_search_index()
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} street activities and reflections")
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from streetactivity.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    """Django management command to repair the reflection and photo counters of street activities."""
+    help = 'Recompute reflection_count, photo_count and last_reflection_at of every street activity'
+
+    def handle(self, *args, **options):
+        """Recompute the counters and report how many activities had drifted."""
+        repaired = reconcile_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired the counters of {repaired} street activities")
+        )
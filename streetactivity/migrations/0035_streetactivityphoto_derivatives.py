@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0034_streetactivityphoto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Storage name, width and height of each resized version of the photo.'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0035_streetactivityphoto_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='file_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Size of the original image in bytes.', null=True),
+        ),
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Height of the original image in pixels.', null=True),
+        ),
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Width of the original image in pixels.', null=True),
+        ),
+    ]
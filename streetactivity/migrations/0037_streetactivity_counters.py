@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:45
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_counters(apps, schema_editor):
+    """Count the reflections and photos that already exist"""
+    StreetActivity = apps.get_model('streetactivity', 'StreetActivity')
+    activities = StreetActivity.objects.annotate(
+        reflections_total=Count('reflections', distinct=True),
+        photos_total=Count('photos', distinct=True),
+        latest_reflection=Max('reflections__date_created'),
+    )
+    for activity in activities:
+        activity.reflection_count = activity.reflections_total
+        activity.photo_count = activity.photos_total
+        activity.last_reflection_at = activity.latest_reflection
+        activity.save(update_fields=['reflection_count', 'photo_count', 'last_reflection_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0036_streetactivityphoto_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='streetactivity',
+            name='last_reflection_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='streetactivity',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='streetactivity',
+            name='reflection_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
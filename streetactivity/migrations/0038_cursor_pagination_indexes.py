@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0037_streetactivity_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reflection',
+            index=models.Index(fields=['date_created', 'id'], name='streetactiv_date_cr_c255a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streetactivity',
+            index=models.Index(fields=['date_created', 'id'], name='streetactiv_date_cr_4f258a_idx'),
+        ),
+    ]
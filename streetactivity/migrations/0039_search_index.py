@@ -0,0 +1,100 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:10
+
+from django.db import migrations
+
+CREATE_SQL = [
+    # Matches on the activity name weigh ten times as much as matches in the text
+    """
+    CREATE VIRTUAL TABLE streetactivity_search USING fts5(
+        name, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    "INSERT INTO streetactivity_search (streetactivity_search, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """
+    CREATE TRIGGER streetactivity_search_activity_insert
+    AFTER INSERT ON streetactivity_streetactivity BEGIN
+        INSERT INTO streetactivity_search (rowid, name, body)
+        VALUES (new.id * 2, new.name, new.description || ' ' || new.question);
+    END
+    """,
+    """
+    CREATE TRIGGER streetactivity_search_activity_update
+    AFTER UPDATE OF name, description, question ON streetactivity_streetactivity BEGIN
+        DELETE FROM streetactivity_search WHERE rowid = old.id * 2;
+        INSERT INTO streetactivity_search (rowid, name, body)
+        VALUES (new.id * 2, new.name, new.description || ' ' || new.question);
+    END
+    """,
+    """
+    CREATE TRIGGER streetactivity_search_activity_delete
+    AFTER DELETE ON streetactivity_streetactivity BEGIN
+        DELETE FROM streetactivity_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER streetactivity_search_reflection_insert
+    AFTER INSERT ON streetactivity_reflection BEGIN
+        INSERT INTO streetactivity_search (rowid, name, body)
+        VALUES (new.id * 2 + 1, '', new.reflection);
+    END
+    """,
+    """
+    CREATE TRIGGER streetactivity_search_reflection_update
+    AFTER UPDATE OF reflection ON streetactivity_reflection BEGIN
+        DELETE FROM streetactivity_search WHERE rowid = old.id * 2 + 1;
+        INSERT INTO streetactivity_search (rowid, name, body)
+        VALUES (new.id * 2 + 1, '', new.reflection);
+    END
+    """,
+    """
+    CREATE TRIGGER streetactivity_search_reflection_delete
+    AFTER DELETE ON streetactivity_reflection BEGIN
+        DELETE FROM streetactivity_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    INSERT INTO streetactivity_search (rowid, name, body)
+    SELECT id * 2, name, description || ' ' || question FROM streetactivity_streetactivity
+    """,
+    """
+    INSERT INTO streetactivity_search (rowid, name, body)
+    SELECT id * 2 + 1, '', reflection FROM streetactivity_reflection
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS streetactivity_search_activity_insert",
+    "DROP TRIGGER IF EXISTS streetactivity_search_activity_update",
+    "DROP TRIGGER IF EXISTS streetactivity_search_activity_delete",
+    "DROP TRIGGER IF EXISTS streetactivity_search_reflection_insert",
+    "DROP TRIGGER IF EXISTS streetactivity_search_reflection_update",
+    "DROP TRIGGER IF EXISTS streetactivity_search_reflection_delete",
+    "DROP TABLE IF EXISTS streetactivity_search",
+]
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 index and its triggers, only SQLite supports FTS5"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    """Drop the FTS5 index and its triggers"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0038_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
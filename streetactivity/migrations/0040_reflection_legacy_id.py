@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0039_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reflection',
+            name='legacy_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
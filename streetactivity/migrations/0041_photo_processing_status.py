@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def mark_existing_photos_ready(apps, schema_editor):
+    """Photos uploaded before the processing queue were already processed in the request"""
+    StreetActivityPhoto = apps.get_model('streetactivity', 'StreetActivityPhoto')
+    StreetActivityPhoto.objects.update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0040_reflection_legacy_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='processing_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='streetactivityphoto',
+            name='status',
+            field=models.CharField(choices=[('pending', 'In de wachtrij'), ('processing', 'Wordt verwerkt'), ('ready', 'Klaar'), ('failed', 'Mislukt')], default='pending', editable=False, help_text='Whether the photo is processed and can be shown.', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='streetactivityphoto',
+            index=models.Index(fields=['status', 'id'], name='streetactiv_status_07c4ed_idx'),
+        ),
+        migrations.RunPython(mark_existing_photos_ready, migrations.RunPython.noop),
+    ]
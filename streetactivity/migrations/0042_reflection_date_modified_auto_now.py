@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0041_photo_processing_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reflection',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='reflection',
+            index=models.Index(fields=['activity', 'date_modified'], name='streetactiv_activit_5dee9b_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0042_reflection_date_modified_auto_now'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='streetactivity',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:18
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0043_streetactivity_date_modified_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='streetactivity',
+            index=models.Index(fields=['method', 'name'], name='streetactiv_method_55fa7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='streetactivity',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'nocase'), name='streetactivity_name_nocase'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def fill_daily_counts(apps, schema_editor):
+    """Count the reflections that already exist per activity and day"""
+    Reflection = apps.get_model("streetactivity", "Reflection")
+    ReflectionDailyCount = apps.get_model("streetactivity", "ReflectionDailyCount")
+    days = (
+        Reflection.objects.exclude(activity=None)
+        .annotate(day=TruncDate("date_created", tzinfo=timezone.get_current_timezone()))
+        .values("activity_id", "day")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    ReflectionDailyCount.objects.bulk_create(
+        [ReflectionDailyCount(**row) for row in days], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streetactivity', '0044_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReflectionDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_reflection_counts', to='streetactivity.streetactivity')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'activity', 'count'], name='streetactiv_day_80b8c9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('activity', 'day'), name='unique_activity_day')],
+            },
+        ),
+        migrations.RunPython(fill_daily_counts, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models.functions import Collate
 from django.utils import timezone
 
 METHOD_CHOICES = [
@@ -8,6 +9,19 @@ METHOD_CHOICES = [
     ("both", "Beide"),
 ]
 
+COUNTER_FIELDS = ("reflection_count", "photo_count", "last_reflection_at")
+
+PHOTO_PENDING = "pending"
+PHOTO_PROCESSING = "processing"
+PHOTO_READY = "ready"
+PHOTO_FAILED = "failed"
+PHOTO_STATUS_CHOICES = [
+    (PHOTO_PENDING, "In de wachtrij"),
+    (PHOTO_PROCESSING, "Wordt verwerkt"),
+    (PHOTO_READY, "Klaar"),
+    (PHOTO_FAILED, "Mislukt"),
+]
+
 class StreetActivity(models.Model):
     """A street activity is an activity that can be done on the street to engage with strangers."""
 
@@ -30,17 +44,39 @@ class StreetActivity(models.Model):
     )
 
     date_created = models.DateTimeField(auto_now_add=True)
-    date_modified = models.DateTimeField(auto_now=True)
+    date_modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Maintained by signals when reflections and photos are added or deleted
+    reflection_count = models.PositiveIntegerField(default=0, editable=False)
+    photo_count = models.PositiveIntegerField(default=0, editable=False)
+    last_reflection_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         """Order by name and set verbose names."""
         verbose_name = "straatspel"
         verbose_name_plural = "Straatspellen"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=['date_created', 'id']),
+            # Filtering on method, ordered by name, see filters.py
+            models.Index(fields=['method', 'name']),
+            # Case-insensitive name prefix, which SQLite matches with LIKE
+            models.Index(Collate('name', 'nocase'), name='streetactivity_name_nocase'),
+        ]
 
     def __str__(self):
         return str(self.name)
 
+    def save(self, *args, **kwargs):
+        """The counters are updated in the database with F-expressions,
+        so saving an existing activity leaves them out to not overwrite them with stale values"""
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 class Reflection(models.Model):
     """A reflection is a player's thought or feeling about doing a street activity."""
 
@@ -59,7 +95,10 @@ class Reflection(models.Model):
     )
 
     date_created = models.DateTimeField(default=timezone.now)
-    date_modified = models.DateTimeField(default=timezone.now)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    # Id of the legacy Moment this reflection was imported from, see import_moments
+    legacy_id = models.PositiveIntegerField(null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         """Order reflections by date in descending order."""
@@ -68,11 +107,45 @@ class Reflection(models.Model):
         verbose_name_plural = "Reflecties"
         indexes = [
             models.Index(fields=['activity', 'date_created']),
+            models.Index(fields=['activity', 'date_modified']),
+            models.Index(fields=['date_created', 'id']),
         ]
 
     def __str__(self):
         return self.reflection
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the activity and creation date the reflection is counted under,
+        so the counters can move it when either is changed"""
+        instance = super().from_db(db, field_names, values)
+        if "activity_id" in field_names and "date_created" in field_names:
+            instance.counted_as = (instance.activity_id, instance.date_created)
+        return instance
+
+class ReflectionDailyCount(models.Model):
+    """The number of reflections added to an activity on a day, see rollups.py"""
+
+    activity = models.ForeignKey(
+        "StreetActivity",
+        on_delete=models.CASCADE,
+        related_name="daily_reflection_counts",
+    )
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """One row per activity and day, the day index also covers the most active activities."""
+        constraints = [
+            models.UniqueConstraint(fields=["activity", "day"], name="unique_activity_day"),
+        ]
+        indexes = [
+            models.Index(fields=["day", "activity", "count"]),
+        ]
+
+    def __str__(self):
+        return f"{self.activity_id} {self.day}: {self.count}"
+
 class StreetActivityPhoto(models.Model):
     """
     A photo uploaded for a street activity.
@@ -93,11 +166,104 @@ class StreetActivityPhoto(models.Model):
         auto_now_add=True,
         help_text="The date and time when the photo was uploaded."
     )
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Width of the original image in pixels."
+    )
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Height of the original image in pixels."
+    )
+    file_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Size of the original image in bytes."
+    )
+    derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Storage name, width and height of each resized version of the photo."
+    )
+
+    # Processing after upload by the process_photos worker, see streetactivity.processing
+    status = models.CharField(
+        max_length=10,
+        choices=PHOTO_STATUS_CHOICES,
+        default=PHOTO_PENDING,
+        editable=False,
+        help_text="Whether the photo is processed and can be shown."
+    )
+    processing_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    processing_started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    processing_error = models.TextField(blank=True, editable=False)
 
     class Meta:
         verbose_name = "Street Activity Photo"
         verbose_name_plural = "Street Activity Photos"
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.activity} - {self.uploaded_at}"
+
+    def save(self, *args, **kwargs):
+        """Store the dimensions and size of the image when it is saved for the first time,
+        so that rendering a photo never has to open the file"""
+        if self.image and self.width is None and kwargs.get("update_fields") is None:
+            self.populate_image_metadata()
+        super().save(*args, **kwargs)
+
+    def populate_image_metadata(self):
+        """Read the width, height and byte size from the image file"""
+        self.width = self.image.width
+        self.height = self.image.height
+        self.file_size = self.image.size
+
+    @property
+    def is_ready(self):
+        """Whether the photo is processed, so its derivatives can be shown"""
+        return self.status == PHOTO_READY
+
+    def derivative_url(self, size):
+        """Return the url of the derivative of the given size,
+        or the original upload when the derivative is not generated yet"""
+        derivative = self.derivatives.get(size)
+        if derivative:
+            return self.image.storage.url(derivative["name"])
+        return self.image.url
+
+    @property
+    def thumbnail_url(self):
+        """Url of the smallest derivative, for thumbnails"""
+        return self.derivative_url("thumbnail")
+
+    @property
+    def card_url(self):
+        """Url of the derivative for gallery and home page cards"""
+        return self.derivative_url("card")
+
+    @property
+    def detail_url(self):
+        """Url of the derivative for the street activity detail page"""
+        return self.derivative_url("detail")
+
+    @property
+    def full_url(self):
+        """Url of the largest derivative, for the photo detail page"""
+        return self.derivative_url("full")
+
+    @property
+    def srcset(self):
+        """Srcset attribute value listing every derivative with its width"""
+        return ", ".join(
+            f"{self.image.storage.url(derivative['name'])} {derivative['width']}w"
+            for derivative in self.derivatives.values()
+        )
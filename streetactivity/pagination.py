@@ -0,0 +1,75 @@
+from django.http import Http404
+from django.urls import reverse
+from infinite_scroll_pagination import paginator
+from infinite_scroll_pagination.serializers import InvalidPage, page_key, to_page_key
+from rest_framework.pagination import CursorPagination
+
+
+class DateCreatedCursorPagination(CursorPagination):
+    """Cursor pagination from newest to oldest on (date_created, id).
+    Every page is a seek on the date_created index instead of a COUNT(*) plus OFFSET,
+    so deep pages cost the same as the first page."""
+    ordering = ("-date_created", "-id")
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class SeekPaginationMixin:
+    """Mixin for list views that load further batches while scrolling.
+    A batch is keyed on the (seek_field, pk) of the last item that was shown,
+    so fetching the next batch is a seek on an index instead of an OFFSET."""
+    seek_field = "-date_created"
+    seek_param = "na"
+    batch_size = 10
+    fragment_url_name = ""
+
+    def get_fragment_url_kwargs(self):
+        """Keyword arguments of the url of the fragment endpoint"""
+        return self.kwargs
+
+    def get_next_batch_url(self, last):
+        """Given the last item that is shown, return the url of the batch after it"""
+        key = to_page_key(value=getattr(last, self.seek_field.lstrip("-")), pk=last.pk)
+        url = reverse(self.fragment_url_name, kwargs=self.get_fragment_url_kwargs())
+        return f"{url}?{self.seek_param}={key}"
+
+    def get_seek_page(self, queryset):
+        """Return the batch of the queryset after the key in the url,
+        or the first batch when there is no key"""
+        try:
+            value, pk = page_key(self.request.GET.get(self.seek_param, ""))
+        except InvalidPage as e:
+            raise Http404("Ongeldige pagina") from e
+        try:
+            return paginator.paginate(
+                queryset,
+                per_page=self.batch_size,
+                lookup_field=self.seek_field,
+                value=value,
+                pk=pk,
+            )
+        except paginator.EmptyPage:
+            return []
+
+
+class SeekFragmentMixin(SeekPaginationMixin):
+    """Mixin for views that render only the items of the next batch, without the page around them.
+    The items scrolled through are the model or queryset of the view, subclasses narrow
+    them down by overriding get_batch_queryset."""
+
+    def get_batch_queryset(self):
+        """Return all items that are scrolled through"""
+        return super().get_queryset()
+
+    def get_queryset(self):
+        """Return the batch after the last item that is shown."""
+        return self.get_seek_page(self.get_batch_queryset())
+
+    def get_context_data(self, **kwargs):
+        """Add the url of the batch after this one."""
+        context = super().get_context_data(**kwargs)
+        page = self.object_list
+        if page and page.has_next():
+            context["next_batch_url"] = self.get_next_batch_url(page[-1])
+        return context
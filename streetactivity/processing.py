@@ -0,0 +1,118 @@
+"""Database-backed queue for processing uploaded photos outside the request."""
+
+import logging
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .imaging import PhotoDeleted, delete_derivatives, fix_orientation, generate_derivatives
+from .models import (
+    PHOTO_FAILED,
+    PHOTO_PENDING,
+    PHOTO_PROCESSING,
+    PHOTO_READY,
+    StreetActivityPhoto,
+)
+from .sampling import invalidate_photo_pks
+
+logger = logging.getLogger(__name__)
+
+# Result of processing a photo that was deleted by its owner in the meantime
+PHOTO_DELETED = "deleted"
+MAX_ATTEMPTS = 3
+# A photo processing for longer belonged to a worker that died, and is claimed again
+STALE_AFTER = timedelta(minutes=10)
+CLAIM_CANDIDATES = 10
+
+
+def abandoned():
+    """Condition for photos that stayed processing too long, because their worker died"""
+    return Q(status=PHOTO_PROCESSING, processing_started_at__lt=timezone.now() - STALE_AFTER)
+
+
+def claimable_photos():
+    """Photos waiting to be processed, oldest first"""
+    return StreetActivityPhoto.objects.filter(
+        Q(status=PHOTO_PENDING) | abandoned() & Q(processing_attempts__lt=MAX_ATTEMPTS)
+    ).order_by("pk")
+
+
+def claim_next_photo():
+    """Mark the oldest waiting photo as processing and return it,
+    or None when no photo is waiting or other workers claimed them first"""
+    # A photo that kills its worker on every attempt is given up on
+    StreetActivityPhoto.objects.filter(abandoned(), processing_attempts__gte=MAX_ATTEMPTS).update(
+        status=PHOTO_FAILED, processing_error="Processing was interrupted"
+    )
+    candidates = claimable_photos().values_list("pk", "status", "processing_started_at")
+    for pk, status, started_at in candidates[:CLAIM_CANDIDATES]:
+        claimed = StreetActivityPhoto.objects.filter(
+            pk=pk, status=status, processing_started_at=started_at
+        ).update(
+            status=PHOTO_PROCESSING,
+            processing_started_at=timezone.now(),
+            processing_attempts=F("processing_attempts") + 1,
+        )
+        if claimed:
+            return StreetActivityPhoto.objects.get(pk=pk)
+    return None
+
+
+def save_photo_fields(photo, *fields):
+    """Write fields of a photo with an update, which unlike save does nothing when the
+    photo was deleted in the meantime. Returns whether the photo still exists."""
+    values = {field: getattr(photo, field) for field in fields}
+    return StreetActivityPhoto.objects.filter(pk=photo.pk).update(**values) > 0
+
+
+def discard_deleted_photo(photo):
+    """Remove the derivatives rendered for a photo that was deleted while it was processed"""
+    logger.info("Photo %s was deleted while it was processed", photo.pk)
+    delete_derivatives(photo)
+    return PHOTO_DELETED
+
+
+def process_photo(photo):
+    """Process a claimed photo and return its new status. A photo that fails
+    is queued again until it has been attempted MAX_ATTEMPTS times."""
+    try:
+        # The original is gone once rotated, so the row must point at the upright copy
+        # before a later step can fail
+        if fix_orientation(photo) and not save_photo_fields(photo, "image"):
+            photo.image.delete(save=False)
+            raise PhotoDeleted
+        photo.populate_image_metadata()
+        generate_derivatives(photo)
+    except PhotoDeleted:
+        # The files rendered for the photo were removed already
+        return PHOTO_DELETED
+    except Exception as e:
+        # Any error in a single photo must not stop the worker
+        logger.exception("Processing photo %s failed", photo.pk)
+        photo.status = PHOTO_FAILED if photo.processing_attempts >= MAX_ATTEMPTS else PHOTO_PENDING
+        photo.processing_error = str(e)
+        if not save_photo_fields(photo, "status", "processing_error"):
+            return discard_deleted_photo(photo)
+        return photo.status
+
+    photo.status = PHOTO_READY
+    photo.processing_error = ""
+    fields = ("image", "width", "height", "file_size", "status", "processing_error")
+    if not save_photo_fields(photo, *fields):
+        return discard_deleted_photo(photo)
+    # The photo can now be picked at random
+    invalidate_photo_pks(photo.activity_id)
+    return photo.status
+
+
+def process_queue(limit=None):
+    """Process waiting photos until none are left or limit photos were processed.
+    Returns the number of photos per resulting status."""
+    results = {PHOTO_READY: 0, PHOTO_PENDING: 0, PHOTO_FAILED: 0, PHOTO_DELETED: 0}
+    while limit is None or sum(results.values()) < limit:
+        photo = claim_next_photo()
+        if photo is None:
+            break
+        results[process_photo(photo)] += 1
+    return results
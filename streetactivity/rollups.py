@@ -0,0 +1,137 @@
+"""Daily reflection counts per activity, for the statistics pages."""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import Reflection, ReflectionDailyCount
+
+STATS_DAYS = 365
+MOST_ACTIVE_DAYS = 30
+MOST_ACTIVE_LIMIT = 10
+
+
+def reflection_day(reflection):
+    """The day a reflection counts for, in the current time zone"""
+    return timezone.localdate(reflection.date_created)
+
+
+def count_reflections(activity_id, day, delta):
+    """Add delta, which may be negative, to the reflections of an activity on a day"""
+    if activity_id is None:
+        return
+    rows = ReflectionDailyCount.objects.filter(activity_id=activity_id, day=day)
+    if delta < 0:
+        rows.update(count=Greatest(F("count") + delta, Value(0)))
+        rows.filter(count=0).delete()
+        return
+    if rows.update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            ReflectionDailyCount.objects.create(activity_id=activity_id, day=day, count=delta)
+    except IntegrityError:
+        # Another request created the row in the meantime
+        rows.update(count=F("count") + delta)
+
+
+def reflections_bulk_added(reflections):
+    """Count reflections that were added without signals, for example by bulk_create.
+    Must run in the transaction that added them, which holds the write lock."""
+    added = Counter(
+        (reflection.activity_id, reflection_day(reflection))
+        for reflection in reflections if reflection.activity_id is not None
+    )
+    if not added:
+        return
+    existing = dict(
+        ((activity_id, day), count)
+        for activity_id, day, count in ReflectionDailyCount.objects.filter(
+            activity_id__in={activity_id for activity_id, _day in added},
+            day__in={day for _activity_id, day in added},
+        ).values_list("activity_id", "day", "count")
+    )
+    ReflectionDailyCount.objects.bulk_create(
+        [
+            ReflectionDailyCount(activity_id=activity_id, day=day, count=existing.get((activity_id, day), 0) + count)
+            for (activity_id, day), count in added.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["activity", "day"],
+        update_fields=["count"],
+        batch_size=500,
+    )
+
+
+def reflections_moved(reflections):
+    """Move the daily counts of saved reflections whose activity or creation date
+    changed since they were loaded, see Reflection.from_db"""
+    moved = Counter()
+    for reflection in reflections:
+        counted = getattr(reflection, "counted_as", None)
+        if counted is None:
+            continue
+        old = (counted[0], timezone.localdate(counted[1]))
+        new = (reflection.activity_id, reflection_day(reflection))
+        if old != new:
+            moved[old] -= 1
+            moved[new] += 1
+    for (activity_id, day), delta in moved.items():
+        if delta:
+            count_reflections(activity_id, day, delta)
+
+
+def rebuild_rollups():
+    """Recompute the daily counts from the reflections. Returns the number of rows."""
+    days = (
+        Reflection.objects.exclude(activity=None)
+        .annotate(day=TruncDate("date_created", tzinfo=timezone.get_current_timezone()))
+        .values("activity_id", "day")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    rows = [ReflectionDailyCount(**row) for row in days.iterator()]
+    with transaction.atomic():
+        ReflectionDailyCount.objects.all().delete()
+        ReflectionDailyCount.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def daily_counts(activity_id, days=STATS_DAYS, today=None):
+    """The number of reflections of an activity on each of the last days, oldest first,
+    read with one query"""
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    counts = dict(
+        ReflectionDailyCount.objects.filter(activity_id=activity_id, day__gte=first)
+        .values_list("day", "count")
+    )
+    return [(first + timedelta(days=n), counts.get(first + timedelta(days=n), 0)) for n in range(days)]
+
+
+def weekly_counts(daily):
+    """Group daily counts into weeks starting on monday, as (monday, days, total)"""
+    weeks = []
+    for day, count in daily:
+        monday = day - timedelta(days=day.weekday())
+        if not weeks or weeks[-1][0] != monday:
+            weeks.append((monday, [], 0))
+        monday, week_days, total = weeks[-1]
+        week_days.append((day, count))
+        weeks[-1] = (monday, week_days, total + count)
+    return weeks
+
+
+def most_active(days=MOST_ACTIVE_DAYS, limit=MOST_ACTIVE_LIMIT, today=None):
+    """The activities with the most reflections over the last days, with one query"""
+    today = today or timezone.localdate()
+    return list(
+        ReflectionDailyCount.objects.filter(day__gt=today - timedelta(days=days))
+        .values("activity_id", "activity__name")
+        .annotate(total=Sum("count"))
+        .order_by("-total", "activity__name")[:limit]
+    )
@@ -0,0 +1,77 @@
+"""Random photo selection from cached lists of primary keys."""
+
+import random
+
+from django.core.cache import caches
+
+from .models import PHOTO_READY, StreetActivityPhoto
+
+ALL_PHOTOS_CACHE_KEY = "photo-pks:all"
+# Removes lists nobody asked for, invalidation does not depend on it
+PHOTO_PKS_TIMEOUT = 24 * 60 * 60
+
+
+def photo_pks_cache():
+    """The cache shared by the web and photo workers holding the primary keys"""
+    return caches["shared"]
+
+
+def activity_cache_key(activity_id):
+    """Cache key of the primary keys of the photos of one activity"""
+    return f"photo-pks:activity:{activity_id}"
+
+
+def get_photo_pks(activity_id=None):
+    """Return the primary keys of all processed photos, or of the processed photos of
+    one activity, from the cache, or query and cache them when they are not cached yet"""
+    key = ALL_PHOTOS_CACHE_KEY if activity_id is None else activity_cache_key(activity_id)
+    pks = photo_pks_cache().get(key)
+    if pks is None:
+        photos = StreetActivityPhoto.objects.filter(status=PHOTO_READY).order_by("pk")
+        if activity_id is not None:
+            photos = photos.filter(activity_id=activity_id)
+        pks = list(photos.values_list("pk", flat=True))
+        photo_pks_cache().set(key, pks, PHOTO_PKS_TIMEOUT)
+    return pks
+
+
+def invalidate_photo_pks(activity_id):
+    """Forget the cached primary keys that include the photos of an activity"""
+    photo_pks_cache().delete_many([ALL_PHOTOS_CACHE_KEY, activity_cache_key(activity_id)])
+
+
+def random_photo(activity):
+    """Given an activity, return one of its photos chosen uniformly at random,
+    or None when the activity has no photos"""
+    pks = get_photo_pks(activity.pk)
+    if not pks:
+        return None
+    photos = StreetActivityPhoto.objects.filter(status=PHOTO_READY)
+    photo = photos.filter(pk=random.choice(pks)).first()
+    if photo is None:
+        # Deleted after the primary keys were read
+        invalidate_photo_pks(activity.pk)
+        pks = get_photo_pks(activity.pk)
+        if pks:
+            photo = photos.filter(pk=random.choice(pks)).first()
+    return photo
+
+
+def random_photos(count):
+    """Return up to count distinct photos chosen uniformly at random from all photos,
+    with their activity"""
+    pks = get_photo_pks()
+    chosen = random.sample(pks, min(count, len(pks)))
+    photos = StreetActivityPhoto.objects.select_related("activity").in_bulk(chosen)
+    if len(photos) < len(chosen):
+        # Deleted after the primary keys were read, so they are chosen again from fresh keys
+        photo_pks_cache().delete(ALL_PHOTOS_CACHE_KEY)
+        remaining = [pk for pk in get_photo_pks() if pk not in photos]
+        chosen = [pk for pk in chosen if pk in photos]
+        chosen += random.sample(remaining, min(count - len(chosen), len(remaining)))
+        photos.update(
+            StreetActivityPhoto.objects.select_related("activity").in_bulk(
+                [pk for pk in chosen if pk not in photos]
+            )
+        )
+    return [photos[pk] for pk in chosen if pk in photos]
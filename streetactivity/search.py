@@ -0,0 +1,180 @@
+"""Full-text search over street activities and reflections with an SQLite FTS5 index."""
+
+import re
+
+from django.db import connection, connections, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Reflection, StreetActivity
+
+SEARCH_TABLE = "streetactivity_search"
+SEARCH_LIMIT = 20
+SNIPPET_TOKENS = 12
+MIN_PREFIX_LENGTH = 3
+
+# Control characters marking the matched terms in a snippet,
+# replaced by <mark> after escaping
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+FILL_ACTIVITIES_SQL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, name, body)
+    SELECT id * 2, name, description || ' ' || question FROM streetactivity_streetactivity
+"""
+FILL_REFLECTIONS_SQL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, name, body)
+    SELECT id * 2 + 1, '', reflection FROM streetactivity_reflection
+"""
+
+SEARCH_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_activity_insert
+    AFTER INSERT ON streetactivity_streetactivity BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, name, body)
+        VALUES (new.id * 2, new.name, new.description || ' ' || new.question);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_activity_update
+    AFTER UPDATE OF name, description, question ON streetactivity_streetactivity BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+        INSERT INTO {SEARCH_TABLE} (rowid, name, body)
+        VALUES (new.id * 2, new.name, new.description || ' ' || new.question);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_activity_delete
+    AFTER DELETE ON streetactivity_streetactivity BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_reflection_insert
+    AFTER INSERT ON streetactivity_reflection BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, name, body)
+        VALUES (new.id * 2 + 1, '', new.reflection);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_reflection_update
+    AFTER UPDATE OF reflection ON streetactivity_reflection BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+        INSERT INTO {SEARCH_TABLE} (rowid, name, body)
+        VALUES (new.id * 2 + 1, '', new.reflection);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_reflection_delete
+    AFTER DELETE ON streetactivity_reflection BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+
+def search_available():
+    """FTS5 is only used on SQLite, other databases fall back to a slower LIKE search"""
+    return connection.vendor == "sqlite"
+
+
+def build_match_query(query):
+    """Turn user input into an FTS5 query in which every word must occur.
+
+    The words are quoted, so FTS5 syntax such as AND, NEAR, column filters and stray
+    quotes in the input is searched for literally instead of raising a syntax error.
+    Only the last word, which may still be being typed, matches as a prefix, and only
+    from MIN_PREFIX_LENGTH characters on: a short prefix matches so many rows that
+    ranking them takes far longer than the rest of the search."""
+    terms = [f'"{token}"' for token in TOKEN_PATTERN.findall(query)]
+    if terms and len(terms[-1]) - 2 >= MIN_PREFIX_LENGTH:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """Escape a snippet and wrap the matched terms in <mark>"""
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+def search(query, limit=SEARCH_LIMIT):
+    """Return the best matching activities and reflections as dicts with the object,
+    its kind ('activity' or 'reflection') and a snippet with the matched terms highlighted"""
+    match = build_match_query(query)
+    if not match:
+        return []
+    if not search_available():
+        return like_search(query, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, '…', %s)
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s
+            ORDER BY rank
+            LIMIT %s
+            """,
+            [HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_TOKENS, match, limit],
+        )
+        rows = cursor.fetchall()
+
+    activities = StreetActivity.objects.in_bulk(
+        [rowid // 2 for rowid, _ in rows if rowid % 2 == 0]
+    )
+    reflections = Reflection.objects.select_related("activity").in_bulk(
+        [rowid // 2 for rowid, _ in rows if rowid % 2 == 1]
+    )
+
+    results = []
+    for rowid, snippet in rows:
+        kind, objects = ("activity", activities) if rowid % 2 == 0 else ("reflection", reflections)
+        obj = objects.get(rowid // 2)
+        if obj is not None:
+            results.append({"kind": kind, "object": obj, "snippet": highlight(snippet)})
+    return results
+
+
+def like_search(query, limit=SEARCH_LIMIT):
+    """Unranked search for databases without FTS5"""
+    activities = StreetActivity.objects.filter(name__icontains=query)[:limit]
+    reflections = Reflection.objects.select_related("activity").filter(
+        reflection__icontains=query
+    )[:limit]
+    results = [
+        {"kind": "activity", "object": activity, "snippet": activity.description}
+        for activity in activities
+    ] + [
+        {"kind": "reflection", "object": reflection, "snippet": reflection.reflection}
+        for reflection in reflections
+    ]
+    return results[:limit]
+
+
+def ensure_search_triggers(using="default"):
+    """Create the triggers that keep the index in sync when they are missing,
+    as they are after a migration that rebuilt the activity or reflection table"""
+    db = connections[using]
+    if db.vendor != "sqlite" or SEARCH_TABLE not in db.introspection.table_names():
+        return
+    with db.cursor() as cursor:
+        for sql in SEARCH_TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_search_index():
+    """Empty and refill the search index from the activity and reflection tables.
+    Returns the number of indexed rows."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(FILL_ACTIVITIES_SQL)
+        cursor.execute(FILL_REFLECTIONS_SQL)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
@@ -1,16 +1,19 @@
 from rest_framework import serializers
 
+from core.utils.serializers import DynamicFieldsMixin
+
 from .models import Reflection, StreetActivity
 
 
-class StreetActivitySerializer(serializers.ModelSerializer):
+class StreetActivitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer to convert Street Activity instance to JSON"""
     class Meta:
         model = StreetActivity
         fields = "__all__"
 
-class ReflectionSerializer(serializers.ModelSerializer):
+class ReflectionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer to convert Reflection instance to JSON"""
     class Meta:
         model = Reflection
         fields = "__all__"
+        expandable_fields = {"activity": "streetactivity.serializers.StreetActivitySerializer"}
@@ -0,0 +1,100 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from streetactivity import counters, rollups
+from streetactivity.featured import invalidate_featured_rotation
+from streetactivity.imaging import delete_derivatives
+from streetactivity.models import Reflection, StreetActivity, StreetActivityPhoto
+from streetactivity.sampling import invalidate_photo_pks
+from streetactivity.search import ensure_search_triggers
+
+
+def deleted_with_activity(origin):
+    """Whether a delete cascaded from deleting activities, whose counters and daily
+    statistics are deleted along with them and need no updates"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is StreetActivity
+
+
+@receiver(post_delete, sender=StreetActivityPhoto)
+def delete_photo_derivatives(sender, instance, *args, **kwargs):
+    """When a photo is deleted, remove its resized versions from storage"""
+    delete_derivatives(instance)
+
+
+@receiver(post_save, sender=StreetActivityPhoto)
+@receiver(post_delete, sender=StreetActivityPhoto)
+def refresh_photo_pks(sender, instance, *args, **kwargs):
+    """When a photo is added or deleted, forget the cached photo primary keys
+    used for picking random photos"""
+    if kwargs.get("created", True):
+        invalidate_photo_pks(instance.activity_id)
+
+
+@receiver(post_save, sender=StreetActivity)
+@receiver(post_delete, sender=StreetActivity)
+def refresh_featured_activities(sender, instance, *args, **kwargs):
+    """When an activity is added or deleted, draw a new selection of featured activities"""
+    if kwargs.get("created", True):
+        invalidate_featured_rotation()
+
+
+@receiver(post_save, sender=Reflection)
+def count_added_reflection(sender, instance, created, *args, **kwargs):
+    """When a reflection is added, count it on its activity"""
+    if created:
+        counters.reflections_added(instance.activity_id, 1, instance.date_created)
+
+
+@receiver(post_delete, sender=Reflection)
+def uncount_deleted_reflection(sender, instance, *args, **kwargs):
+    """When a reflection is deleted, uncount it on its activity"""
+    if not deleted_with_activity(kwargs.get("origin")):
+        counters.reflection_removed(instance.activity_id)
+
+
+@receiver(post_save, sender=Reflection)
+def count_reflection_day(sender, instance, created, *args, **kwargs):
+    """When a reflection is added, count it in the daily statistics of its activity"""
+    if created:
+        rollups.count_reflections(instance.activity_id, rollups.reflection_day(instance), 1)
+
+
+@receiver(post_save, sender=Reflection)
+def move_changed_reflection(sender, instance, created, *args, **kwargs):
+    """When the activity or creation date of a reflection is changed, move it in the
+    counters and daily statistics from where it was counted to where it is now"""
+    if not created:
+        counters.reflections_moved([instance])
+        rollups.reflections_moved([instance])
+    instance.counted_as = (instance.activity_id, instance.date_created)
+
+
+@receiver(post_delete, sender=Reflection)
+def uncount_reflection_day(sender, instance, *args, **kwargs):
+    """When a reflection is deleted, uncount it in the daily statistics of its activity"""
+    if not deleted_with_activity(kwargs.get("origin")):
+        rollups.count_reflections(instance.activity_id, rollups.reflection_day(instance), -1)
+
+
+@receiver(post_save, sender=StreetActivityPhoto)
+def count_added_photo(sender, instance, created, *args, **kwargs):
+    """When a photo is added, count it on its activity"""
+    if created:
+        counters.photo_added(instance.activity_id)
+
+
+@receiver(post_delete, sender=StreetActivityPhoto)
+def uncount_deleted_photo(sender, instance, *args, **kwargs):
+    """When a photo is deleted, uncount it on its activity"""
+    if not deleted_with_activity(kwargs.get("origin")):
+        counters.photo_removed(instance.activity_id)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, *args, **kwargs):
+    """After migrating, recreate the search index triggers that SQLite dropped
+    when a migration rebuilt the activity or reflection table"""
+    if sender.name == "streetactivity":
+        ensure_search_triggers(using)
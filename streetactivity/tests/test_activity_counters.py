@@ -0,0 +1,161 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from streetactivity.models import ReflectionDailyCount, StreetActivity
+from travelingguestbook.factories import (
+    ReflectionFactory,
+    StreetActivityFactory,
+    StreetActivityPhotoFactory,
+)
+
+
+class TestReflectionCounters:
+    '''Tests for the reflection counters on StreetActivity'''
+    def test_reflections_are_counted(self):
+        """Test that adding reflections increments the count and the latest date"""
+        activity = StreetActivityFactory()
+        now = timezone.now()
+        ReflectionFactory(activity=activity, date_created=now - timedelta(days=1))
+        ReflectionFactory(activity=activity, date_created=now)
+
+        activity.refresh_from_db()
+        assert activity.reflection_count == 2
+        assert activity.last_reflection_at == now
+
+    def test_older_reflection_keeps_latest_date(self):
+        """Test that adding an older reflection does not move the latest date back"""
+        activity = StreetActivityFactory()
+        now = timezone.now()
+        ReflectionFactory(activity=activity, date_created=now)
+        ReflectionFactory(activity=activity, date_created=now - timedelta(days=1))
+
+        activity.refresh_from_db()
+        assert activity.last_reflection_at == now
+
+    def test_deleted_reflection_is_uncounted(self):
+        """Test that deleting the newest reflection decrements the count and the latest date"""
+        activity = StreetActivityFactory()
+        now = timezone.now()
+        ReflectionFactory(activity=activity, date_created=now - timedelta(days=1))
+        newest = ReflectionFactory(activity=activity, date_created=now)
+
+        newest.delete()
+
+        activity.refresh_from_db()
+        assert activity.reflection_count == 1
+        assert activity.last_reflection_at == now - timedelta(days=1)
+
+    def test_moved_reflection_is_counted_on_new_activity(self):
+        """Test that moving a reflection to another activity moves its count and dates"""
+        old, new = StreetActivityFactory.create_batch(2)
+        now = timezone.now()
+        ReflectionFactory(activity=old, date_created=now - timedelta(days=1))
+        reflection = ReflectionFactory(activity=old, date_created=now)
+
+        reflection.activity = new
+        reflection.save()
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        assert (old.reflection_count, old.last_reflection_at) == (1, now - timedelta(days=1))
+        assert (new.reflection_count, new.last_reflection_at) == (1, now)
+
+    def test_deleting_activity_skips_counting_its_reflections(self, django_assert_max_num_queries):
+        """Test that deleting an activity does not uncount its reflections one by one"""
+        activity = StreetActivityFactory()
+        ReflectionFactory.create_batch(50, activity=activity)
+        other = ReflectionFactory()
+
+        with django_assert_max_num_queries(20):
+            activity.delete()
+
+        assert not ReflectionDailyCount.objects.filter(activity_id=activity.pk).exists()
+        other.activity.refresh_from_db()
+        assert other.activity.reflection_count == 1
+
+    def test_saving_stale_activity_keeps_counters(self):
+        """Test that saving an activity loaded before a reflection was added keeps the count"""
+        activity = StreetActivityFactory()
+        stale = StreetActivity.objects.get(pk=activity.pk)
+        ReflectionFactory(activity=activity)
+
+        stale.name = "Nieuwe naam"
+        stale.save()
+
+        activity.refresh_from_db()
+        assert activity.name == "Nieuwe naam"
+        assert activity.reflection_count == 1
+
+
+class TestPhotoCounters:
+    '''Tests for the photo counter on StreetActivity'''
+    def test_photos_are_counted(self, temporary_media_root):
+        """Test that adding and deleting photos updates the count"""
+        activity = StreetActivityFactory()
+        photo = StreetActivityPhotoFactory(activity=activity)
+        StreetActivityPhotoFactory(activity=activity)
+        photo.delete()
+
+        activity.refresh_from_db()
+        assert activity.photo_count == 1
+
+
+class TestReconcileCounters:
+    '''Tests for repairing drifted counters'''
+    def test_reconcile_repairs_drift(self, temporary_media_root):
+        """Test that the reconcile command recomputes counters that drifted"""
+        activity = StreetActivityFactory()
+        reflection = ReflectionFactory(activity=activity)
+        StreetActivityPhotoFactory(activity=activity)
+        untouched = StreetActivityFactory()
+        StreetActivity.objects.filter(pk=activity.pk).update(
+            reflection_count=7, photo_count=0, last_reflection_at=None
+        )
+
+        out = StringIO()
+        call_command("reconcile_activity_counters", stdout=out)
+
+        activity.refresh_from_db()
+        assert activity.reflection_count == 1
+        assert activity.photo_count == 1
+        assert activity.last_reflection_at == reflection.date_created
+        assert "1 street activities" in out.getvalue()
+        untouched.refresh_from_db()
+        assert untouched.reflection_count == 0
+
+
+class TestCountersInViews:
+    '''Tests for using the counters in the views'''
+    def test_detail_view_does_not_count_reflections(self, client):
+        """Test that the detail view uses the counter instead of a COUNT query"""
+        activity = StreetActivityFactory()
+        ReflectionFactory.create_batch(5, activity=activity)
+
+        response = client.get(reverse("streetactivity-detail", args=[activity.pk]))
+
+        assert response.context["reflections_count"] == 5
+        assert response.context["reflections_remaining"] == 2
+
+    def test_list_view_sorts_by_reflections(self, client):
+        """Test that the list view can sort by the number of reflections"""
+        quiet = StreetActivityFactory(name="A")
+        busy = StreetActivityFactory(name="B")
+        ReflectionFactory.create_batch(3, activity=busy)
+
+        response = client.get(reverse("streetactivity-list"), {"sorteer": "reflecties"})
+
+        assert list(response.context["activities"]) == [busy, quiet]
+        assert response.context["sort"] == "reflecties"
+
+    def test_list_view_ignores_unknown_sort(self, client):
+        """Test that an unknown sort order falls back to sorting by name"""
+        StreetActivityFactory(name="B")
+        StreetActivityFactory(name="A")
+
+        response = client.get(reverse("streetactivity-list"), {"sorteer": "onbekend"})
+
+        assert [activity.name for activity in response.context["activities"]] == ["A", "B"]
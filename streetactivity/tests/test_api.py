@@ -0,0 +1,214 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from streetactivity.models import Reflection
+from travelingguestbook.factories import ReflectionFactory, StreetActivityFactory
+
+
+def fetch_all_pages(client, url):
+    '''Follow the next links of a paginated endpoint and return all results'''
+    results = []
+    while url:
+        data = client.get(url).json()
+        results.extend(data["results"])
+        url = data["next"]
+    return results
+
+
+class TestCursorPagination:
+    '''Tests for the cursor pagination of the reflection and street activity API'''
+    def test_reflections_are_paged_newest_first(self, client):
+        """Test that all reflections are returned once, from newest to oldest"""
+        now = timezone.now()
+        reflections = [
+            ReflectionFactory(date_created=now - timedelta(minutes=i)) for i in range(25)
+        ]
+
+        results = fetch_all_pages(client, reverse("reflecties-list"))
+
+        assert [r["id"] for r in results] == [r.pk for r in reflections]
+
+    def test_reflections_with_equal_dates(self, client):
+        """Test that reflections created at the same moment are neither skipped nor repeated"""
+        now = timezone.now()
+        reflections = ReflectionFactory.create_batch(15, date_created=now)
+
+        results = fetch_all_pages(client, reverse("reflecties-list"))
+
+        assert sorted(r["id"] for r in results) == sorted(r.pk for r in reflections)
+
+    def test_streetactivities_are_paged(self, client):
+        """Test that the street activity endpoint uses cursor pagination"""
+        StreetActivityFactory.create_batch(12)
+
+        data = client.get(reverse("straatactiviteiten-list")).json()
+
+        assert len(data["results"]) == 10
+        assert "count" not in data
+        assert "cursor=" in data["next"]
+
+    def test_no_count_or_offset_queries(self, client):
+        """Test that a page is a seek, without COUNT(*) and OFFSET"""
+        ReflectionFactory.create_batch(25)
+        next_url = client.get(reverse("reflecties-list")).json()["next"]
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(next_url)
+
+        for query in queries:
+            assert "COUNT(" not in query["sql"].upper()
+            assert "OFFSET" not in query["sql"].upper()
+
+
+class TestSparseFieldsets:
+    '''Tests for choosing the fields of the API responses'''
+    def test_only_requested_fields_are_returned_and_loaded(self, client):
+        """Test that ?fields= limits both the response and the selected columns"""
+        StreetActivityFactory.create_batch(3)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = client.get(reverse("straatactiviteiten-list"), {"fields": "id,name"}).json()
+
+        assert all(set(result) == {"id", "name"} for result in data["results"])
+        assert '"description"' not in queries[0]["sql"]
+        assert data["next"] is None
+
+    def test_pages_can_be_followed_with_fields(self, client):
+        """Test that the cursor still works when the ordering fields are not requested"""
+        reflections = ReflectionFactory.create_batch(15)
+
+        results = fetch_all_pages(client, reverse("reflecties-list") + "?fields=id")
+
+        assert sorted(r["id"] for r in results) == sorted(r.pk for r in reflections)
+
+    def test_expand_activity(self, client, django_assert_num_queries):
+        """Test that ?expand=activity inlines the activities in a single query"""
+        activity = StreetActivityFactory()
+        ReflectionFactory.create_batch(3, activity=activity)
+
+        with django_assert_num_queries(1):
+            data = client.get(
+                reverse("reflecties-list"), {"fields": "id", "expand": "activity"}
+            ).json()
+
+        assert all(result["activity"]["name"] == activity.name for result in data["results"])
+
+    def test_unknown_fields_are_refused(self, client):
+        """Test that unknown fields and relations are answered with 400"""
+        response = client.get(reverse("reflecties-list"), {"fields": "geen", "expand": "photos"})
+
+        assert response.status_code == 400
+        assert set(response.json()) == {"fields", "expand"}
+
+    def test_retrieve_etag_depends_on_fields(self, client):
+        """Test that the ETag of a retrieve differs per set of requested fields"""
+        reflection = ReflectionFactory()
+        url = reverse("reflecties-detail", args=[reflection.pk])
+        full = client.get(url)
+
+        response = client.get(url, {"fields": "id"}, HTTP_IF_NONE_MATCH=full["ETag"])
+
+        assert response.status_code == 200
+        assert response.json() == {"id": reflection.pk}
+
+    def test_writes_use_all_fields(self, client):
+        """Test that the fields parameter does not affect creating objects"""
+        activity = StreetActivityFactory()
+
+        response = client.post(
+            reverse("reflecties-list") + "?fields=id",
+            {"activity": activity.pk, "reflection": "Nieuw"},
+        )
+
+        assert response.status_code == 201
+        assert response.json()["reflection"] == "Nieuw"
+
+
+class TestBulkReflections:
+    '''Tests for creating and updating a list of reflections in one request'''
+    def test_bulk_create(self, client, django_assert_max_num_queries):
+        """Test that a list of reflections is created with one insert and counted"""
+        activity = StreetActivityFactory()
+        items = [{"activity": activity.pk, "reflection": f"Reflectie {i}"} for i in range(20)]
+
+        with django_assert_max_num_queries(8):
+            response = client.post(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert response.status_code == 201
+        assert [r["reflection"] for r in response.json()] == [i["reflection"] for i in items]
+        assert all(r["id"] for r in response.json())
+        activity.refresh_from_db()
+        assert activity.reflection_count == 20
+        assert activity.last_reflection_at is not None
+
+    def test_bulk_create_reports_errors_per_item(self, client):
+        """Test that nothing is created when an item is invalid, and the errors are per item"""
+        activity = StreetActivityFactory()
+        items = [
+            {"activity": activity.pk, "reflection": "Goed"},
+            {"activity": activity.pk, "reflection": "x" * 1001},
+            {"activity": 999, "reflection": "Onbekend spel"},
+        ]
+
+        response = client.post(reverse("reflecties-list"), items, content_type="application/json")
+
+        errors = response.json()
+        assert response.status_code == 400
+        assert errors[0] == {}
+        assert "reflection" in errors[1]
+        assert "activity" in errors[2]
+        assert not Reflection.objects.exists()
+
+    def test_bulk_update(self, client):
+        """Test that PATCH on the list updates every reflection and its modification time"""
+        reflections = ReflectionFactory.create_batch(3)
+        before = {r.pk: r.date_modified for r in reflections}
+        items = [{"id": r.pk, "reflection": f"Aangepast {r.pk}"} for r in reflections]
+
+        response = client.patch(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert response.status_code == 200
+        for reflection in Reflection.objects.all():
+            assert reflection.reflection == f"Aangepast {reflection.pk}"
+            assert reflection.date_modified > before[reflection.pk]
+
+    def test_bulk_update_moves_with_constant_queries(self, client, django_assert_max_num_queries):
+        """Test that the activities of a bulk update are looked up once, not per item"""
+        reflections = ReflectionFactory.create_batch(20, activity=StreetActivityFactory())
+        activity = StreetActivityFactory()
+        items = [{"id": r.pk, "activity": activity.pk} for r in reflections]
+
+        with django_assert_max_num_queries(20):
+            response = client.patch(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert response.status_code == 200
+        assert set(Reflection.objects.values_list("activity", flat=True)) == {activity.pk}
+
+    def test_bulk_update_unknown_id(self, client):
+        """Test that an unknown or repeated id refuses the whole update"""
+        reflection = ReflectionFactory()
+        items = [
+            {"id": reflection.pk, "reflection": "Aangepast"},
+            {"id": reflection.pk, "reflection": "Nogmaals"},
+            {"reflection": "Zonder id"},
+        ]
+
+        response = client.patch(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert response.status_code == 400
+        assert response.json()[0] == {}
+        assert "id" in response.json()[1] and "id" in response.json()[2]
+        reflection.refresh_from_db()
+        assert reflection.reflection != "Aangepast"
+
+    def test_bulk_limit(self, client):
+        """Test that too many items are refused"""
+        items = [{"reflection": "x"}] * 501
+
+        response = client.post(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert response.status_code == 400
@@ -0,0 +1,156 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from streetactivity import exports
+from travelingguestbook.factories import ReflectionFactory, StreetActivityFactory
+
+
+def on(day):
+    '''Noon of a date in the current time zone'''
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=12))
+
+
+class TestExportReflections:
+    '''Tests for the streaming reflection export'''
+    def test_ndjson_contains_activity_name(self):
+        """Test that every reflection is one JSON line with the name of its activity"""
+        activity = StreetActivityFactory(name="Koffie aanbieden")
+        reflection = ReflectionFactory(activity=activity, reflection="Lekker, één kopje")
+
+        lines = b"".join(exports.export_reflections("ndjson")).decode().splitlines()
+
+        assert [json.loads(line) for line in lines] == [{
+            "id": reflection.pk,
+            "activity_id": activity.pk,
+            "activity_name": "Koffie aanbieden",
+            "reflection": "Lekker, één kopje",
+            "date_created": reflection.date_created.isoformat(),
+            "date_modified": reflection.date_modified.isoformat(),
+        }]
+
+    def test_csv_has_header_and_quotes_text(self):
+        """Test that the CSV export starts with a header and survives commas and newlines"""
+        ReflectionFactory(reflection='Eerst, daarna\n"dit"')
+
+        rows = list(csv.reader(io.StringIO(b"".join(exports.export_reflections("csv")).decode())))
+
+        assert rows[0] == list(exports.EXPORT_FIELDS)
+        assert rows[1][3] == 'Eerst, daarna\n"dit"'
+
+    def test_date_range_is_inclusive(self):
+        """Test that since and until include the whole day"""
+        ReflectionFactory(date_created=on(date(2025, 1, 1)))
+        inside = [
+            ReflectionFactory(date_created=on(date(2025, 1, 2))),
+            ReflectionFactory(date_created=on(date(2025, 1, 3))),
+        ]
+        ReflectionFactory(date_created=on(date(2025, 1, 4)))
+
+        rows = list(exports.export_rows(since=date(2025, 1, 2), until=date(2025, 1, 3)))
+
+        assert [row[0] for row in rows] == [r.pk for r in inside]
+
+    def test_gzip_roundtrip(self):
+        """Test that the gzipped export decompresses to the plain export"""
+        ReflectionFactory.create_batch(3)
+
+        plain = b"".join(exports.export_reflections("ndjson"))
+        compressed = b"".join(exports.export_reflections("ndjson", gzip=True))
+
+        assert gzip.decompress(compressed) == plain
+
+    def test_rows_are_read_in_chunks(self, monkeypatch):
+        """Test that the rows are fetched a batch per query and batched into chunks"""
+        monkeypatch.setattr(exports, "LINES_PER_CHUNK", 2)
+        monkeypatch.setattr(exports, "CHUNK_SIZE", 2)
+        reflections = ReflectionFactory.create_batch(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(exports.export_reflections("ndjson"))
+
+        assert len(queries) == 3
+        assert all("JOIN" in query["sql"] and "LIMIT 2" in query["sql"] for query in queries)
+        assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+        ids = [json.loads(line)["id"] for line in b"".join(chunks).splitlines()]
+        assert ids == [r.pk for r in reflections]
+
+
+class TestReflectionExportView:
+    '''Tests for downloading the export'''
+    def test_staff_only(self, client, auto_login_user):
+        """Test that visitors and users who are not staff cannot download the export"""
+        url = reverse("reflection-export")
+
+        assert client.get(url).status_code == 302
+        client, _user = auto_login_user()
+        assert client.get(url).status_code == 403
+
+    def test_streams_ndjson(self, admin_client):
+        """Test that the export is streamed as an NDJSON attachment"""
+        ReflectionFactory.create_batch(2)
+
+        response = admin_client.get(reverse("reflection-export"))
+
+        assert response.streaming
+        assert response["Content-Type"].startswith("application/x-ndjson")
+        assert 'filename="reflecties.ndjson"' in response["Content-Disposition"]
+        assert len(b"".join(response.streaming_content).splitlines()) == 2
+
+    def test_gzipped_csv(self, admin_client):
+        """Test that the CSV export can be downloaded gzipped"""
+        ReflectionFactory()
+
+        response = admin_client.get(reverse("reflection-export"), {"formaat": "csv", "gzip": "1"})
+
+        assert response["Content-Type"] == "application/gzip"
+        assert 'filename="reflecties.csv.gz"' in response["Content-Disposition"]
+        content = gzip.decompress(b"".join(response.streaming_content)).decode()
+        assert content.startswith("id,activity_id,activity_name")
+
+    def test_invalid_parameters(self, admin_client):
+        """Test that an unknown format or a malformed date is a bad request"""
+        url = reverse("reflection-export")
+        assert admin_client.get(url, {"formaat": "xml"}).status_code == 400
+        assert admin_client.get(url, {"van": "gisteren"}).status_code == 400
+
+    def test_impossible_date(self, admin_client):
+        """Test that a well formed date that does not exist is a bad request"""
+        response = admin_client.get(reverse("reflection-export"), {"van": "2025-02-30"})
+
+        assert response.status_code == 400
+
+
+class TestExportReflectionsCommand:
+    '''Tests for the export management command'''
+    def test_writes_to_stdout(self):
+        """Test that the command writes the export to stdout"""
+        reflection = ReflectionFactory()
+        out = StringIO()
+
+        call_command("export_reflections", stdout=out)
+
+        assert json.loads(out.getvalue())["id"] == reflection.pk
+
+    def test_writes_gzipped_file(self, tmp_path):
+        """Test that the command writes a gzipped CSV file filtered on date"""
+        ReflectionFactory(date_created=on(date(2025, 1, 1)))
+        ReflectionFactory(date_created=on(date(2025, 2, 1)))
+        output = tmp_path / "reflecties.csv.gz"
+
+        call_command(
+            "export_reflections", "--format=csv", "--gzip", "--since=2025-01-15",
+            f"--output={output}", stderr=StringIO(),
+        )
+
+        rows = list(csv.reader(io.StringIO(gzip.decompress(output.read_bytes()).decode())))
+        assert len(rows) == 2
@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+from itertools import combinations
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from streetactivity.filters import ReflectionFilter, StreetActivityFilter
+from streetactivity.models import Reflection, StreetActivity
+from travelingguestbook.factories import ReflectionFactory, StreetActivityFactory
+
+ACTIVITY_PARAMS = {"methode": "approach", "naam": "Vr", "van": "2025-01-01", "tot": "2025-12-31"}
+REFLECTION_PARAMS = {"activiteit": "1", "van": "2025-01-01", "tot": "2025-12-31"}
+
+
+def all_combinations(params):
+    '''Every non-empty combination of the filter parameters'''
+    return [
+        dict(combination)
+        for size in range(1, len(params) + 1)
+        for combination in combinations(params.items(), size)
+    ]
+
+
+def query_plan(queryset):
+    '''The lines of the SQLite query plan of a queryset'''
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_no_table_scan(queryset, table):
+    '''Assert that the table is searched through an index and never scanned'''
+    plan = query_plan(queryset)
+    lines = [line for line in plan if table in line]
+    assert lines, plan
+    assert all(line.startswith("SEARCH") for line in lines), plan
+
+
+class TestStreetActivityFilter:
+    '''Tests for filtering street activities'''
+    def test_filter_on_method(self, client):
+        """Test that the list only shows activities with the chosen method"""
+        approach = StreetActivityFactory(method="approach")
+        StreetActivityFactory(method="invite")
+
+        response = client.get(reverse("streetactivity-list"), {"methode": "approach"})
+
+        assert list(response.context["activities"]) == [approach]
+
+    def test_filter_on_name_prefix(self, client):
+        """Test that the name prefix is matched case-insensitively"""
+        match = StreetActivityFactory(name="Vrije knuffels")
+        StreetActivityFactory(name="Complimenten geven")
+
+        response = client.get(reverse("streetactivity-list"), {"naam": "vrij"})
+
+        assert list(response.context["activities"]) == [match]
+
+    def test_filter_on_dates(self, client):
+        """Test that van and tot are inclusive dates"""
+        old = StreetActivityFactory()
+        StreetActivity.objects.filter(pk=old.pk).update(
+            date_created=timezone.now() - timedelta(days=30)
+        )
+        recent = StreetActivityFactory()
+
+        response = client.get(
+            reverse("streetactivity-list"), {"van": date.today().isoformat(), "tot": date.today().isoformat()}
+        )
+
+        assert list(response.context["activities"]) == [recent]
+
+    def test_links_keep_filters(self, client):
+        """Test that the sort and page links keep the filters"""
+        StreetActivityFactory.create_batch(11, method="approach")
+
+        response = client.get(reverse("streetactivity-list"), {"methode": "approach"})
+
+        assert "methode=approach&amp;sorteer=reflecties" in response.text
+        assert "methode=approach&amp;sorteer=naam&amp;page=2" in response.text
+
+    def test_api_filter(self, client):
+        """Test that the API accepts the same filters"""
+        approach = StreetActivityFactory(method="approach")
+        StreetActivityFactory(method="invite")
+
+        data = client.get(reverse("straatactiviteiten-list"), {"methode": "approach"}).json()
+
+        assert [result["id"] for result in data["results"]] == [approach.pk]
+
+    def test_api_refuses_invalid_filter(self, client):
+        """Test that the API answers an invalid filter value with 400"""
+        response = client.get(reverse("straatactiviteiten-list"), {"methode": "dansen"})
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("params", all_combinations(ACTIVITY_PARAMS), ids=str)
+    def test_every_combination_uses_an_index(self, params):
+        """Test that no combination of filters scans the activity table"""
+        queryset = StreetActivityFilter(params, queryset=StreetActivity.objects.all()).qs
+
+        assert_no_table_scan(queryset, "streetactivity_streetactivity")
+
+
+class TestReflectionFilter:
+    '''Tests for filtering reflections'''
+    def test_api_filter_on_activity_and_dates(self, client):
+        """Test that the reflection endpoint filters on activity and date window"""
+        activity = StreetActivityFactory()
+        match = ReflectionFactory(activity=activity)
+        ReflectionFactory(activity=activity, date_created=timezone.now() - timedelta(days=30))
+        ReflectionFactory()
+
+        data = client.get(
+            reverse("reflecties-list"),
+            {"activiteit": activity.pk, "van": (date.today() - timedelta(days=1)).isoformat()},
+        ).json()
+
+        assert [result["id"] for result in data["results"]] == [match.pk]
+
+    def test_list_view_filter(self, client):
+        """Test that the reflection list filters on activity"""
+        match = ReflectionFactory()
+        ReflectionFactory()
+
+        response = client.get(reverse("reflection-list"), {"activiteit": match.activity_id})
+
+        assert list(response.context["reflections"]) == [match]
+
+    def test_list_view_has_filter_form(self, client):
+        """Test that the reflection list shows the filter form with the chosen filters"""
+        activity = StreetActivityFactory(name="Vrije knuffels")
+        ReflectionFactory.create_batch(11, activity=activity)
+
+        response = client.get(
+            reverse("reflection-list"), {"activiteit": activity.pk, "van": "2025-01-01"}
+        )
+
+        assert 'aria-label="Filter reflecties"' in response.text
+        assert f'<option value="{activity.pk}" selected>Vrije knuffels</option>' in response.text
+        assert 'value="2025-01-01"' in response.text
+        assert f"activiteit={activity.pk}&amp;van=2025-01-01&amp;page=2" in response.text
+
+    def test_api_does_not_list_activities(self, client):
+        """Test that the activities of the filter form are not queried by the API"""
+        StreetActivityFactory.create_batch(3)
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse("reflecties-list"), {"activiteit": "1"})
+
+        assert not any('ORDER BY "streetactivity_streetactivity"."name"' in q["sql"] for q in queries)
+
+    @pytest.mark.parametrize("params", all_combinations(REFLECTION_PARAMS), ids=str)
+    def test_every_combination_uses_an_index(self, params):
+        """Test that no combination of filters scans the reflection table"""
+        queryset = ReflectionFilter(params, queryset=Reflection.objects.all()).qs
+
+        assert_no_table_scan(queryset, "streetactivity_reflection")
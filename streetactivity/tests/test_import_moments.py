@@ -0,0 +1,143 @@
+import io
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from streetactivity.legacy import iter_json_array, reflection_from_moment
+from streetactivity.models import Reflection
+from travelingguestbook.factories import StreetActivityFactory
+
+
+def moment(legacy_id, activity_id, **fields):
+    '''A legacy moment record as in moments_data.json'''
+    return {
+        "id": legacy_id,
+        "report": f"Verslag {legacy_id}",
+        "confidence_level": "intermediate",
+        "from_practitioner": True,
+        "keywords": "Rustig, verrast",
+        "date_created": "2025-12-03T16:41:32.862873Z",
+        "date_modified": "2025-12-03T16:41:32.862925Z",
+        "activity": activity_id,
+        **fields,
+    }
+
+
+def write_moments(tmp_path, moments):
+    '''Write the moments to a JSON file and return its path'''
+    path = tmp_path / "moments.json"
+    path.write_text(json.dumps(moments), encoding="utf-8")
+    return str(path)
+
+
+class TestIterJsonArray:
+    '''Tests for reading a JSON array element by element'''
+    def test_elements_split_over_blocks(self):
+        """Test that elements are read correctly when they span several small blocks"""
+        elements = [{"id": i, "tekst": "a, [b] " * i} for i in range(20)] + [123, "}"]
+        file = io.StringIO(json.dumps(elements, indent=2))
+
+        assert list(iter_json_array(file, read_size=7)) == elements
+
+    def test_empty_array(self):
+        """Test that an empty array yields nothing"""
+        assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+    def test_not_an_array(self):
+        """Test that a file without an array is refused"""
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO('{"id": 1}')))
+
+    def test_truncated_file(self):
+        """Test that a file that ends halfway an element is refused"""
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO('[{"id": 1}, {"id": '), read_size=4))
+
+
+class TestReflectionFromMoment:
+    '''Tests for mapping a moment onto a reflection'''
+    def test_fields_are_mapped(self):
+        """Test that the report, keywords, activity and dates are taken over"""
+        reflection, keywords_fit = reflection_from_moment(moment(37, 5))
+
+        assert keywords_fit
+        assert reflection.legacy_id == 37
+        assert reflection.activity_id == 5
+        assert reflection.reflection == "Verslag 37\n\nTrefwoorden: Rustig, verrast"
+        assert reflection.date_created.isoformat() == "2025-12-03T16:41:32.862873+00:00"
+
+    def test_keywords_are_dropped_when_too_long(self):
+        """Test that the text stays within its maximum length"""
+        reflection, keywords_fit = reflection_from_moment(moment(1, 5, report="x" * 995))
+
+        assert not keywords_fit
+        assert reflection.reflection == "x" * 995
+
+    def test_dumpdata_fixture(self):
+        """Test that records in the dumpdata format are read as well"""
+        record = {"model": "streetactivity.moment", "pk": 3, "fields": moment(None, 5)}
+
+        reflection, _ = reflection_from_moment(record)
+
+        assert reflection.legacy_id == 3
+
+
+class TestImportMomentsCommand:
+    '''Tests for the import_moments management command'''
+    def test_import_in_batches(self, tmp_path):
+        """Test that all moments are imported, counted and searchable"""
+        activity = StreetActivityFactory()
+        path = write_moments(tmp_path, [moment(i, activity.pk) for i in range(1, 6)])
+        out = StringIO()
+
+        call_command("import_moments", path, "--batch-size=2", stdout=out)
+
+        assert sorted(Reflection.objects.values_list("legacy_id", flat=True)) == [1, 2, 3, 4, 5]
+        activity.refresh_from_db()
+        assert activity.reflection_count == 5
+        assert "5 reflections created" in out.getvalue()
+        assert "moments per second" in out.getvalue()
+
+    def test_rerun_is_idempotent(self, tmp_path):
+        """Test that importing the same file again creates nothing"""
+        activity = StreetActivityFactory()
+        path = write_moments(tmp_path, [moment(i, activity.pk) for i in range(1, 4)])
+        call_command("import_moments", path, stdout=StringIO())
+        out = StringIO()
+
+        call_command("import_moments", path, stdout=out)
+
+        assert Reflection.objects.count() == 3
+        activity.refresh_from_db()
+        assert activity.reflection_count == 3
+        assert "3 already imported" in out.getvalue()
+
+    def test_dry_run_saves_nothing(self, tmp_path):
+        """Test that a dry run only reports"""
+        activity = StreetActivityFactory()
+        path = write_moments(tmp_path, [moment(1, activity.pk), moment(2, activity.pk)])
+        out = StringIO()
+
+        call_command("import_moments", path, "--dry-run", stdout=out)
+
+        assert not Reflection.objects.exists()
+        assert "2 reflections to create" in out.getvalue()
+
+    def test_moments_of_missing_activities_are_skipped(self, tmp_path):
+        """Test that moments of an activity that no longer exists are not imported"""
+        activity = StreetActivityFactory()
+        path = write_moments(tmp_path, [moment(1, activity.pk), moment(2, activity.pk + 1000)])
+        out = StringIO()
+
+        call_command("import_moments", path, stdout=out)
+
+        assert list(Reflection.objects.values_list("legacy_id", flat=True)) == [1]
+        assert "1 without existing activity" in out.getvalue()
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file gives a clear error"""
+        with pytest.raises(CommandError):
+            call_command("import_moments", str(tmp_path / "bestaat-niet.json"), stdout=StringIO())
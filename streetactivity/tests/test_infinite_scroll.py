@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from django.views.generic import ListView
+
+from streetactivity.models import Reflection
+from streetactivity.pagination import SeekFragmentMixin
+
+from travelingguestbook.factories import (
+    ReflectionFactory,
+    StreetActivityFactory,
+    StreetActivityPhotoFactory,
+)
+
+
+class TestReflectionFragment:
+    '''Tests for loading further batches of reflections while scrolling'''
+    def create_reflections(self, activity, amount):
+        '''Create reflections from newest to oldest'''
+        now = timezone.now()
+        return [
+            ReflectionFactory(activity=activity, date_created=now - timedelta(minutes=i))
+            for i in range(amount)
+        ]
+
+    def test_list_links_to_next_batch(self, client):
+        """Test that the first page contains the url of the next batch"""
+        activity = StreetActivityFactory()
+        self.create_reflections(activity, 15)
+
+        response = client.get(reverse("reflection-list-streetactivity", args=[activity.pk]))
+
+        assert response.context["next_batch_url"].startswith(
+            reverse("reflection-list-streetactivity-fragment", args=[activity.pk])
+        )
+        assert 'data-next-url="' in response.text
+
+    def test_no_next_batch_when_everything_is_shown(self, client):
+        """Test that there is no next batch when all reflections fit on the first page"""
+        activity = StreetActivityFactory()
+        self.create_reflections(activity, 3)
+
+        response = client.get(reverse("reflection-list-streetactivity", args=[activity.pk]))
+
+        assert "next_batch_url" not in response.context
+
+    def test_fragment_returns_following_reflections(self, client):
+        """Test that the fragment contains only the cards after the first page"""
+        activity = StreetActivityFactory()
+        reflections = self.create_reflections(activity, 15)
+        next_url = client.get(
+            reverse("reflection-list-streetactivity", args=[activity.pk])
+        ).context["next_batch_url"]
+
+        response = client.get(next_url)
+
+        assert list(response.context["reflections"]) == reflections[10:]
+        assert "next_batch_url" not in response.context
+        assert "<nav" not in response.text
+        assert "cookie-consent" not in response.text
+
+    def test_fragment_with_equal_dates(self, client):
+        """Test that reflections created at the same moment are neither skipped nor repeated"""
+        activity = StreetActivityFactory()
+        reflections = ReflectionFactory.create_batch(
+            25, activity=activity, date_created=timezone.now()
+        )
+        url = reverse("reflection-list-streetactivity-fragment", args=[activity.pk])
+
+        seen = []
+        while url:
+            response = client.get(url)
+            seen.extend(response.context["reflections"])
+            url = response.context.get("next_batch_url")
+
+        assert sorted(r.pk for r in seen) == sorted(r.pk for r in reflections)
+
+    def test_invalid_key_returns_404(self, client):
+        """Test that a malformed key is not found"""
+        activity = StreetActivityFactory()
+        url = reverse("reflection-list-streetactivity-fragment", args=[activity.pk])
+        assert client.get(url, {"na": "geen-sleutel"}).status_code == 404
+
+
+    def test_model_is_scrolled_by_default(self):
+        """Test that a fragment view without get_batch_queryset scrolls through its model"""
+        class AllReflectionsFragment(SeekFragmentMixin, ListView):
+            """Fragment of all reflections"""
+            model = Reflection
+            template_name = "streetactivity/reflection_cards.html"
+            context_object_name = "reflections"
+
+        reflections = self.create_reflections(StreetActivityFactory(), 2)
+        reflections += self.create_reflections(StreetActivityFactory(), 1)
+
+        response = AllReflectionsFragment.as_view()(RequestFactory().get("/"))
+
+        assert set(response.context_data["reflections"]) == set(reflections)
+
+
+class TestPhotoFragment:
+    '''Tests for loading further batches of photos while scrolling'''
+    def test_fragment_returns_following_photos(self, client, temporary_media_root):
+        """Test that the gallery links to a fragment with the remaining photos"""
+        activity = StreetActivityFactory()
+        now = timezone.now()
+        photos = [
+            StreetActivityPhotoFactory(activity=activity) for _ in range(12)
+        ]
+        for i, photo in enumerate(photos):
+            photo.uploaded_at = now - timedelta(minutes=i)
+            photo.save(update_fields=["uploaded_at"])
+
+        next_url = client.get(
+            reverse("streetactivity-photo-list", kwargs={"activity_id": activity.pk})
+        ).context["next_batch_url"]
+        response = client.get(next_url)
+
+        assert list(response.context["photos"]) == photos[10:]
+        assert response.text.count("<img") == 2
@@ -151,7 +151,8 @@ def create_reflection_data(activity=None):
         "id",
         'activity_id',
         'user_id',
-        'date_created', 'date_modified']:
+        'date_created', 'date_modified',
+        'legacy_id']:
         reflection_data.pop(field, None)
     reflection_data['activity'] = activity.id
     return reflection_data
@@ -0,0 +1,142 @@
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+from PIL import Image
+
+from streetactivity.imaging import (
+    DERIVATIVE_SIZES,
+    derivative_name,
+    generate_derivatives,
+)
+from streetactivity.models import StreetActivityPhoto
+from travelingguestbook.factories import (
+    StreetActivityFactory,
+    StreetActivityPhotoFactory,
+)
+
+
+def create_image_content(size=(3000, 2000), image_format="JPEG"):
+    '''Create the content of an image of the given size'''
+    image = Image.new("RGB", size, color=(255, 0, 0))  # type: ignore[reportArgumentType]
+    image_file = BytesIO()
+    image.save(image_file, image_format)
+    return image_file.getvalue()
+
+
+class TestGenerateDerivatives:
+    '''Tests for generating the resized versions of a photo'''
+    def test_all_sizes_are_generated(self, temporary_media_root):
+        """Test that every derivative size is stored as WebP with its dimensions"""
+        photo = StreetActivityPhotoFactory(image__width=3000, image__height=2000)
+
+        generate_derivatives(photo)
+
+        photo.refresh_from_db()
+        assert set(photo.derivatives) == set(DERIVATIVE_SIZES)
+        for size, longest_edge in DERIVATIVE_SIZES.items():
+            derivative = photo.derivatives[size]
+            assert derivative["width"] == longest_edge
+            assert derivative["height"] == round(longest_edge * 2 / 3)
+            assert derivative["name"].endswith(".webp")
+            with photo.image.storage.open(derivative["name"]) as f:
+                assert Image.open(f).format == "WEBP"
+
+    def test_small_images_are_not_upscaled(self, temporary_media_root):
+        """Test that an image smaller than a derivative size keeps its own size"""
+        photo = StreetActivityPhotoFactory(image__width=100, image__height=50)
+
+        generate_derivatives(photo)
+
+        assert photo.derivatives["full"]["width"] == 100
+        assert photo.derivatives["full"]["height"] == 50
+
+    def test_derivative_name(self, temporary_media_root):
+        """Test that the derivative name is derived from the original name and the photo"""
+        photo = StreetActivityPhotoFactory()
+        photo.image.name = "street_activity_photos/photo.jpg"
+
+        assert derivative_name(photo, "card") == (
+            f"street_activity_photos/derivatives/photo_{photo.pk}_card.webp"
+        )
+
+    def test_uploads_with_same_stem_keep_their_derivatives(self, temporary_media_root):
+        """Test that photos whose names differ only in extension have their own derivatives"""
+        jpeg = StreetActivityPhotoFactory(image__filename="IMG_0001.jpg")
+        png = StreetActivityPhotoFactory(
+            image__filename="IMG_0001.png", image__format="PNG"
+        )
+        generate_derivatives(jpeg)
+        generate_derivatives(png)
+        jpeg_names = {derivative["name"] for derivative in jpeg.derivatives.values()}
+
+        png.delete()
+
+        assert not jpeg_names & {derivative["name"] for derivative in png.derivatives.values()}
+        assert all(jpeg.image.storage.exists(name) for name in jpeg_names)
+
+
+class TestDerivativeUrls:
+    '''Tests for the urls of the resized versions of a photo'''
+    def test_falls_back_to_original_without_derivatives(self, temporary_media_root):
+        """Test that the original image is served while derivatives are missing"""
+        photo = StreetActivityPhotoFactory()
+        assert photo.card_url == photo.image.url
+        assert photo.srcset == ""
+
+    def test_urls_point_to_derivatives(self, temporary_media_root):
+        """Test that the urls and srcset point to the derivatives once generated"""
+        photo = StreetActivityPhotoFactory(image__width=3000, image__height=2000)
+        generate_derivatives(photo)
+
+        assert photo.thumbnail_url.endswith("_thumbnail.webp")
+        assert photo.card_url.endswith("_card.webp")
+        assert photo.detail_url.endswith("_detail.webp")
+        assert photo.full_url.endswith("_full.webp")
+        assert "_card.webp 640w" in photo.srcset
+
+
+class TestDerivativeLifecycle:
+    '''Tests for generating derivatives on upload and removing them on delete'''
+    def test_upload_leaves_derivatives_to_worker(self, temporary_media_root):
+        """Test that uploading a photo queues it instead of generating derivatives in the request"""
+        activity = StreetActivityFactory()
+        uploaded_image = SimpleUploadedFile(
+            "test_image.jpg", create_image_content(), content_type="image/jpeg"
+        )
+
+        Client().post(
+            reverse("create-streetactivity-photo", kwargs={"activity_id": activity.id}),
+            {"image": uploaded_image},
+        )
+
+        photo = StreetActivityPhoto.objects.get()
+        assert photo.status == "pending"
+        assert photo.derivatives == {}
+
+        call_command("process_photos", "--once", stdout=StringIO())
+
+        photo.refresh_from_db()
+        assert set(photo.derivatives) == set(DERIVATIVE_SIZES)
+
+    def test_delete_removes_derivatives(self, temporary_media_root):
+        """Test that deleting a photo removes its derivatives from storage"""
+        photo = StreetActivityPhotoFactory()
+        generate_derivatives(photo)
+        names = [derivative["name"] for derivative in photo.derivatives.values()]
+
+        photo.delete()
+
+        for name in names:
+            assert not photo.image.storage.exists(name)
+
+    def test_command_generates_missing_derivatives(self, temporary_media_root):
+        """Test that the management command only fills in photos without derivatives"""
+        photo = StreetActivityPhotoFactory()
+
+        call_command("generate_photo_derivatives")
+
+        photo.refresh_from_db()
+        assert set(photo.derivatives) == set(DERIVATIVE_SIZES)
@@ -1,5 +1,9 @@
+from io import StringIO
+
 import pytest
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.urls import reverse
 
 from streetactivity.models import StreetActivityPhoto
 from travelingguestbook.factories import (
@@ -68,3 +72,40 @@ class TestStreetActivityPhotoModelValidation:
             photo.full_clean()
 
     
+
+class TestStreetActivityPhotoDimensions:
+    '''Test that the dimensions of a photo are stored instead of read from the file.'''
+    def test_dimensions_are_stored_on_save(self, temporary_media_root):
+        """Test that width, height and file size are saved with the photo."""
+        photo = StreetActivityPhotoFactory(image__width=120, image__height=80)
+        photo.refresh_from_db()
+        assert photo.width == 120
+        assert photo.height == 80
+        assert photo.file_size == photo.image.size
+
+    def test_detail_view_does_not_open_the_file(self, client, temporary_media_root):
+        """Test that the detail page renders the stored dimensions,
+        even when the file itself is no longer readable."""
+        photo = StreetActivityPhotoFactory(image__width=120, image__height=80)
+        photo.image.storage.delete(photo.image.name)
+
+        response = client.get(reverse("streetactivity-detail", args=[photo.activity.pk]))
+
+        assert response.context["photo_width"] == 120
+        assert response.context["photo_height"] == 80
+
+    def test_backfill_command(self, temporary_media_root):
+        """Test that the backfill command fills in photos without dimensions
+        and skips photos whose file is missing."""
+        photo = StreetActivityPhotoFactory(image__width=120, image__height=80)
+        missing = StreetActivityPhotoFactory()
+        StreetActivityPhoto.objects.update(width=None, height=None, file_size=None)
+        missing.image.storage.delete(missing.image.name)
+
+        call_command("backfill_photo_dimensions", batch_size=1, stdout=StringIO())
+
+        photo.refresh_from_db()
+        missing.refresh_from_db()
+        assert (photo.width, photo.height) == (120, 80)
+        assert photo.file_size == photo.image.size
+        assert missing.width is None
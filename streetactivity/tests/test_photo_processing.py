@@ -0,0 +1,245 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import OperationalError
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from streetactivity import processing
+from streetactivity.imaging import DERIVATIVE_DIRECTORY, DERIVATIVE_SIZES, ORIENTATION_TAG
+from streetactivity.models import StreetActivityPhoto
+from streetactivity.sampling import random_photo
+from travelingguestbook.factories import StreetActivityFactory, StreetActivityPhotoFactory
+
+
+def create_rotated_content():
+    '''Create a JPEG of 300x100 pixels that should be shown rotated a quarter turn'''
+    image = Image.new("RGB", (300, 100), color=(0, 0, 255))
+    exif = image.getexif()
+    exif[ORIENTATION_TAG] = 6
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def pending_photo(**kwargs):
+    '''A photo that was uploaded but not processed yet'''
+    return StreetActivityPhotoFactory(status="pending", **kwargs)
+
+
+class TestClaimNextPhoto:
+    '''Tests for claiming photos from the queue'''
+    def test_claims_oldest_pending_photo(self, temporary_media_root):
+        """Test that the oldest pending photo is claimed once"""
+        first = pending_photo()
+        pending_photo()
+        StreetActivityPhotoFactory()
+
+        claimed = processing.claim_next_photo()
+
+        assert claimed == first
+        assert claimed.status == "processing"
+        assert claimed.processing_attempts == 1
+        assert processing.claim_next_photo() != first
+
+    def test_nothing_to_claim(self, temporary_media_root):
+        """Test that ready photos are not claimed"""
+        StreetActivityPhotoFactory()
+
+        assert processing.claim_next_photo() is None
+
+    def test_photo_claimed_by_other_worker_is_skipped(self, temporary_media_root):
+        """Test that a photo whose status changed after it was selected is not claimed twice"""
+        photo = pending_photo()
+        StreetActivityPhoto.objects.filter(pk=photo.pk).update(
+            status="processing", processing_started_at=timezone.now()
+        )
+
+        assert processing.claim_next_photo() is None
+
+    def test_abandoned_photo_is_claimed_again(self, temporary_media_root):
+        """Test that a photo of a worker that died is claimed again, until its attempts are used up"""
+        stale = timezone.now() - processing.STALE_AFTER - timedelta(minutes=1)
+        retried = pending_photo()
+        given_up = pending_photo()
+        StreetActivityPhoto.objects.filter(pk=retried.pk).update(
+            status="processing", processing_started_at=stale, processing_attempts=1
+        )
+        StreetActivityPhoto.objects.filter(pk=given_up.pk).update(
+            status="processing", processing_started_at=stale,
+            processing_attempts=processing.MAX_ATTEMPTS,
+        )
+
+        assert processing.claim_next_photo() == retried
+        given_up.refresh_from_db()
+        assert given_up.status == "failed"
+
+
+class TestProcessPhoto:
+    '''Tests for processing a claimed photo'''
+    def test_photo_becomes_ready(self, temporary_media_root):
+        """Test that processing renders the derivatives and marks the photo ready"""
+        pending_photo()
+
+        results = processing.process_queue()
+
+        photo = StreetActivityPhoto.objects.get()
+        assert results["ready"] == 1
+        assert photo.status == "ready"
+        assert set(photo.derivatives) == set(DERIVATIVE_SIZES)
+
+    def test_orientation_is_fixed(self, temporary_media_root):
+        """Test that a rotated photo is stored upright with swapped dimensions"""
+        photo = pending_photo()
+        photo.image.save("rotated.jpg", ContentFile(create_rotated_content()))
+
+        processing.process_queue()
+
+        photo.refresh_from_db()
+        assert (photo.width, photo.height) == (100, 300)
+        with photo.image.open("rb") as image_file, Image.open(image_file) as image:
+            assert image.size == (100, 300)
+            assert image.getexif().get(ORIENTATION_TAG, 1) == 1
+
+    def test_failed_rotation_keeps_original(self, temporary_media_root):
+        """Test that the upload is kept when the upright version cannot be stored"""
+        photo = pending_photo()
+        photo.image.save("rotated.jpg", ContentFile(create_rotated_content()))
+        with mock.patch.object(FileSystemStorage, "save", side_effect=OSError("schijf vol")):
+            processing.process_queue(limit=1)
+
+        assert photo.image.storage.exists(photo.image.name)
+
+    def test_rotated_photo_is_kept_when_rendering_fails(self, temporary_media_root):
+        """Test that a photo that failed after it was rotated points at the upright copy,
+        so the retry can process it"""
+        photo = pending_photo()
+        photo.image.save("rotated.jpg", ContentFile(create_rotated_content()))
+        original = photo.image.name
+
+        with mock.patch.object(processing, "generate_derivatives", side_effect=OSError("schijf vol")):
+            processing.process_queue(limit=1)
+        results = processing.process_queue()
+
+        photo.refresh_from_db()
+        assert photo.image.name != original
+        assert not photo.image.storage.exists(original)
+        assert results["ready"] == 1
+        assert (photo.status, photo.width, photo.height) == ("ready", 100, 300)
+
+    def test_broken_photo_is_retried_then_failed(self, temporary_media_root):
+        """Test that a photo that cannot be processed is retried and then marked failed"""
+        photo = pending_photo()
+        photo.image.save("kapot.jpg", ContentFile(b"geen afbeelding"))
+
+        results = processing.process_queue()
+
+        photo.refresh_from_db()
+        assert results == {
+            "ready": 0, "pending": processing.MAX_ATTEMPTS - 1, "failed": 1, "deleted": 0
+        }
+        assert photo.status == "failed"
+        assert photo.processing_error
+
+    def test_photo_deleted_while_rendering(self, temporary_media_root):
+        """Test that the derivatives of a photo deleted before they were saved are removed"""
+        photo = pending_photo()
+        render = processing.generate_derivatives
+
+        def delete_then_render(claimed):
+            StreetActivityPhoto.objects.filter(pk=photo.pk).delete()
+            return render(claimed)
+
+        with mock.patch.object(processing, "generate_derivatives", delete_then_render):
+            results = processing.process_queue()
+
+        assert results["deleted"] == 1
+        assert not list(Path(temporary_media_root, DERIVATIVE_DIRECTORY).iterdir())
+
+    def test_photo_deleted_before_ready(self, temporary_media_root):
+        """Test that a photo deleted after its derivatives were rendered does not stop the queue"""
+        deleted = pending_photo()
+        other = pending_photo()
+        render = processing.generate_derivatives
+
+        def render_then_delete(claimed):
+            derivatives = render(claimed)
+            if claimed.pk == deleted.pk:
+                StreetActivityPhoto.objects.filter(pk=deleted.pk).delete()
+            return derivatives
+
+        with mock.patch.object(processing, "generate_derivatives", render_then_delete):
+            results = processing.process_queue()
+
+        assert results["deleted"] == 1
+        assert results["ready"] == 1
+        other.refresh_from_db()
+        names = {derivative["name"] for derivative in other.derivatives.values()}
+        stored = {
+            f"{DERIVATIVE_DIRECTORY}{path.name}"
+            for path in Path(temporary_media_root, DERIVATIVE_DIRECTORY).iterdir()
+        }
+        assert stored == names
+
+    def test_ready_photo_can_be_picked_at_random(self, temporary_media_root):
+        """Test that a photo is only picked at random once it is ready"""
+        activity = StreetActivityFactory()
+        photo = pending_photo(activity=activity)
+        assert random_photo(activity) is None
+
+        processing.process_queue()
+
+        assert random_photo(activity) == photo
+
+
+class TestProcessPhotosCommand:
+    '''Tests for the worker management command'''
+    def test_once_processes_queue(self, temporary_media_root):
+        """Test that the command processes the waiting photos and stops"""
+        pending_photo()
+        out = StringIO()
+
+        call_command("process_photos", "--once", stdout=out)
+
+        assert StreetActivityPhoto.objects.get().status == "ready"
+        assert "1 photos ready" in out.getvalue()
+
+    def test_error_does_not_stop_worker(self, temporary_media_root):
+        """Test that an error in the queue is logged and the worker keeps running"""
+        out = StringIO()
+
+        with mock.patch(
+            "streetactivity.management.commands.process_photos.process_queue",
+            side_effect=OperationalError("database is locked"),
+        ):
+            call_command("process_photos", "--once", stdout=out)
+
+        assert out.getvalue() == ""
+
+
+class TestPlaceholder:
+    '''Tests for showing a placeholder until a photo is ready'''
+    def test_gallery_shows_placeholder(self, client, temporary_media_root):
+        """Test that a pending photo is shown as a placeholder in the gallery"""
+        photo = pending_photo()
+
+        response = client.get(
+            reverse("streetactivity-photo-list", kwargs={"activity_id": photo.activity_id})
+        )
+
+        assert "Foto wordt verwerkt" in response.text
+        assert "<img" not in response.text
+
+    def test_detail_shows_failure(self, client, temporary_media_root):
+        """Test that a failed photo says it could not be processed"""
+        photo = StreetActivityPhotoFactory(status="failed")
+
+        response = client.get(reverse("streetactivity-photo-detail", args=[photo.pk]))
+
+        assert "kon niet worden verwerkt" in response.text
@@ -0,0 +1,125 @@
+from collections import Counter
+
+from django.core.cache import cache, caches
+
+from streetactivity.sampling import (
+    ALL_PHOTOS_CACHE_KEY,
+    activity_cache_key,
+    get_photo_pks,
+    photo_pks_cache,
+    random_photo,
+    random_photos,
+)
+from travelingguestbook.factories import (
+    StreetActivityFactory,
+    StreetActivityPhotoFactory,
+)
+
+
+class TestRandomPhoto:
+    '''Tests for picking a random photo of an activity'''
+    def test_no_photos_returns_none(self):
+        """Test that an activity without photos has no random photo"""
+        assert random_photo(StreetActivityFactory()) is None
+
+    def test_only_photos_of_the_activity(self, temporary_media_root):
+        """Test that the random photo belongs to the given activity"""
+        activity = StreetActivityFactory()
+        photo = StreetActivityPhotoFactory(activity=activity)
+        StreetActivityPhotoFactory()
+
+        for _ in range(10):
+            assert random_photo(activity) == photo
+
+    def test_distribution_is_uniform(self, temporary_media_root):
+        """Test that every photo is picked about equally often"""
+        activity = StreetActivityFactory()
+        photos = StreetActivityPhotoFactory.create_batch(3, activity=activity)
+
+        picks = Counter(random_photo(activity).pk for _ in range(600))
+
+        assert set(picks) == {photo.pk for photo in photos}
+        assert min(picks.values()) > 120
+
+    def test_single_query_once_cached(self, temporary_media_root, django_assert_num_queries):
+        """Test that a cached pick costs one lookup by primary key"""
+        activity = StreetActivityFactory()
+        StreetActivityPhotoFactory.create_batch(3, activity=activity)
+        random_photo(activity)
+
+        with django_assert_num_queries(1):
+            random_photo(activity)
+
+    def test_photo_deleted_by_other_process(self, temporary_media_root):
+        """Test that a photo missing from the database is picked again from fresh keys"""
+        activity = StreetActivityFactory()
+        kept, deleted = StreetActivityPhotoFactory.create_batch(2, activity=activity)
+        deleted.delete()
+        # Read by this process just before the photo was deleted
+        photo_pks_cache().set(activity_cache_key(activity.pk), [deleted.pk])
+
+        assert random_photo(activity) == kept
+        assert get_photo_pks(activity.pk) == [kept.pk]
+
+
+class TestRandomPhotos:
+    '''Tests for picking random photos of all activities'''
+    def test_returns_distinct_photos(self, temporary_media_root):
+        """Test that the requested number of distinct photos is returned"""
+        StreetActivityPhotoFactory.create_batch(6)
+
+        photos = random_photos(4)
+
+        assert len(photos) == 4
+        assert len({photo.pk for photo in photos}) == 4
+
+    def test_fewer_photos_than_requested(self, temporary_media_root):
+        """Test that all photos are returned when there are fewer than requested"""
+        StreetActivityPhotoFactory.create_batch(2)
+        assert len(random_photos(4)) == 2
+
+    def test_photos_deleted_by_other_process(self, temporary_media_root):
+        """Test that photos missing from the database are replaced by other photos"""
+        kept = StreetActivityPhotoFactory.create_batch(3)
+        deleted = StreetActivityPhotoFactory.create_batch(3)
+        for photo in deleted:
+            photo.delete()
+        photo_pks_cache().set(ALL_PHOTOS_CACHE_KEY, [photo.pk for photo in deleted])
+
+        photos = random_photos(2)
+
+        assert len(photos) == 2
+        assert {photo.pk for photo in photos} <= {photo.pk for photo in kept}
+
+
+class TestPhotoPksCache:
+    '''Tests for refreshing the cached photo primary keys'''
+    def test_new_photo_is_added(self, temporary_media_root):
+        """Test that a new photo is part of the cached primary keys"""
+        activity = StreetActivityFactory()
+        assert get_photo_pks(activity.pk) == []
+
+        photo = StreetActivityPhotoFactory(activity=activity)
+
+        assert get_photo_pks(activity.pk) == [photo.pk]
+        assert get_photo_pks() == [photo.pk]
+
+    def test_keys_are_shared_between_processes(self, temporary_media_root):
+        """Test that the keys are kept in the shared cache, which the photo worker clears
+        for the web workers, and not in the cache of this process"""
+        photo = StreetActivityPhotoFactory()
+        get_photo_pks(photo.activity_id)
+
+        assert caches["shared"].get(activity_cache_key(photo.activity_id)) == [photo.pk]
+        assert cache.get(activity_cache_key(photo.activity_id)) is None
+
+    def test_deleted_photo_is_removed(self, temporary_media_root):
+        """Test that a deleted photo is no longer part of the cached primary keys"""
+        photo = StreetActivityPhotoFactory()
+        activity_id = photo.activity_id
+        assert get_photo_pks(activity_id) == [photo.pk]
+
+        photo.delete()
+
+        assert get_photo_pks(activity_id) == []
+        assert get_photo_pks() == []
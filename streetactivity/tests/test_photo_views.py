@@ -155,6 +155,31 @@ class TestStreetActivityPhotoListView:
         assert response.context["is_paginated"]
         assert len(response.context["photos"]) == 10
 
+    def test_list_view_renders_only_one_page(self, client, temporary_media_root):
+        """Test that only the photos of the current page are rendered, as thumbnails"""
+        activity = StreetActivityFactory()
+        StreetActivityPhotoFactory.create_batch(15, activity=activity)
+        url = reverse("streetactivity-photo-list", kwargs={'activity_id': activity.id})
+
+        first = client.get(url).content.decode()
+        second = client.get(url, {"page": 2}).content.decode()
+
+        assert first.count("<img") == 10
+        assert second.count("<img") == 5
+        assert "Pagina 1 van 2" in first
+        assert "?page=2" in first
+        assert "?page=1" in second
+
+    def test_list_view_query_count_is_bounded(self, client, temporary_media_root,
+                                              django_assert_max_num_queries):
+        """Test that the number of queries does not grow with the number of photos"""
+        activity = StreetActivityFactory()
+        StreetActivityPhotoFactory.create_batch(25, activity=activity)
+        url = reverse("streetactivity-photo-list", kwargs={'activity_id': activity.id})
+
+        with django_assert_max_num_queries(5):
+            client.get(url)
+
     def test_list_view_context_data(self, client):
         """Test that the correct context data is provided"""
         activity = StreetActivityFactory()
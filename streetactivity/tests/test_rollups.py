@@ -0,0 +1,196 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from streetactivity import rollups
+from streetactivity.models import ReflectionDailyCount
+from streetactivity.tests.test_import_moments import moment, write_moments
+from travelingguestbook.factories import ReflectionFactory, StreetActivityFactory
+
+
+def counts(activity):
+    '''The daily counts of an activity as a dict of day to count'''
+    return dict(activity.daily_reflection_counts.values_list("day", "count"))
+
+
+class TestReflectionRollups:
+    '''Tests for keeping the daily reflection counts up to date'''
+    def test_reflections_are_counted_per_day(self):
+        """Test that adding reflections counts them on the day they were created"""
+        activity = StreetActivityFactory()
+        now = timezone.now()
+        ReflectionFactory.create_batch(2, activity=activity, date_created=now)
+        ReflectionFactory(activity=activity, date_created=now - timedelta(days=3))
+
+        assert counts(activity) == {
+            timezone.localdate(now): 2,
+            timezone.localdate(now - timedelta(days=3)): 1,
+        }
+
+    def test_deleted_reflection_is_uncounted(self):
+        """Test that deleting reflections decrements the count and drops empty days"""
+        activity = StreetActivityFactory()
+        now = timezone.now()
+        kept, deleted = ReflectionFactory.create_batch(2, activity=activity, date_created=now)
+        old = ReflectionFactory(activity=activity, date_created=now - timedelta(days=3))
+
+        deleted.delete()
+        old.delete()
+
+        assert counts(activity) == {timezone.localdate(kept.date_created): 1}
+
+    def test_bulk_created_reflections_are_counted(self, client):
+        """Test that reflections created as a list through the API are counted"""
+        activity = StreetActivityFactory()
+        ReflectionFactory(activity=activity)
+        items = [{"activity": activity.pk, "reflection": f"Reflectie {i}"} for i in range(5)]
+
+        client.post(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert counts(activity) == {timezone.localdate(): 6}
+
+    def test_changed_reflection_is_moved(self, client):
+        """Test that changing the activity or date of a reflection through the API
+        moves its count from where it was counted to where it is now"""
+        old, new = StreetActivityFactory.create_batch(2)
+        reflection = ReflectionFactory(activity=old)
+        day = timezone.now() - timedelta(days=3)
+
+        client.patch(
+            reverse("reflecties-detail", args=[reflection.pk]),
+            {"activity": new.pk, "date_created": day.isoformat()},
+            content_type="application/json",
+        )
+
+        assert counts(old) == {}
+        assert counts(new) == {timezone.localdate(day): 1}
+
+    def test_bulk_changed_reflections_are_moved(self, client):
+        """Test that reflections moved to another activity as a list are counted there"""
+        old, new = StreetActivityFactory.create_batch(2)
+        moved = ReflectionFactory.create_batch(3, activity=old)
+        ReflectionFactory(activity=old)
+        items = [{"id": reflection.pk, "activity": new.pk} for reflection in moved]
+
+        client.patch(reverse("reflecties-list"), items, content_type="application/json")
+
+        assert counts(old) == {timezone.localdate(): 1}
+        assert counts(new) == {timezone.localdate(): 3}
+
+    def test_imported_moments_are_counted(self, tmp_path):
+        """Test that imported moments are counted on the day they were written"""
+        activity = StreetActivityFactory()
+        path = write_moments(tmp_path, [moment(i, activity.pk) for i in range(1, 4)])
+
+        call_command("import_moments", path, "--batch-size=2", stdout=StringIO())
+
+        assert counts(activity) == {date(2025, 12, 3): 3}
+
+    def test_rebuild(self):
+        """Test that the rebuild command repairs counts that drifted"""
+        activity = StreetActivityFactory()
+        ReflectionFactory.create_batch(3, activity=activity)
+        ReflectionDailyCount.objects.update(count=10)
+        ReflectionDailyCount.objects.create(activity=activity, day=date(2020, 1, 1), count=4)
+        out = StringIO()
+
+        call_command("rebuild_reflection_rollups", stdout=out)
+
+        assert counts(activity) == {timezone.localdate(): 3}
+        assert "Rebuilt 1 daily reflection counts" in out.getvalue()
+
+
+class TestRollupQueries:
+    '''Tests for reading the daily reflection counts'''
+    def test_daily_counts_fill_empty_days(self):
+        """Test that every day of the window is returned, oldest first"""
+        activity = StreetActivityFactory()
+        today = date(2025, 6, 11)
+        ReflectionDailyCount.objects.create(activity=activity, day=today, count=2)
+        ReflectionDailyCount.objects.create(activity=activity, day=today - timedelta(days=10), count=5)
+
+        daily = rollups.daily_counts(activity.pk, days=7, today=today)
+
+        assert daily == [(today - timedelta(days=n), 0) for n in range(6, 0, -1)] + [(today, 2)]
+
+    def test_weekly_counts_start_on_monday(self):
+        """Test that days are grouped into weeks from monday to sunday"""
+        sunday = date(2025, 6, 8)
+        daily = [(sunday + timedelta(days=n), n) for n in range(9)]
+
+        weeks = rollups.weekly_counts(daily)
+
+        assert [(monday, len(days), total) for monday, days, total in weeks] == [
+            (date(2025, 6, 2), 1, 0),
+            (date(2025, 6, 9), 7, 28),
+            (date(2025, 6, 16), 1, 8),
+        ]
+
+    def test_most_active(self):
+        """Test that the activities are ordered by their reflections in the window"""
+        today = date(2025, 6, 11)
+        quiet, busy, old = StreetActivityFactory.create_batch(3)
+        ReflectionDailyCount.objects.create(activity=quiet, day=today, count=1)
+        ReflectionDailyCount.objects.create(activity=busy, day=today, count=2)
+        ReflectionDailyCount.objects.create(activity=busy, day=today - timedelta(days=5), count=2)
+        ReflectionDailyCount.objects.create(activity=old, day=today - timedelta(days=40), count=9)
+
+        rows = rollups.most_active(today=today)
+
+        assert [(row["activity_id"], row["total"]) for row in rows] == [(busy.pk, 4), (quiet.pk, 1)]
+
+
+class TestStatsViews:
+    '''Tests for the statistics pages and endpoints'''
+    def test_activity_stats_page(self, client, django_assert_max_num_queries):
+        """Test that the page shows a year of days with a bounded number of queries"""
+        activity = StreetActivityFactory()
+        ReflectionFactory.create_batch(3, activity=activity)
+
+        with django_assert_max_num_queries(3):
+            response = client.get(reverse("streetactivity-stats", args=[activity.pk]))
+
+        assert response.status_code == 200
+        assert response.context["total"] == 3
+        days = [day for week in response.context["weeks"] for day, _count, _level in week["days"] if day]
+        assert len(days) == rollups.STATS_DAYS
+        assert all(len(week["days"]) == 7 for week in response.context["weeks"][:-1])
+
+    def test_reflection_stats_page(self, client):
+        """Test that the page lists the most active activities"""
+        activity = StreetActivityFactory(name="Vrije knuffels")
+        ReflectionFactory(activity=activity)
+
+        response = client.get(reverse("reflection-stats"))
+
+        assert response.status_code == 200
+        assert "Vrije knuffels" in response.text
+
+    def test_activity_stats_api(self, client):
+        """Test that the endpoint returns the daily and weekly counts"""
+        activity = StreetActivityFactory()
+        ReflectionFactory.create_batch(2, activity=activity)
+
+        data = client.get(reverse("streetactivity-stats-api", args=[activity.pk])).json()
+
+        assert len(data["days"]) == rollups.STATS_DAYS
+        assert data["days"][-1] == {"day": timezone.localdate().isoformat(), "count": 2}
+        assert sum(week["count"] for week in data["weeks"]) == 2
+
+    def test_activity_stats_api_unknown_activity(self, client):
+        """Test that an unknown activity gives 404"""
+        response = client.get(reverse("streetactivity-stats-api", args=[999]))
+
+        assert response.status_code == 404
+
+    def test_reflection_stats_api(self, client):
+        """Test that the endpoint returns the most active activities"""
+        activity = StreetActivityFactory(name="Vrije knuffels")
+        ReflectionFactory.create_batch(2, activity=activity)
+
+        data = client.get(reverse("reflection-stats-api")).json()
+
+        assert data["most_active"] == [{"activity": activity.pk, "name": "Vrije knuffels", "count": 2}]
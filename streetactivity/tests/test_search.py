@@ -0,0 +1,158 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+
+from streetactivity.models import Reflection
+from streetactivity.search import build_match_query, ensure_search_triggers, search
+from travelingguestbook.factories import ReflectionFactory, StreetActivityFactory
+
+
+def found(query):
+    '''Return the kind and primary key of every search result'''
+    return [(result["kind"], result["object"].pk) for result in search(query)]
+
+
+class TestBuildMatchQuery:
+    '''Tests for turning user input into an FTS5 query'''
+    def test_last_word_becomes_prefix(self):
+        """Test that the words are quoted and only the last one matches as a prefix"""
+        assert build_match_query("koffie drink") == '"koffie" "drink"*'
+
+    def test_short_last_word_is_not_a_prefix(self):
+        """Test that a short last word has to match exactly"""
+        assert build_match_query("koffie ko") == '"koffie" "ko"'
+
+    def test_syntax_is_not_interpreted(self):
+        """Test that FTS5 operators and quotes in the input are ignored"""
+        assert build_match_query('NEAR(" name: -') == '"NEAR" "name"*'
+
+    def test_empty_query(self):
+        """Test that input without words gives an empty query"""
+        assert build_match_query(' "*" ') == ""
+
+
+class TestSearch:
+    '''Tests for searching activities and reflections'''
+    def test_finds_activity_and_reflection(self):
+        """Test that activities and reflections are both searched"""
+        activity = StreetActivityFactory(name="Koffie aanbieden", description="Schenk koffie")
+        reflection = ReflectionFactory(activity=activity, reflection="De koffie was lauw")
+        ReflectionFactory(reflection="Niets te maken met drank")
+
+        assert sorted(found("koffie")) == [("activity", activity.pk), ("reflection", reflection.pk)]
+
+    def test_name_matches_rank_first(self):
+        """Test that a match in the name ranks above a match in a reflection"""
+        reflection = ReflectionFactory(reflection="Ik heb gezongen en gezongen")
+        activity = StreetActivityFactory(name="Zingen op straat")
+
+        assert found("zing")[0] == ("activity", activity.pk)
+        assert ("reflection", reflection.pk) not in found("zing")
+
+    def test_prefix_and_diacritics(self):
+        """Test that words match as prefix and without diacritics"""
+        reflection = ReflectionFactory(reflection="Een geweldige ideeën uitwisseling")
+
+        assert found("idee") == [("reflection", reflection.pk)]
+        assert found("uitwis") == [("reflection", reflection.pk)]
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Test that matched terms are marked and the text is escaped"""
+        ReflectionFactory(reflection="<b>Koffie</b> met melk")
+
+        snippet = search("koffie")[0]["snippet"]
+
+        assert "<mark>Koffie</mark>" in snippet
+        assert "&lt;b&gt;" in snippet
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the triggers keep the index in sync"""
+        reflection = ReflectionFactory(reflection="Regen")
+        reflection.reflection = "Zonneschijn"
+        reflection.save()
+        assert found("regen") == []
+        assert found("zonneschijn") == [("reflection", reflection.pk)]
+
+        reflection.delete()
+        assert found("zonneschijn") == []
+
+    def test_bulk_created_reflections_are_indexed(self):
+        """Test that reflections created without signals are indexed as well"""
+        activity = StreetActivityFactory()
+        Reflection.objects.bulk_create(
+            [Reflection(activity=activity, reflection=f"Bulk reflectie {i}") for i in range(3)]
+        )
+
+        assert len(found("bulk")) == 3
+
+    def test_dropped_triggers_are_restored(self):
+        """Test that triggers dropped by a table rebuild are created again"""
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER streetactivity_search_reflection_insert")
+
+        ensure_search_triggers()
+        reflection = ReflectionFactory(reflection="Hersteld")
+
+        assert found("hersteld") == [("reflection", reflection.pk)]
+
+    def test_query_uses_full_text_index(self):
+        """Test that the query plan uses the FTS5 index instead of scanning"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT rowid FROM streetactivity_search "
+                "WHERE streetactivity_search MATCH %s ORDER BY rank LIMIT 20",
+                ['"koffie"*'],
+            )
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+
+        assert "VIRTUAL TABLE INDEX" in plan
+
+
+class TestRebuildSearchIndex:
+    '''Tests for the rebuild command'''
+    def test_rebuild_restores_index(self):
+        """Test that the command refills an emptied index"""
+        reflection = ReflectionFactory(reflection="Verloren reflectie")
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM streetactivity_search")
+        assert found("verloren") == []
+
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+
+        assert found("verloren") == [("reflection", reflection.pk)]
+        assert "Indexed 2" in out.getvalue()
+
+
+class TestSearchViews:
+    '''Tests for the search page and API'''
+    def test_search_page_shows_results(self, client):
+        """Test that the search page shows highlighted results"""
+        activity = StreetActivityFactory(name="Dansen op het plein")
+
+        response = client.get(reverse("search"), {"q": "dansen"})
+
+        assert response.status_code == 200
+        assert "<mark>Dansen</mark>" in response.text
+        assert reverse("streetactivity-detail", args=[activity.pk]) in response.text
+
+    def test_search_page_without_query(self, client):
+        """Test that the search page without a query shows only the form"""
+        response = client.get(reverse("search"))
+
+        assert response.status_code == 200
+        assert response.context["results"] == []
+
+    def test_search_api(self, client):
+        """Test that the API returns the results with their activity"""
+        activity = StreetActivityFactory(name="Fluiten")
+        reflection = ReflectionFactory(activity=activity, reflection="Fluiten is leuk")
+
+        data = client.get(reverse("search-api"), {"q": "fluiten"}).json()
+
+        assert {(r["kind"], r["id"], r["activity"]) for r in data["results"]} == {
+            ("activity", activity.pk, activity.pk),
+            ("reflection", reflection.pk, activity.pk),
+        }
@@ -22,7 +22,7 @@ class TestStreetActivityModel:
         create_url = reverse("create-streetactivity")
 
         activity_data = StreetActivityFactory.build().__dict__
-        for field in ["_state", "id"]:
+        for field in ["_state", "id", "last_reflection_at"]:
             activity_data.pop(field, None)
 
         response = client.post(create_url, activity_data, follow=True)
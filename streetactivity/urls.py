@@ -1,9 +1,10 @@
 from django.urls import include, path
-from rest_framework import routers
+
+from core.utils.routers import BulkRouter
 
 from . import views
 
-router = routers.DefaultRouter()
+router = BulkRouter()
 router.register(
     r"streetactivity", views.StreetActivityViewSet, basename="straatactiviteiten"
 )
@@ -11,6 +12,20 @@ router.register(r"reflection", views.ReflectionViewSet, basename="reflecties")
 
 urlpatterns = [
     path("api/", include(router.urls)),
+    path("api/zoeken/", views.SearchAPIView.as_view(), name="search-api"),
+    path("zoeken/", views.SearchView.as_view(), name="search"),
+    path("api/statistieken/", views.ReflectionStatsAPIView.as_view(), name="reflection-stats-api"),
+    path(
+        "api/statistieken/<int:pk>/",
+        views.StreetActivityStatsAPIView.as_view(),
+        name="streetactivity-stats-api",
+    ),
+    path("statistieken/", views.ReflectionStatsView.as_view(), name="reflection-stats"),
+    path(
+        "info/<int:pk>/statistieken/",
+        views.StreetActivityStatsView.as_view(),
+        name="streetactivity-stats",
+    ),
     path("", views.StreetActivityListView.as_view(), name="streetactivity-list"),
     path(
         "info/<int:pk>/",
@@ -31,11 +46,17 @@ urlpatterns = [
         name="delete-streetactivity",
     ),
     path("reflecties/", views.ReflectionListView.as_view(), name="reflection-list"),
+    path("reflecties/export/", views.ReflectionExportView.as_view(), name="reflection-export"),
     path(
         "<int:pk>/reflecties/straatspel/",
         views.ReflectionListViewStreetActivity.as_view(),
         name="reflection-list-streetactivity",
     ),
+    path(
+        "<int:pk>/reflecties/straatspel/meer/",
+        views.ReflectionFragmentViewStreetActivity.as_view(),
+        name="reflection-list-streetactivity-fragment",
+    ),
     path(
         "<int:pk>/reflectie/nieuw/",
         views.ReflectionCreateView.as_view(),
@@ -64,6 +85,10 @@ urlpatterns = [
         'gallerij/<int:activity_id>/',
         views.StreetActivityPhotoListView.as_view(),
         name='streetactivity-photo-list'),
+    path(
+        'gallerij/<int:activity_id>/meer/',
+        views.StreetActivityPhotoFragmentView.as_view(),
+        name='streetactivity-photo-list-fragment'),
     path(
         'foto/<int:pk>/',
         views.StreetActivityPhotoDetailView.as_view(),
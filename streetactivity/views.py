@@ -1,22 +1,55 @@
 from django.contrib import messages
-from django.db.models.functions import Random
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db.models import F, OuterRef, Subquery
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
 from django.urls import reverse_lazy
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
     ListView,
+    TemplateView,
     UpdateView,
+    View,
 )
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
-
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.utils.cache import CachedResponseMixin
+from core.utils.mixins import (
+    BulkWriteMixin,
+    ConditionalGetMixin,
+    ConditionalRetrieveMixin,
+    SparseFieldsetMixin,
+    latest,
+)
+from core.utils.ratelimit import RateLimitMixin
+
+from . import counters, rollups
+from .exports import (
+    CONTENT_TYPES,
+    EXPORT_FORMATS,
+    export_filename,
+    export_reflections,
+)
+from .filters import ReflectionFilter, StreetActivityFilter
 from .forms import (
     ReflectionForm,
     StreetActivityForm,
     StreetActivityPhotoForm,
 )
 from .models import Reflection, StreetActivity, StreetActivityPhoto
+from .pagination import (
+    DateCreatedCursorPagination,
+    SeekFragmentMixin,
+    SeekPaginationMixin,
+)
+from .sampling import get_photo_pks, random_photo
+from .search import search
 from .serializers import ReflectionSerializer, StreetActivitySerializer
 
 CONFIRM_DELETE_TEMPLATE = "admin/confirm_delete.html"
@@ -27,27 +60,75 @@ class StreetActivityListView(ListView):
     model = StreetActivity
     context_object_name = "activities"
     paginate_by = 10
+    orderings = {
+        "naam": ["name"],
+        "reflecties": ["-reflection_count", "name"],
+        "recent": [F("last_reflection_at").desc(nulls_last=True), "name"],
+        "fotos": ["-photo_count", "name"],
+    }
+
+    def get_sort(self):
+        """Return the chosen sort order from the url, defaulting to sorting by name"""
+        sort = self.request.GET.get("sorteer", "naam")
+        return sort if sort in self.orderings else "naam"
+
+    def get_ordering(self):
+        """Order by name or by the activity level counters"""
+        return self.orderings[self.get_sort()]
+
+    def get_queryset(self):
+        """Filter the activities on the filters in the url"""
+        self.filterset = StreetActivityFilter(self.request.GET, queryset=super().get_queryset())
+        return self.filterset.qs
+
+    def get_context_data(self, **kwargs):
+        """Add the chosen sort order for the sort links and pagination, and the filter form"""
+        context = super().get_context_data(**kwargs)
+        context["sort"] = self.get_sort()
+        context["filter"] = self.filterset
+        return context
 
 
-class StreetActivityDetailView(DetailView):
+class StreetActivityDetailView(ConditionalGetMixin, DetailView):
     """View to display details of a single street activity."""
     model = StreetActivity
     context_object_name = "activity"
 
+    def get_validators(self):
+        """The page shows the activity, its counters, its newest reflections and
+        one of its photos, so it changes when one of those changes"""
+        latest_reflection_change = Subquery(
+            Reflection.objects.filter(activity_id=OuterRef("pk"))
+            .order_by("-date_modified")
+            .values("date_modified")[:1]
+        )
+        row = (
+            StreetActivity.objects.filter(pk=self.kwargs["pk"])
+            .values("date_modified", "last_reflection_at", "reflection_count", "photo_count")
+            .annotate(latest_reflection_change=latest_reflection_change)
+            .first()
+        )
+        if row is None:
+            raise Http404("Straatspel niet gevonden")
+        parts = (*row.values(), get_photo_pks(self.kwargs["pk"]))
+        return parts, latest(
+            row["date_modified"], row["last_reflection_at"], row["latest_reflection_change"]
+        )
+
     def get_context_data(self, **kwargs):
         """Extend context data with reflection and choose random photo"""
         context = super().get_context_data(**kwargs)
         context = self.add_reflection_context_data(activity=self.object, context=context)
         photo = self.get_random_photo(activity=self.object)
         context["photo"] = photo
-        context["photo_width"] = photo.image.width if photo else None
-        context["photo_height"] = photo.image.height if photo else None
+        context["photo_width"] = photo.width if photo else None
+        context["photo_height"] = photo.height if photo else None
         return context
 
     def add_reflection_context_data(self, activity, context):
         '''Extend context data with reflection statistics'''
         reflections = activity.reflections.all()
-        reflections_count = reflections.count()
+        reflections_count = activity.reflection_count
 
         context["reflections_count"] = reflections_count
         context["recent_reflections"] = reflections[:3]
@@ -58,9 +139,9 @@ class StreetActivityDetailView(DetailView):
     def get_random_photo(self, activity):
         """Given an activity,
         get a random photo associated with that activity"""
-        return activity.photos.annotate(random=Random()).order_by('random').first()
+        return random_photo(activity)
 
-class StreetActivityCreateView(CreateView):
+class StreetActivityCreateView(RateLimitMixin, CreateView):
     """View to create a new street activity."""
 
     model = StreetActivity
@@ -70,7 +151,7 @@ class StreetActivityCreateView(CreateView):
         return reverse_lazy("streetactivity-detail", kwargs={"pk": self.object.pk})
 
 
-class StreetActivityUpdateView(UpdateView):
+class StreetActivityUpdateView(RateLimitMixin, UpdateView):
     """View to update an existing street activity."""
 
     model = StreetActivity
@@ -80,7 +161,7 @@ class StreetActivityUpdateView(UpdateView):
         return reverse_lazy("streetactivity-detail", kwargs={"pk": self.object.pk})
 
 
-class StreetActivityDeleteView(DeleteView):
+class StreetActivityDeleteView(RateLimitMixin, DeleteView):
     """View to delete a street activity."""
 
     model = StreetActivity
@@ -88,11 +169,19 @@ class StreetActivityDeleteView(DeleteView):
     success_url = reverse_lazy("streetactivity-list")
 
 
-class StreetActivityViewSet(viewsets.ModelViewSet):
+class StreetActivityViewSet(
+    CachedResponseMixin, ConditionalRetrieveMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     """API endpoint that allows streetactivity to be viewed or edited"""
 
     queryset = StreetActivity.objects.all()
     serializer_class = StreetActivitySerializer
+    pagination_class = DateCreatedCursorPagination
+    # The serializer includes the counters, which change without changing date_modified
+    etag_fields = ("date_modified", "reflection_count", "photo_count", "last_reflection_at")
+    cache_models = (StreetActivity,)
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = StreetActivityFilter
 
 
 class ReflectionListView(ListView):
@@ -101,10 +190,23 @@ class ReflectionListView(ListView):
     model = Reflection
     context_object_name = "reflections"
     paginate_by = 10
+    filterset = None
+
+    def get_queryset(self):
+        """Filter the reflections on the filters in the url"""
+        self.filterset = ReflectionFilter(self.request.GET, queryset=super().get_queryset())
+        return self.filterset.qs
+
+    def get_context_data(self, **kwargs):
+        """Add the filter form"""
+        context = super().get_context_data(**kwargs)
+        context["filter"] = self.filterset
+        return context
 
 
-class ReflectionListViewStreetActivity(ReflectionListView):
+class ReflectionListViewStreetActivity(SeekPaginationMixin, ReflectionListView):
     """View to list reflections related to a specific street activity."""
+    fragment_url_name = "reflection-list-streetactivity-fragment"
 
     def get_queryset(self):
         """Filter reflections by street activity ID from URL."""
@@ -112,22 +214,49 @@ class ReflectionListViewStreetActivity(ReflectionListView):
         return Reflection.objects.filter(activity_id=activity_id)
 
     def get_context_data(self, **kwargs):
-        """Add street activity to context for header."""
+        """Add street activity to context for header,
+        and the url of the next batch for infinite scrolling."""
         context = super().get_context_data(**kwargs)
         context["street_activity"] = get_object_or_404(
             StreetActivity, pk=self.kwargs["pk"]
         )
+        if context["page_obj"].has_next():
+            # Evaluates the page, which the template reuses
+            context["next_batch_url"] = self.get_next_batch_url(list(context["object_list"])[-1])
         return context
 
 
-class ReflectionDetailView(DetailView):
+class ReflectionFragmentViewStreetActivity(SeekFragmentMixin, ListView):
+    """Only the cards of the next batch of reflections of a street activity,
+    fetched by the reflection list while scrolling."""
+    template_name = "streetactivity/reflection_cards.html"
+    context_object_name = "reflections"
+    fragment_url_name = "reflection-list-streetactivity-fragment"
+
+    def get_batch_queryset(self):
+        """Scroll through the reflections of the street activity from the URL."""
+        return Reflection.objects.filter(activity_id=self.kwargs["pk"])
+
+
+class ReflectionDetailView(ConditionalGetMixin, DetailView):
     """View to display details of a single reflection."""
 
     model = Reflection
     context_object_name = "reflection"
 
+    def get_validators(self):
+        """The page changes when the reflection or its activity changes"""
+        row = (
+            Reflection.objects.filter(pk=self.kwargs["pk"])
+            .values("date_modified", "activity__date_modified")
+            .first()
+        )
+        if row is None:
+            raise Http404("Reflectie niet gevonden")
+        return tuple(row.values()), latest(*row.values())
+
 
-class ReflectionCreateView(CreateView):
+class ReflectionCreateView(RateLimitMixin, CreateView):
     """Create view for a single reflection"""
 
     model = Reflection
@@ -170,7 +299,7 @@ class ReflectionCreateView(CreateView):
             kwargs={"pk": self.object.activity.pk},  # type: ignore[reportOptionalMemberAccess]
         )
 
-class ReflectionUpdateView(UpdateView):
+class ReflectionUpdateView(RateLimitMixin, UpdateView):
     """View to update an reflection"""
 
     model = Reflection
@@ -192,7 +321,7 @@ class ReflectionUpdateView(UpdateView):
         )
 
 
-class ReflectionDeleteView(DeleteView):
+class ReflectionDeleteView(RateLimitMixin, DeleteView):
     """View to delete an reflection"""
 
     model = Reflection
@@ -210,13 +339,31 @@ class ReflectionDeleteView(DeleteView):
             kwargs={"pk": self.object.activity.pk}
         )
 
-class ReflectionViewSet(viewsets.ModelViewSet):
-    """API endpoint that provides full CRUD for Reflection"""
+class ReflectionViewSet(
+    ConditionalRetrieveMixin, BulkWriteMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
+    """API endpoint that provides full CRUD for Reflection,
+    and creating or updating a list of reflections at once"""
 
     queryset = Reflection.objects.all()
     serializer_class = ReflectionSerializer
-
-class StreetActivityPhotoCreateView(CreateView):
+    pagination_class = DateCreatedCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ReflectionFilter
+
+    def bulk_created(self, objects):
+        """Count the reflections on their activities and in the daily statistics,
+        as the post_save receivers would"""
+        counters.reflections_bulk_added(objects)
+        rollups.reflections_bulk_added(objects)
+
+    def bulk_updated(self, objects):
+        """Move the reflections that changed activity or creation date in the counters
+        and daily statistics, as the post_save receivers would"""
+        counters.reflections_moved(objects)
+        rollups.reflections_moved(objects)
+
+class StreetActivityPhotoCreateView(RateLimitMixin, CreateView):
     """
     View for uploading a photo for a StreetActivity.
     Uses the StreetActivityPhotoForm for validation and saving.
@@ -232,6 +379,7 @@ class StreetActivityPhotoCreateView(CreateView):
         photo = form.save(commit=False)
         activity_id = self.kwargs.get('activity_id')
         photo.activity = get_object_or_404(StreetActivity, id=activity_id)
+        # Resizing and the other processing are done by the process_photos worker
         photo.save()
         messages.success(self.request, "Je foto is succesvol geupload!")
         return super().form_valid(form)
@@ -253,7 +401,7 @@ class StreetActivityPhotoCreateView(CreateView):
             kwargs={"activity_id": activity_id}
         )
 
-class StreetActivityPhotoDeleteView(DeleteView):
+class StreetActivityPhotoDeleteView(RateLimitMixin, DeleteView):
     '''Delete view for streetactivity photo'''
     model = StreetActivityPhoto
     template_name = CONFIRM_DELETE_TEMPLATE
@@ -270,25 +418,48 @@ class StreetActivityPhotoDeleteView(DeleteView):
             kwargs={"activity_id": self.object.activity.pk}
         )
 
-class StreetActivityPhotoListView(ListView):
+class StreetActivityPhotoListView(SeekPaginationMixin, ListView):
     """View to list photos related to a specific street activity."""
     model = StreetActivityPhoto
     context_object_name = "photos"
     paginate_by = 10
+    seek_field = "-uploaded_at"
+    fragment_url_name = "streetactivity-photo-list-fragment"
 
     def get_queryset(self):
         """Filter photos by street activity ID from URL."""
         activity_id = self.kwargs["activity_id"]
-        return StreetActivityPhoto.objects.filter(activity_id=activity_id)
+        return StreetActivityPhoto.objects.filter(activity_id=activity_id).select_related("activity")
 
     def get_context_data(self, **kwargs):
-        """Add street activity to context for header."""
+        """Add street activity to context for header,
+        and the url of the next batch for infinite scrolling."""
         context = super().get_context_data(**kwargs)
         context["activity"] = get_object_or_404(
             StreetActivity, pk=self.kwargs["activity_id"]
         )
+        if context["page_obj"].has_next():
+            # Evaluates the page, which the template reuses
+            context["next_batch_url"] = self.get_next_batch_url(list(context["object_list"])[-1])
         return context
 
+
+class StreetActivityPhotoFragmentView(SeekFragmentMixin, ListView):
+    """Only the cards of the next batch of photos of a street activity,
+    fetched by the gallery while scrolling."""
+    template_name = "streetactivity/streetactivityphoto_cards.html"
+    context_object_name = "photos"
+    seek_field = "-uploaded_at"
+    fragment_url_name = "streetactivity-photo-list-fragment"
+
+    def get_batch_queryset(self):
+        """Scroll through the photos of the street activity from the URL."""
+        return (
+            StreetActivityPhoto.objects
+            .filter(activity_id=self.kwargs["activity_id"])
+            .select_related("activity")
+        )
+
 class StreetActivityPhotoDetailView(DetailView):
     """View to display details of a single street activity photo."""
     model = StreetActivityPhoto
@@ -301,3 +472,150 @@ class StreetActivityPhotoDetailView(DetailView):
         context['activity'] = activity
 
         return context
+
+
+class SearchView(TemplateView):
+    """View to search street activities and reflections"""
+
+    template_name = "streetactivity/search.html"
+
+    def get_context_data(self, **kwargs):
+        """Add the query and its ranked results"""
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        context["query"] = query
+        context["results"] = search(query) if query else []
+        return context
+
+
+class SearchAPIView(APIView):
+    """API endpoint to search street activities and reflections"""
+
+    def get(self, request):
+        """Return the ranked results with their highlighted snippets"""
+        results = []
+        for result in search(request.query_params.get("q", "").strip()):
+            obj = result["object"]
+            activity = obj if result["kind"] == "activity" else obj.activity
+            results.append({
+                "kind": result["kind"],
+                "id": obj.pk,
+                "activity": activity.pk if activity else None,
+                "name": activity.name if activity else None,
+                "snippet": str(result["snippet"]),
+            })
+        return Response({"results": results})
+
+
+# Bootstrap background opacities for the days in the statistics, from quiet to busy
+HEAT_LEVELS = ("bg-opacity-25", "bg-opacity-50", "bg-opacity-75", "bg-opacity-100")
+
+
+def heat_level(count, busiest):
+    """The background class of a day with count reflections, relative to the busiest day"""
+    if not count:
+        return ""
+    return HEAT_LEVELS[min(len(HEAT_LEVELS) - 1, (count * len(HEAT_LEVELS) - 1) // busiest)]
+
+
+class StreetActivityStatsView(DetailView):
+    """Reflections per day and per week of a street activity over the last year"""
+
+    model = StreetActivity
+    context_object_name = "activity"
+    template_name = "streetactivity/streetactivity_stats.html"
+
+    def get_context_data(self, **kwargs):
+        """Add the weeks of the last year, with the counts and heat of each day"""
+        context = super().get_context_data(**kwargs)
+        daily = rollups.daily_counts(self.object.pk)
+        busiest = max(count for _day, count in daily)
+        context["weeks"] = [
+            {
+                "monday": monday,
+                "total": total,
+                # The first week is padded, so every row of the grid is one weekday
+                "days": [(None, 0, "")] * days[0][0].weekday()
+                + [(day, count, heat_level(count, busiest)) for day, count in days],
+            }
+            for monday, days, total in rollups.weekly_counts(daily)
+        ]
+        context["total"] = sum(count for _day, count in daily)
+        context["busiest"] = busiest
+        context["stats_days"] = rollups.STATS_DAYS
+        return context
+
+
+class ReflectionStatsView(TemplateView):
+    """The street activities with the most reflections over the last month"""
+
+    template_name = "streetactivity/reflection_stats.html"
+
+    def get_context_data(self, **kwargs):
+        """Add the most active activities"""
+        context = super().get_context_data(**kwargs)
+        context["most_active"] = rollups.most_active()
+        context["most_active_days"] = rollups.MOST_ACTIVE_DAYS
+        return context
+
+
+class StreetActivityStatsAPIView(APIView):
+    """API endpoint with the reflections per day and per week of a street activity"""
+
+    def get(self, request, pk):
+        """Return the daily and weekly counts over the last year"""
+        get_object_or_404(StreetActivity, pk=pk)
+        daily = rollups.daily_counts(pk)
+        return Response({
+            "days": [{"day": day, "count": count} for day, count in daily],
+            "weeks": [
+                {"week": monday, "count": total}
+                for monday, _days, total in rollups.weekly_counts(daily)
+            ],
+        })
+
+
+class ReflectionStatsAPIView(APIView):
+    """API endpoint with the street activities with the most reflections over the last month"""
+
+    def get(self, request):
+        """Return the most active activities with their number of reflections"""
+        return Response({
+            "days": rollups.MOST_ACTIVE_DAYS,
+            "most_active": [
+                {"activity": row["activity_id"], "name": row["activity__name"], "count": row["total"]}
+                for row in rollups.most_active()
+            ],
+        })
+
+
+class ReflectionExportView(UserPassesTestMixin, View):
+    """Stream all reflections with their activity name as NDJSON or CSV, for staff only"""
+
+    def test_func(self):
+        """Only staff may download the export"""
+        return self.request.user.is_staff
+
+    def get(self, request):
+        """Stream the export, filtered on the dates van and tot and optionally gzipped"""
+        export_format = request.GET.get("formaat", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest("Onbekend formaat, kies ndjson of csv")
+        dates = {}
+        for param in ("van", "tot"):
+            value = request.GET.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                # Well formed but impossible, such as 2025-02-30
+                dates[param] = None
+            if value and dates[param] is None:
+                return HttpResponseBadRequest(f"Ongeldige datum voor {param}, gebruik JJJJ-MM-DD")
+        gzip = request.GET.get("gzip") == "1"
+
+        response = StreamingHttpResponse(
+            export_reflections(export_format, dates["van"], dates["tot"], gzip),
+            content_type="application/gzip" if gzip else f"{CONTENT_TYPES[export_format]}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(export_format, gzip)}"'
+        return response
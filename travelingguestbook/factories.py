@@ -38,6 +38,7 @@ class StreetActivityPhotoFactory(factory.django.DjangoModelFactory):
     activity      = factory.SubFactory(StreetActivityFactory)
     image         = factory.django.ImageField(color='blue')
     uploaded_at   = factory.LazyFunction(timezone.now)
+    status        = 'ready'
 
 class ReflectionFactory(factory.django.DjangoModelFactory):
     '''Mock for streetactivities Reflection'''
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'streetactivity',
     'persona',
     'rest_framework',
+    'django_filters',
     'usermanagement',
 ]
 
@@ -158,8 +159,52 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     },
+    # Shared by the gunicorn workers, so a change seen by one worker invalidates the
+    # cached API responses of all of them, see core.utils.cache
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RESPONSE_CACHE_DIR', BASE_DIR / 'cache' / 'responses'),
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+    # Shared by the gunicorn workers, so the rate limits hold across them
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RATE_LIMIT_CACHE_DIR', BASE_DIR / 'cache' / 'ratelimit'),
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+    # Shared by the gunicorn workers and the process_photos worker, so a change one
+    # of them makes to precomputed data is seen by all
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('SHARED_CACHE_DIR', BASE_DIR / 'cache' / 'shared'),
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
 }
 
+# Cookie consent logs wait here until flush_consent_logs inserts them, see core.consent
+CONSENT_SPOOL_DIR = os.getenv('CONSENT_SPOOL_DIR', BASE_DIR / 'cache' / 'consent')
+
+# Anonymous visitors may make 20 writes at once and then one every 3 seconds, with
+# five times as many per IP address, see core.utils.ratelimit
+WRITE_RATE_LIMIT = (20, 60)
+RATE_LIMIT_IP_MULTIPLIER = 5
+
+# Seconds after which a cached API response nobody asked for is removed to free
+# space, invalidation does not depend on it, see core.utils.cache
+RESPONSE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Minutes during which the home page shows the same featured activities
+FEATURED_ROTATION_MINUTES = 15
+
+# Uploads larger than this are discarded while they are received, see core.utils.uploads
+MAX_IMAGE_UPLOAD_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+FILE_UPLOAD_HANDLERS = [
+    'core.utils.uploads.SizeLimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 HAYSTACK_CONNECTIONS = {
     'default': {
         'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
@@ -169,6 +214,7 @@ HAYSTACK_CONNECTIONS = {
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_THROTTLE_CLASSES": ["core.utils.ratelimit.TokenBucketThrottle"],
 }
 
 GA_MEASUREMENT_ID = ''  # zet hier je ID in productie, of laat leeg voor dev
@@ -1,7 +1,7 @@
-import os
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from core.utils.uploads import SafeImageField
 from .models import Profile
 
 
@@ -45,20 +45,5 @@ class ProfileForm(forms.ModelForm):
         """Profile_image is editable"""
         model = Profile
         fields = ["profile_image"]
-
-    def clean_profile_image(self):
-        """Validate the image size and the filetype"""
-        image = self.cleaned_data.get("profile_image")
-        if image:
-            valid_extensions = [".jpg", ".jpeg", ".png", ".gif", ".webp"]
-            ext = os.path.splitext(image.name)[1].lower()
-            if ext not in valid_extensions:
-                raise forms.ValidationError(
-                    "Ongeldige bestandsextensie. Toegestaan: JPG, JPEG, PNG, GIF, WebP"
-                )
-
-            max_size = 5 * 1024 * 1024
-            if image.size > max_size:
-                raise forms.ValidationError("Afbeelding mag niet groter zijn dan 5MB")
-
-        return image
+        # Validates the size, the filetype and the dimensions from the image header
+        field_classes = {"profile_image": SafeImageField}